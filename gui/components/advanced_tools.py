@@ -6,11 +6,15 @@ from network.advanced import AdvancedDiagnostics
 
 class ArpWorker(QThread):
     finished = pyqtSignal(list)
-    def __init__(self):
+    def __init__(self, sweep=False):
         super().__init__()
         self.tool = AdvancedDiagnostics()
+        self.sweep = sweep
     def run(self):
-        data = self.tool.get_arp_table()
+        if self.sweep:
+            data = self.tool.sweep_arp_table()
+        else:
+            data = self.tool.get_arp_table()
         self.finished.emit(data)
 
 class ConnectionsWorker(QThread):
@@ -56,12 +60,16 @@ class AdvancedWidget(QWidget):
         refresh_btn = QPushButton("Refresh ARP Table")
         refresh_btn.clicked.connect(self.refresh_arp)
         btn_layout.addWidget(refresh_btn)
+        sweep_btn = QPushButton("Sweep Local Subnet")
+        sweep_btn.setToolTip("Send ARP requests to every address on the local subnet (requires administrator rights)")
+        sweep_btn.clicked.connect(self.sweep_arp)
+        btn_layout.addWidget(sweep_btn)
         btn_layout.addStretch()
         layout.addLayout(btn_layout)
         
         self.arp_table = QTableWidget()
-        self.arp_table.setColumnCount(4)
-        self.arp_table.setHorizontalHeaderLabels(["IP Address", "MAC Address", "Type", "Interface"])
+        self.arp_table.setColumnCount(5)
+        self.arp_table.setHorizontalHeaderLabels(["IP Address", "MAC Address", "Vendor", "Type", "Interface"])
         self.arp_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(self.arp_table)
 
@@ -101,19 +109,23 @@ class AdvancedWidget(QWidget):
         self.nbt_output.setFontFamily("Consolas")
         layout.addWidget(self.nbt_output)
 
-    def refresh_arp(self):
+    def refresh_arp(self, sweep=False):
         self.arp_table.setRowCount(0)
-        self.arp_worker = ArpWorker()
+        self.arp_worker = ArpWorker(sweep)
         self.arp_worker.finished.connect(self.update_arp_table)
         self.arp_worker.start()
 
+    def sweep_arp(self):
+        self.refresh_arp(sweep=True)
+
     def update_arp_table(self, data):
         self.arp_table.setRowCount(len(data))
         for i, entry in enumerate(data):
             self.arp_table.setItem(i, 0, QTableWidgetItem(entry['ip']))
             self.arp_table.setItem(i, 1, QTableWidgetItem(entry['mac']))
-            self.arp_table.setItem(i, 2, QTableWidgetItem(entry['type']))
-            self.arp_table.setItem(i, 3, QTableWidgetItem(entry.get('interface', '')))
+            self.arp_table.setItem(i, 2, QTableWidgetItem(entry.get('vendor') or ''))
+            self.arp_table.setItem(i, 3, QTableWidgetItem(entry['type']))
+            self.arp_table.setItem(i, 4, QTableWidgetItem(entry.get('interface') or ''))
 
     def refresh_conns(self):
         self.conn_table.setRowCount(0)
@@ -1,23 +1,30 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                             QGroupBox, QGridLayout, QPushButton, QLineEdit,
-                            QSpinBox, QTextEdit, QProgressBar, QCompleter, QFileDialog)
+                            QSpinBox, QDoubleSpinBox, QComboBox, QTextEdit, QProgressBar,
+                            QCompleter, QFileDialog)
 from PyQt5.QtCore import QThread, pyqtSignal, QTimer, QSettings
 from PyQt5.QtGui import QFont
-from network.ping import PingTester
+from network.ping import PingTester, MODE_INTERVAL, MODE_ADAPTIVE, MODE_BURST
 
 class PingThread(QThread):
     result_ready = pyqtSignal(dict)
     progress_update = pyqtSignal(str)
+    stats_update = pyqtSignal(dict)
     
-    def __init__(self, host, count):
+    def __init__(self, host, count, interval=1.0, mode=MODE_INTERVAL):
         super().__init__()
         self.host = host
         self.count = count
+        self.interval = interval
+        self.mode = mode
         
     def run(self):
         try:
             tester = PingTester()
-            result = tester.ping_host(self.host, self.count, progress_callback=self.progress_update.emit)
+            result = tester.ping_host(self.host, self.count, progress_callback=self.progress_update.emit,
+                                      interval=self.interval, mode=self.mode,
+                                      stats_callback=self.stats_update.emit)
+            tester.close()
             self.result_ready.emit(result)
         except Exception as e:
             self.result_ready.emit({"error": str(e)})
@@ -75,6 +82,27 @@ class PingTestWidget(QWidget):
         self.count_input.setMinimumHeight(35)
         input_layout.addWidget(self.count_input, 1, 1)
         
+        # Interval input
+        input_layout.addWidget(QLabel("Interval (s):"), 2, 0)
+        self.interval_input = QDoubleSpinBox()
+        self.interval_input.setDecimals(3)
+        self.interval_input.setMinimum(0.001)
+        self.interval_input.setMaximum(60.0)
+        self.interval_input.setSingleStep(0.1)
+        self.interval_input.setValue(1.0)
+        self.interval_input.setMinimumHeight(35)
+        input_layout.addWidget(self.interval_input, 2, 1)
+        
+        # Mode selection
+        input_layout.addWidget(QLabel("Mode:"), 3, 0)
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItem("Fixed Interval", MODE_INTERVAL)
+        self.mode_combo.addItem("Adaptive (next on reply)", MODE_ADAPTIVE)
+        self.mode_combo.addItem("Burst", MODE_BURST)
+        self.mode_combo.currentIndexChanged.connect(self.on_mode_changed)
+        self.mode_combo.setMinimumHeight(35)
+        input_layout.addWidget(self.mode_combo, 3, 1)
+        
         # Buttons
         btn_layout = QHBoxLayout()
         self.start_btn = QPushButton("Start Ping Test")
@@ -89,7 +117,7 @@ class PingTestWidget(QWidget):
         btn_layout.addWidget(self.start_btn)
         btn_layout.addWidget(self.export_btn)
         
-        input_layout.addLayout(btn_layout, 2, 0, 1, 2)
+        input_layout.addLayout(btn_layout, 4, 0, 1, 2)
         
         layout.addWidget(input_group)
         
@@ -113,9 +141,15 @@ class PingTestWidget(QWidget):
         self.min_label = QLabel("Min: 0 ms")
         self.max_label = QLabel("Max: 0 ms")
         self.avg_label = QLabel("Avg: 0 ms")
+        self.jitter_label = QLabel("Jitter: 0 ms")
+        self.stddev_label = QLabel("Std Dev: 0 ms")
+        self.streak_label = QLabel("Max Loss Streak: 0")
+        self.percentiles_label = QLabel("Percentiles: --")
         
         for label in [self.sent_label, self.received_label, self.lost_label, 
-                      self.min_label, self.max_label, self.avg_label]:
+                      self.min_label, self.max_label, self.avg_label,
+                      self.jitter_label, self.stddev_label, self.streak_label,
+                      self.percentiles_label]:
             label.setFont(QFont("Segoe UI", 10, QFont.Bold))
         
         stats_layout.addWidget(self.sent_label, 0, 0)
@@ -124,6 +158,10 @@ class PingTestWidget(QWidget):
         stats_layout.addWidget(self.min_label, 1, 0)
         stats_layout.addWidget(self.max_label, 1, 1)
         stats_layout.addWidget(self.avg_label, 1, 2)
+        stats_layout.addWidget(self.jitter_label, 2, 0)
+        stats_layout.addWidget(self.stddev_label, 2, 1)
+        stats_layout.addWidget(self.streak_label, 2, 2)
+        stats_layout.addWidget(self.percentiles_label, 3, 0, 1, 3)
         
         results_layout.addLayout(stats_layout)
         
@@ -135,6 +173,10 @@ class PingTestWidget(QWidget):
         
         layout.addWidget(results_group)
         
+    def on_mode_changed(self, index):
+        """Interval only applies to fixed-interval mode."""
+        self.interval_input.setEnabled(self.mode_combo.itemData(index) == MODE_INTERVAL)
+
     def cleanup(self):
         if hasattr(self, 'ping_thread') and self.ping_thread and self.ping_thread.isRunning():
             self.ping_thread.quit()
@@ -156,19 +198,35 @@ class PingTestWidget(QWidget):
         self.results_text.clear()
         
         # Reset statistics
-        self.sent_label.setText("Sent: 0")
-        self.received_label.setText("Received: 0")
-        self.lost_label.setText("Lost: 0")
-        self.min_label.setText("Min: 0 ms")
-        self.max_label.setText("Max: 0 ms")
-        self.avg_label.setText("Avg: 0 ms")
+        self.update_statistics({})
         
         # Start ping thread
-        self.ping_thread = PingThread(host, count)
+        self.ping_thread = PingThread(host, count, self.interval_input.value(),
+                                      self.mode_combo.currentData())
         self.ping_thread.result_ready.connect(self.on_ping_finished)
         self.ping_thread.progress_update.connect(self.on_ping_progress)
+        self.ping_thread.stats_update.connect(self.update_statistics)
         self.ping_thread.start()
         
+    def update_statistics(self, stats):
+        """Show running or final statistics as reported by PingTester."""
+        self.sent_label.setText(f"Sent: {stats.get('sent', 0)}")
+        self.received_label.setText(f"Received: {stats.get('received', 0)}")
+        self.lost_label.setText(f"Lost: {stats.get('lost', 0)}")
+        self.min_label.setText(f"Min: {stats.get('min_time', 0):.1f} ms")
+        self.max_label.setText(f"Max: {stats.get('max_time', 0):.1f} ms")
+        self.avg_label.setText(f"Avg: {stats.get('avg_time', 0):.1f} ms")
+        self.jitter_label.setText(f"Jitter: {stats.get('jitter', 0):.1f} ms")
+        self.stddev_label.setText(f"Std Dev: {stats.get('std_dev', 0):.1f} ms")
+        self.streak_label.setText(f"Max Loss Streak: {stats.get('max_loss_streak', 0)}")
+        
+        percentiles = stats.get('percentiles')
+        if percentiles:
+            text = "   ".join(f"{name.upper()}: {value:.1f} ms" for name, value in percentiles.items())
+            self.percentiles_label.setText(f"Percentiles: {text}")
+        else:
+            self.percentiles_label.setText("Percentiles: --")
+
     def on_ping_progress(self, message):
         self.results_text.append(message)
         self.progress_bar.setValue(self.progress_bar.value() + 1)
@@ -187,15 +245,7 @@ class PingTestWidget(QWidget):
 
         # Update statistics
         stats = result.get('statistics', {})
-        self.sent_label.setText(f"Sent: {stats.get('sent', 0)}")
-        self.received_label.setText(f"Received: {stats.get('received', 0)}")
-        self.lost_label.setText(f"Lost: {stats.get('lost', 0)}")
-        
-        if stats.get('times'):
-            times = stats['times']
-            self.min_label.setText(f"Min: {min(times):.1f} ms")
-            self.max_label.setText(f"Max: {max(times):.1f} ms")
-            self.avg_label.setText(f"Avg: {sum(times)/len(times):.1f} ms")
+        self.update_statistics(stats)
             
         self.results_text.append(f"\n--- Ping Test Complete ---")
         self.results_text.append(f"Host: {result.get('host', 'Unknown')}")
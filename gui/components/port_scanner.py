@@ -5,6 +5,7 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt5.QtCore import QThread, pyqtSignal, QSettings
 from PyQt5.QtGui import QFont
 from network.scanner import PortScanner
+from network.targets import count_targets
 
 
 class PortScanThread(QThread):
@@ -20,8 +21,8 @@ class PortScanThread(QThread):
         self.scanner = PortScanner()
 
     def run(self):
-        self.scanner.scan_ports(
-            host=self.host,
+        self.scanner.scan_job(
+            targets=self.host,
             ports=self.ports,
             timeout=self.timeout,
             progress_callback=self._on_progress,
@@ -45,6 +46,7 @@ class PortScannerWidget(QWidget):
         self.settings = QSettings("NetworkTools", "PortScanner")
         self.history = self.settings.value("host_history", [], type=list)
         self.scanner = PortScanner()
+        self.multi_host = False
         self.setup_ui()
         self.load_history()
         
@@ -82,9 +84,9 @@ class PortScannerWidget(QWidget):
         input_layout.setContentsMargins(15, 20, 15, 15)
         
         # Host input
-        input_layout.addWidget(QLabel("Target Host:"), 0, 0)
+        input_layout.addWidget(QLabel("Target Hosts:"), 0, 0)
         self.host_input = QLineEdit()
-        self.host_input.setPlaceholderText("Enter IP address or hostname")
+        self.host_input.setPlaceholderText("IP, hostname, CIDR (192.168.1.0/24) or range (10.0.0.1-20), comma separated")
         self.host_input.setText("127.0.0.1")
         self.host_input.setMinimumHeight(35)
         input_layout.addWidget(self.host_input, 0, 1)
@@ -222,6 +224,14 @@ class PortScannerWidget(QWidget):
             self.results_text.append("Error: No valid ports to scan")
             return
             
+        try:
+            # Counted without expanding, so large ranges do not block the UI
+            host_count = count_targets(host)
+        except ValueError as e:
+            self.results_text.append(f"Error: Invalid target: {e}")
+            return
+        self.multi_host = host_count > 1
+            
         try:
             timeout = float(self.timeout_input.text())
         except ValueError:
@@ -237,7 +247,10 @@ class PortScannerWidget(QWidget):
         self.open_ports_list.clear()
         
         self.results_text.append(f"Starting port scan on {host}")
-        self.results_text.append(f"Scanning {len(ports)} ports with {timeout}s timeout")
+        if self.multi_host:
+            self.results_text.append(f"Scanning {len(ports)} ports on {host_count} hosts with {timeout}s timeout")
+        else:
+            self.results_text.append(f"Scanning {len(ports)} ports with {timeout}s timeout")
         self.results_text.append("=" * 50)
         
         # Start scan in thread
@@ -269,10 +282,12 @@ class PortScannerWidget(QWidget):
         port = result.get('port', 0)
         status = result.get('status', 'Unknown')
         service = result.get('service', 'Unknown')
+        latency = result.get('latency')
+        host_prefix = f"{result.get('host')} " if self.multi_host else ""
         
         if status == 'Open':
             # Add to open ports list
-            item_text = f"Port {port}"
+            item_text = f"{host_prefix}Port {port}"
             if service and service != "Unknown":
                 item_text += f" ({service})"
             
@@ -285,7 +300,8 @@ class PortScannerWidget(QWidget):
             self.open_ports_list.addItem(item)
             
             # Add to results text
-            self.results_text.append(f"Port {port}: OPEN ({service})")
+            latency_text = f" - {latency:.1f} ms" if latency is not None else ""
+            self.results_text.append(f"{host_prefix}Port {port}: OPEN ({service}){latency_text}")
         
     def on_scan_complete(self, results):
         """Handle scan completion."""
@@ -297,6 +313,7 @@ class PortScannerWidget(QWidget):
         # Count results
         open_ports = [r for r in results if r.get('status') == 'Open']
         closed_ports = [r for r in results if r.get('status') == 'Closed']
+        filtered_ports = [r for r in results if r.get('status') == 'Filtered']
         error_ports = [r for r in results if r.get('status') == 'Error']
         
         # Summary
@@ -306,6 +323,7 @@ class PortScannerWidget(QWidget):
         self.results_text.append(f"Total ports scanned: {len(results)}")
         self.results_text.append(f"Open ports: {len(open_ports)}")
         self.results_text.append(f"Closed ports: {len(closed_ports)}")
+        self.results_text.append(f"Filtered ports (no response): {len(filtered_ports)}")
         self.results_text.append(f"Errors: {len(error_ports)}")
         
         if not open_ports:
@@ -315,7 +333,8 @@ class PortScannerWidget(QWidget):
             for result in open_ports:
                 port = result.get('port', 0)
                 service = result.get('service', 'Unknown')
-                self.results_text.append(f"  • Port {port} ({service})")
+                host_prefix = f"{result.get('host')} " if self.multi_host else ""
+                self.results_text.append(f"  • {host_prefix}Port {port} ({service})")
         
         self.export_btn.setEnabled(True)
 
@@ -1,9 +1,13 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                             QGroupBox, QGridLayout, QPushButton, QTextEdit,
-                            QProgressBar, QFrame, QFileDialog)
+                            QProgressBar, QFrame, QFileDialog, QLineEdit,
+                            QComboBox, QSpinBox)
 from PyQt5.QtCore import QThread, pyqtSignal
 from PyQt5.QtGui import QFont
+from datetime import datetime, timedelta
 from network.speed_test import SpeedTester
+from network.scheduler import SpeedTestScheduler
+from network.speed_history import SpeedHistory, PERIOD_HOUR, PERIOD_DAY
 
 
 class SpeedTestThread(QThread):
@@ -11,10 +15,13 @@ class SpeedTestThread(QThread):
     test_complete = pyqtSignal(dict)
     latency_complete = pyqtSignal(dict)
 
-    def __init__(self, test_type, host=None, parent=None):
+    def __init__(self, test_type, host=None, parent=None, port=None, protocol="tcp", streams=4):
         super().__init__(parent)
         self.test_type = test_type
         self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.streams = streams
         self.speed_tester = SpeedTester()
 
     def run(self):
@@ -24,6 +31,10 @@ class SpeedTestThread(QThread):
         elif self.test_type == "latency":
             results = self.speed_tester.test_latency(host=self.host)
             self.latency_complete.emit(results)
+        elif self.test_type == "local":
+            results = self.speed_tester.perform_local_test(self.host, port=self.port, protocol=self.protocol,
+                                                           streams=self.streams, progress_callback=self._on_progress)
+            self.test_complete.emit(results)
 
     def _on_progress(self, progress, message):
         self.progress_update.emit(progress, message)
@@ -33,15 +44,23 @@ class SpeedTestThread(QThread):
 
 
 class SpeedTestWidget(QWidget):
+    # Results of scheduled tests arrive from the scheduler thread
+    scheduled_result = pyqtSignal(dict)
+
     def __init__(self):
         super().__init__()
         self.speed_tester = SpeedTester()
+        self.history = SpeedHistory()
+        self.scheduler = None
         self.setup_ui()
+        self.scheduled_result.connect(self.on_scheduled_result)
         
     def cleanup(self):
         if hasattr(self, 'test_thread') and self.test_thread and self.test_thread.isRunning():
             self.test_thread.stop()
             self.test_thread.wait()
+        if self.scheduler:
+            self.scheduler.stop()
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -79,6 +98,27 @@ class SpeedTestWidget(QWidget):
         button_layout.addStretch()
         
         control_layout.addLayout(button_layout)
+
+        # Self-hosted throughput server
+        local_layout = QHBoxLayout()
+        local_layout.setSpacing(10)
+        local_layout.addWidget(QLabel("Local Server:"))
+        self.local_host_input = QLineEdit()
+        self.local_host_input.setPlaceholderText("e.g., 192.168.1.10 or 192.168.1.10:5201")
+        local_layout.addWidget(self.local_host_input, 1)
+        self.local_protocol_combo = QComboBox()
+        self.local_protocol_combo.addItems(["TCP", "HTTP"])
+        local_layout.addWidget(self.local_protocol_combo)
+        local_layout.addWidget(QLabel("Streams:"))
+        self.local_streams_spin = QSpinBox()
+        self.local_streams_spin.setRange(1, 32)
+        self.local_streams_spin.setValue(4)
+        local_layout.addWidget(self.local_streams_spin)
+        self.local_test_btn = QPushButton("Local Test")
+        self.local_test_btn.clicked.connect(self.start_local_test)
+        local_layout.addWidget(self.local_test_btn)
+
+        control_layout.addLayout(local_layout)
         
         # Progress
         self.progress_bar = QProgressBar()
@@ -91,6 +131,33 @@ class SpeedTestWidget(QWidget):
         
         layout.addWidget(control_group)
         
+        # Scheduled tests and history
+        schedule_group = QGroupBox("Scheduled Tests")
+        schedule_layout = QHBoxLayout(schedule_group)
+        schedule_layout.setContentsMargins(15, 20, 15, 15)
+        schedule_layout.setSpacing(10)
+        schedule_layout.addWidget(QLabel("Schedule:"))
+        self.schedule_input = QLineEdit("0 * * * *")
+        self.schedule_input.setToolTip("Cron expression: minute hour day month weekday\n"
+                                       "e.g. '0 * * * *' every hour, '*/30 8-20 * * 1-5' every 30 minutes on weekdays")
+        schedule_layout.addWidget(self.schedule_input, 1)
+        self.schedule_target_combo = QComboBox()
+        self.schedule_target_combo.addItems(["Internet", "Local Server"])
+        schedule_layout.addWidget(self.schedule_target_combo)
+        self.schedule_btn = QPushButton("Start Schedule")
+        self.schedule_btn.clicked.connect(self.toggle_schedule)
+        schedule_layout.addWidget(self.schedule_btn)
+        self.next_run_label = QLabel("Not scheduled")
+        schedule_layout.addWidget(self.next_run_label)
+        self.history_period_combo = QComboBox()
+        self.history_period_combo.addItems(["Hourly (48 h)", "Daily (30 days)"])
+        schedule_layout.addWidget(self.history_period_combo)
+        history_btn = QPushButton("Show History")
+        history_btn.clicked.connect(self.show_history)
+        schedule_layout.addWidget(history_btn)
+        
+        layout.addWidget(schedule_group)
+        
         # Results display
         results_layout = QHBoxLayout()
         results_layout.setSpacing(15)
@@ -126,11 +193,19 @@ class SpeedTestWidget(QWidget):
         self.ping_label.setStyleSheet("color: #e5c07b;")
         metrics_layout.addWidget(self.ping_label, 2, 1)
         
+        # Latency under load
+        metrics_layout.addWidget(QLabel("Bufferbloat:"), 3, 0)
+        self.bufferbloat_label = QLabel("--")
+        self.bufferbloat_label.setFont(QFont("Segoe UI", 13, QFont.Bold))
+        self.bufferbloat_label.setStyleSheet("color: #c678dd;")
+        self.bufferbloat_label.setToolTip("Grade of the latency increase while the connection is busy (A+ to F)")
+        metrics_layout.addWidget(self.bufferbloat_label, 3, 1)
+        
         # Server info
-        metrics_layout.addWidget(QLabel("Server:"), 3, 0)
+        metrics_layout.addWidget(QLabel("Server:"), 4, 0)
         self.server_label = QLabel("--")
         self.server_label.setWordWrap(True)
-        metrics_layout.addWidget(self.server_label, 3, 1)
+        metrics_layout.addWidget(self.server_label, 4, 1)
         
         metrics_layout.setColumnStretch(1, 1)
         
@@ -169,6 +244,7 @@ class SpeedTestWidget(QWidget):
         """Start a full speed test."""
         self.full_test_btn.setEnabled(False)
         self.latency_test_btn.setEnabled(False)
+        self.local_test_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         self.progress_bar.setVisible(True)
         self.progress_bar.setRange(0, 100)
@@ -183,10 +259,126 @@ class SpeedTestWidget(QWidget):
         self.test_thread.test_complete.connect(self.on_test_complete)
         self.test_thread.start()
         
+    def _local_server(self):
+        """Return (host, port) from the local server field, or None after logging why not."""
+        host, _, port = self.local_host_input.text().strip().partition(":")
+        if not host:
+            self.results_text.append("Enter the address of a local throughput server first.")
+            return None
+        if port and not port.isdigit():
+            self.results_text.append(f"Invalid port: {port}")
+            return None
+        return host, int(port) if port else None
+
+    def start_local_test(self):
+        """Start a speed test against a self-hosted throughput server."""
+        server = self._local_server()
+        if not server:
+            return
+        host, port = server
+
+        self.full_test_btn.setEnabled(False)
+        self.latency_test_btn.setEnabled(False)
+        self.local_test_btn.setEnabled(False)
+        self.stop_btn.setEnabled(True)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setValue(0)
+
+        protocol = self.local_protocol_combo.currentText().lower()
+        streams = self.local_streams_spin.value()
+        self.results_text.append(f"Starting local speed test against {host} ({protocol.upper()}, {streams} streams)...")
+        self.reset_display()
+
+        self.test_thread = SpeedTestThread("local", host=host, parent=self, port=port,
+                                           protocol=protocol, streams=streams)
+        self.test_thread.progress_update.connect(self.on_progress)
+        self.test_thread.test_complete.connect(self.on_test_complete)
+        self.test_thread.start()
+
+    def toggle_schedule(self):
+        """Start or stop periodic speed tests."""
+        if self.scheduler:
+            self.scheduler.stop()
+            self.scheduler = None
+            self.schedule_btn.setText("Start Schedule")
+            self.next_run_label.setText("Not scheduled")
+            self.schedule_input.setEnabled(True)
+            self.schedule_target_combo.setEnabled(True)
+            self.results_text.append("Scheduled tests stopped.")
+            return
+
+        options = {}
+        if self.schedule_target_combo.currentText() == "Local Server":
+            server = self._local_server()
+            if not server:
+                return
+            options = {'local_host': server[0], 'port': server[1],
+                       'protocol': self.local_protocol_combo.currentText().lower(),
+                       'streams': self.local_streams_spin.value()}
+        try:
+            self.scheduler = SpeedTestScheduler(self.schedule_input.text(), self.history,
+                                                self.scheduled_result.emit, **options)
+        except ValueError as e:
+            self.results_text.append(f"Invalid schedule: {e}")
+            return
+
+        self.scheduler.start()
+        self.schedule_btn.setText("Stop Schedule")
+        self.schedule_input.setEnabled(False)
+        self.schedule_target_combo.setEnabled(False)
+        self.results_text.append(f"Scheduled tests started ({self.schedule_input.text().strip()}), "
+                                 f"results are saved to {self.history.path}")
+        self._update_next_run()
+
+    def _update_next_run(self):
+        if self.scheduler:
+            next_run = self.scheduler.schedule.next_after(datetime.now())
+            self.next_run_label.setText(f"Next: {next_run.strftime('%Y-%m-%d %H:%M')}")
+
+    def on_scheduled_result(self, result):
+        """Show the result of a scheduled test."""
+        self._update_next_run()
+        if result.get('error'):
+            self.results_text.append(f"[{result['timestamp'][:16]}] Scheduled test failed: {result['error']}")
+            return
+        self.download_label.setText(f"{result['download_speed']} Mbps")
+        self.upload_label.setText(f"{result['upload_speed']} Mbps")
+        self.ping_label.setText(f"{result['ping']} ms")
+        self.results_text.append(f"[{result['timestamp'][:16]}] Scheduled test: "
+                                 f"{result['download_speed']} / {result['upload_speed']} Mbps, "
+                                 f"ping {result['ping']} ms")
+
+    def show_history(self):
+        """Log hourly or daily averages of the recorded tests."""
+        hourly = self.history_period_combo.currentIndex() == 0
+        since = datetime.now() - (timedelta(hours=48) if hourly else timedelta(days=30))
+        summaries = self.history.aggregate(PERIOD_HOUR if hourly else PERIOD_DAY, start=since.timestamp())
+        if not summaries:
+            self.results_text.append("No recorded tests in this period.")
+            return
+
+        def value(summary, field):
+            number = summary[f'{field}_avg']
+            return f"{number:8.1f}" if number is not None else f"{'--':>8}"
+
+        time_format = '%Y-%m-%d %H:00' if hourly else '%Y-%m-%d'
+        self.results_text.append("\n" + "=" * 40)
+        self.results_text.append(f"SPEED HISTORY ({'HOURLY' if hourly else 'DAILY'} AVERAGES)")
+        self.results_text.append("=" * 40)
+        self.results_text.append(f"{'Period':<16} {'Down':>8} {'Up':>8} {'Ping':>8} Tests")
+        for summary in summaries:
+            self.results_text.append(
+                f"{summary['period'].strftime(time_format):<16} {value(summary, 'download_speed')} "
+                f"{value(summary, 'upload_speed')} {value(summary, 'ping')} "
+                f"{summary['tests']}" + (f" ({summary['failures']} failed)" if summary['failures'] else ""))
+        self.export_btn.setEnabled(True)
+
     def start_latency_test(self):
         """Start latency test only."""
         self.full_test_btn.setEnabled(False)
         self.latency_test_btn.setEnabled(False)
+        self.local_test_btn.setEnabled(False)
         self.stop_btn.setEnabled(True)
         
         self.results_text.append("Starting latency test...")
@@ -201,6 +393,7 @@ class SpeedTestWidget(QWidget):
         self.test_thread.stop()
         self.full_test_btn.setEnabled(True)
         self.latency_test_btn.setEnabled(True)
+        self.local_test_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.progress_bar.setVisible(False)
         self.progress_label.setText("")
@@ -215,6 +408,7 @@ class SpeedTestWidget(QWidget):
         """Handle speed test completion."""
         self.full_test_btn.setEnabled(True)
         self.latency_test_btn.setEnabled(True)
+        self.local_test_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         self.progress_bar.setVisible(False)
         self.progress_label.setText("")
@@ -238,6 +432,11 @@ class SpeedTestWidget(QWidget):
             server_text += f" ({server['sponsor']})"
         self.server_label.setText(server_text)
         
+        latency = result.get('loaded_latency')
+        if result.get('bufferbloat'):
+            increase = max(latency.get('download_increase', 0), latency.get('upload_increase', 0))
+            self.bufferbloat_label.setText(f"{result['bufferbloat']} (+{increase:.0f} ms)")
+        
         # Log results
         self.results_text.append("\n" + "=" * 40)
         self.results_text.append("SPEED TEST RESULTS")
@@ -245,11 +444,29 @@ class SpeedTestWidget(QWidget):
         self.results_text.append(f"Download Speed: {download} Mbps")
         self.results_text.append(f"Upload Speed: {upload} Mbps")
         self.results_text.append(f"Ping: {ping} ms")
+        if result.get('streams'):
+            self.results_text.append(f"Parallel Streams: {result['streams']}")
+            for direction in ("download", "upload"):
+                series = result.get(f"{direction}_series")
+                if not series:
+                    continue
+                self.results_text.append(f"{direction.title()} Average (incl. ramp-up): {result[f'{direction}_average']} Mbps")
+                self.results_text.append(f"{direction.title()} per {result[f'{direction}_interval']}s (Mbps): "
+                                         + ", ".join(f"{mbps:.0f}" for mbps in series))
         self.results_text.append(f"Server: {server_text}")
         if server.get('country'):
             self.results_text.append(f"Location: {server['country']}")
         if server.get('distance'):
             self.results_text.append(f"Distance: {server['distance']} km")
+        if latency:
+            for phase in ("idle", "download", "upload"):
+                percentiles = latency.get(phase, {}).get('percentiles')
+                if percentiles:
+                    self.results_text.append(
+                        f"{phase.title()} Latency: P50 {percentiles['p50']:.1f} ms, "
+                        f"P95 {percentiles['p95']:.1f} ms, P99 {percentiles['p99']:.1f} ms")
+            if result.get('bufferbloat'):
+                self.results_text.append(f"Bufferbloat Grade: {result['bufferbloat']}")
         
         self.export_btn.setEnabled(True)
 
@@ -257,6 +474,7 @@ class SpeedTestWidget(QWidget):
         """Handle latency test completion."""
         self.full_test_btn.setEnabled(True)
         self.latency_test_btn.setEnabled(True)
+        self.local_test_btn.setEnabled(True)
         self.stop_btn.setEnabled(False)
         
         if result.get('error'):
@@ -280,6 +498,12 @@ class SpeedTestWidget(QWidget):
         self.results_text.append(f"Min Latency: {min_latency} ms")
         self.results_text.append(f"Max Latency: {max_latency} ms")
         self.results_text.append(f"Packet Loss: {packet_loss}%")
+        if 'jitter' in result:
+            self.results_text.append(f"Jitter: {result['jitter']} ms")
+        percentiles = result.get('percentiles')
+        if percentiles:
+            self.results_text.append("Percentiles: " + ", ".join(
+                f"{name.upper()} {value} ms" for name, value in percentiles.items()))
 
         self.export_btn.setEnabled(True)
         
@@ -288,6 +512,7 @@ class SpeedTestWidget(QWidget):
         self.download_label.setText("-- Mbps")
         self.upload_label.setText("-- Mbps")
         self.ping_label.setText("-- ms")
+        self.bufferbloat_label.setText("--")
         self.server_label.setText("--")
         
     def clear_log(self):
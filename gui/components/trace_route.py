@@ -1,31 +1,147 @@
+import bisect
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                            QLineEdit, QPushButton, QTableWidget, QTableWidgetItem,
-                            QHeaderView, QProgressBar, QMessageBox)
-from PyQt5.QtCore import QThread, pyqtSignal, Qt
+                            QLineEdit, QPushButton, QTableView,
+                            QHeaderView, QProgressBar, QMessageBox, QCheckBox)
+from PyQt5.QtCore import QThread, pyqtSignal, Qt, QAbstractTableModel, QModelIndex, QTimer
+from PyQt5.QtGui import QBrush
 from network.trace import TraceRoute
 
+# Hop updates are applied to the table at most once per frame
+FRAME_INTERVAL_MS = 33
+
 class TraceWorker(QThread):
     update_signal = pyqtSignal(dict)
     finished_signal = pyqtSignal()
 
-    def __init__(self, target):
+    def __init__(self, target, continuous=False):
         super().__init__()
         self.target = target
+        self.continuous = continuous
         self.tracer = TraceRoute()
 
     def run(self):
-        self.tracer.run_trace(self.target, self.update_signal.emit)
+        if self.continuous:
+            self.tracer.monitor(self.target, self.update_signal.emit)
+        else:
+            self.tracer.run_trace(self.target, self.update_signal.emit)
         self.finished_signal.emit()
 
     def stop(self):
         self.tracer.stop()
 
+class HopTableModel(QAbstractTableModel):
+    """Table model holding one row per hop.
+
+    Hop updates are queued with queue_update() and only applied by flush(),
+    which inserts new rows and emits a single dataChanged for the updated
+    ones, so bursts of updates cost one repaint.
+    """
+
+    COLUMNS = ["Hop", "IP Address", "Latency", "Loss %", "Sent", "Avg", "Best", "Worst", "StDev", "Status"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._hops = []      # hop numbers, sorted
+        self._rows = []      # display values per row
+        self._failed = []    # per row: timeout or unreachable
+        self._pending = {}   # hop number -> latest data
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role == Qt.DisplayRole:
+            return self._rows[row][column]
+        if role == Qt.TextAlignmentRole and column != 1:
+            return Qt.AlignCenter
+        if role == Qt.ForegroundRole:
+            failed = self._failed[row]
+            if column == len(self.COLUMNS) - 1:
+                return QBrush(Qt.red if failed else Qt.darkGreen)
+            if column == 2 and failed:
+                return QBrush(Qt.red)
+        return None
+
+    def clear(self):
+        self.beginResetModel()
+        self._hops, self._rows, self._failed = [], [], []
+        self._pending = {}
+        self.endResetModel()
+
+    def queue_update(self, data):
+        """Remember the latest data for a hop until the next flush()."""
+        self._pending[data.get("hop")] = data
+
+    def flush(self):
+        """Apply queued updates. Returns True if rows were added."""
+        if not self._pending:
+            return False
+        pending, self._pending = self._pending, {}
+        inserted = False
+        first_changed = last_changed = None
+
+        for hop, data in sorted(pending.items(), key=lambda item: item[0] or 0):
+            values = self._format(data)
+            failed = data.get("status") in ("timeout", "unreachable")
+            row = bisect.bisect_left(self._hops, hop)
+            if row < len(self._hops) and self._hops[row] == hop:
+                self._rows[row] = values
+                self._failed[row] = failed
+                first_changed = row if first_changed is None else min(first_changed, row)
+                last_changed = row if last_changed is None else max(last_changed, row)
+            else:
+                self.beginInsertRows(QModelIndex(), row, row)
+                self._hops.insert(row, hop)
+                self._rows.insert(row, values)
+                self._failed.insert(row, failed)
+                self.endInsertRows()
+                inserted = True
+
+        if first_changed is not None:
+            self.dataChanged.emit(self.index(first_changed, 0),
+                                  self.index(last_changed, len(self.COLUMNS) - 1))
+        return inserted
+
+    @staticmethod
+    def _format(data):
+        def ms(value):
+            return f"{value:.1f}" if value is not None else ""
+
+        hop = data.get("hop")
+        return [
+            str(hop if hop is not None else ""),
+            ", ".join(data.get("ips") or []) or data.get("ip", ""),
+            data.get("time", ""),
+            f"{data['loss']:.1f}" if "loss" in data else "",
+            str(data.get("sent", len(data.get("times", [])) or "")),
+            ms(data.get("avg")),
+            ms(data.get("best")),
+            ms(data.get("worst")),
+            ms(data.get("stdev")),
+            {"ok": "OK", "unreachable": "Unreachable"}.get(data.get("status"), "Timeout"),
+        ]
+
 class TraceRouteWidget(QWidget):
     def __init__(self):
         super().__init__()
         self.setup_ui()
         self.worker = None
 
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(FRAME_INTERVAL_MS)
+        self.refresh_timer.timeout.connect(self.refresh_table)
+
     def setup_ui(self):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(20, 20, 20, 20)
@@ -42,9 +158,13 @@ class TraceRouteWidget(QWidget):
         self.start_btn = QPushButton("Start Trace")
         self.start_btn.clicked.connect(self.start_trace)
         self.start_btn.setFixedWidth(100)
+
+        self.continuous_check = QCheckBox("Continuous")
+        self.continuous_check.setToolTip("Keep probing every hop once per second and update loss and latency statistics (MTR style)")
         
         header_layout.addWidget(target_label)
         header_layout.addWidget(self.target_input)
+        header_layout.addWidget(self.continuous_check)
         header_layout.addWidget(self.start_btn)
         
         layout.addLayout(header_layout)
@@ -57,9 +177,9 @@ class TraceRouteWidget(QWidget):
         layout.addWidget(self.progress_bar)
 
         # Results Table
-        self.table = QTableWidget()
-        self.table.setColumnCount(4)
-        self.table.setHorizontalHeaderLabels(["Hop", "IP Address", "Latency", "Status"])
+        self.model = HopTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
         self.table.verticalHeader().setVisible(False)
         self.table.setAlternatingRowColors(True)
@@ -75,14 +195,16 @@ class TraceRouteWidget(QWidget):
             self.worker.stop()
             self.worker.wait()
 
-        self.table.setRowCount(0)
+        self.model.clear()
+        self.refresh_timer.start()
         self.start_btn.setText("Stop")
         self.start_btn.clicked.disconnect()
         self.start_btn.clicked.connect(self.stop_trace)
         self.target_input.setEnabled(False)
+        self.continuous_check.setEnabled(False)
         self.progress_bar.show()
 
-        self.worker = TraceWorker(target)
+        self.worker = TraceWorker(target, self.continuous_check.isChecked())
         self.worker.update_signal.connect(self.update_table)
         self.worker.finished_signal.connect(self.on_finished)
         self.worker.start()
@@ -93,10 +215,13 @@ class TraceRouteWidget(QWidget):
         self.on_finished()
 
     def on_finished(self):
+        self.refresh_timer.stop()
+        self.refresh_table()
         self.start_btn.setText("Start Trace")
         self.start_btn.clicked.disconnect()
         self.start_btn.clicked.connect(self.start_trace)
         self.target_input.setEnabled(True)
+        self.continuous_check.setEnabled(True)
         self.progress_bar.hide()
 
     def update_table(self, data):
@@ -104,30 +229,8 @@ class TraceRouteWidget(QWidget):
             QMessageBox.critical(self, "Error", data["error"])
             return
 
-        row = self.table.rowCount()
-        self.table.insertRow(row)
-        
-        hop_item = QTableWidgetItem(str(data.get("hop", "")))
-        hop_item.setTextAlignment(Qt.AlignCenter)
-        
-        ip_item = QTableWidgetItem(data.get("ip", ""))
-        
-        time_item = QTableWidgetItem(data.get("time", ""))
-        time_item.setTextAlignment(Qt.AlignCenter)
-        
-        status_str = "OK" if data.get("status") == "ok" else "Timeout"
-        status_item = QTableWidgetItem(status_str)
-        status_item.setTextAlignment(Qt.AlignCenter)
-        
-        if data.get("status") == "timeout":
-            status_item.setForeground(Qt.red)
-            time_item.setForeground(Qt.red)
-        else:
-            status_item.setForeground(Qt.darkGreen)
+        self.model.queue_update(data)
 
-        self.table.setItem(row, 0, hop_item)
-        self.table.setItem(row, 1, ip_item)
-        self.table.setItem(row, 2, time_item)
-        self.table.setItem(row, 3, status_item)
-        
-        self.table.scrollToBottom()
+    def refresh_table(self):
+        if self.model.flush():
+            self.table.scrollToBottom()
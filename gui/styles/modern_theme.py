@@ -355,7 +355,7 @@ class ModernTheme:
             background-color: {self.accent_color};
         }}
         
-        QTableWidget {{
+        QTableWidget, QTableView {{
             background-color: {self.primary_color};
             border: 1px solid {self.border_color};
             border-radius: 6px;
@@ -364,12 +364,12 @@ class ModernTheme:
             alternate-background-color: {self.secondary_color};
         }}
 
-        QTableWidget::item {{
+        QTableWidget::item, QTableView::item {{
             padding: 5px;
             border-bottom: 1px solid {self.border_color};
         }}
 
-        QTableWidget::item:selected {{
+        QTableWidget::item:selected, QTableView::item:selected {{
             background-color: {self.accent_color};
             color: white;
         }}
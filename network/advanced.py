@@ -4,6 +4,13 @@ import re
 import logging
 import psutil
 import socket
+import os
+import ipaddress
+from .arp import ArpSweeper, local_networks, lookup_vendor
+from .targets import HostRange
+
+# Local subnets larger than this are skipped by an automatic ARP sweep
+ARP_SWEEP_MIN_PREFIX = 22
 
 class AdvancedDiagnostics:
     def __init__(self):
@@ -41,17 +48,86 @@ class AdvancedDiagnostics:
                                 'type': parts[2],
                                 'interface': current_interface
                             })
+            elif os.path.exists('/proc/net/arp'):
+                # Linux: read the kernel neighbour table directly
+                with open('/proc/net/arp', 'r') as f:
+                    next(f, None)  # Header line
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) < 6:
+                            continue
+                        flags = int(parts[2], 16)
+                        if not flags & 0x2:  # Incomplete entry
+                            continue
+                        entries.append({
+                            'ip': parts[0],
+                            'mac': parts[3],
+                            'type': 'static' if flags & 0x4 else 'dynamic',
+                            'interface': parts[5]
+                        })
             else:
-                # Linux/Mac implementation (simplified)
-                result = subprocess.run(['arp', '-a'], capture_output=True, text=True)
-                # Parsing logic would go here
-                pass
+                # macOS/BSD: "? (192.168.1.1) at aa:bb:cc:dd:ee:ff on en0 ifscope [ethernet]"
+                result = subprocess.run(['arp', '-an'], capture_output=True, text=True)
+                for line in result.stdout.split('\n'):
+                    match = re.search(r'\(([\d.]+)\) at ([0-9a-fA-F:]+) .*?on (\S+)', line)
+                    if match:
+                        entries.append({
+                            'ip': match.group(1),
+                            'mac': match.group(2),
+                            'type': 'static' if 'permanent' in line else 'dynamic',
+                            'interface': match.group(3)
+                        })
                 
         except Exception as e:
             logging.error(f"Error getting ARP table: {e}")
+
+        for entry in entries:
+            entry['vendor'] = lookup_vendor(entry['mac'])
             
         return entries
 
+    def sweep_arp_table(self, network=None):
+        """Get ARP table entries after sweeping local subnets with ARP requests.
+
+        Sweeps ``network`` or every directly attached subnet (up to a /22) and
+        adds the hosts that replied to the ARP table entries. Without packet
+        socket access this returns the plain ARP table.
+        """
+        entries = self.get_arp_table()
+        known = {entry['ip'] for entry in entries}
+
+        if network:
+            networks = [ipaddress.ip_network(network, strict=False)]
+        else:
+            networks = [net for _, _, _, net in local_networks() if net.prefixlen >= ARP_SWEEP_MIN_PREFIX]
+
+        for net in networks:
+            sweeper = ArpSweeper.open(net)
+            if sweeper is None:
+                logging.info(f"ARP sweep of {net} not available, using ARP table only")
+                continue
+            try:
+                replies = sweeper.sweep(HostRange(net).addresses())
+            except Exception as e:
+                logging.error(f"Error sweeping {net}: {e}")
+                continue
+            finally:
+                sweeper.close()
+
+            for ip, mac in replies.items():
+                if ip in known:
+                    continue
+                known.add(ip)
+                entries.append({
+                    'ip': ip,
+                    'mac': mac,
+                    'type': 'swept',
+                    'interface': sweeper.interface,
+                    'vendor': lookup_vendor(mac)
+                })
+
+        return entries
+
     def get_active_connections(self):
         """Get list of active network connections."""
         conns = []
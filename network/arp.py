@@ -0,0 +1,251 @@
+import select
+import socket
+import struct
+import time
+import ipaddress
+import logging
+import psutil
+from typing import Optional, Dict, Iterable, List, Tuple
+
+ETH_P_ARP = 0x0806
+ETH_P_IP = 0x0800
+ARP_REQUEST = 1
+ARP_REPLY = 2
+BROADCAST_MAC = b'\xff' * 6
+
+ARP_SWEEP_RATE = 5000      # Requests per second
+ARP_REPLY_WINDOW = 0.5     # Seconds to wait for late replies after the last request
+ARP_SEND_CHUNK = 64
+RECEIVE_BUFFER_SIZE = 1 << 20
+
+# A few common vendor prefixes so lookups work without an OUI database
+BUNDLED_VENDORS = {
+    '00:00:0C': 'Cisco',
+    '00:03:93': 'Apple',
+    '00:04:4B': 'NVIDIA',
+    '00:05:69': 'VMware',
+    '00:08:9B': 'QNAP',
+    '00:09:0F': 'Fortinet',
+    '00:0C:29': 'VMware',
+    '00:0D:B9': 'PC Engines',
+    '00:0E:58': 'Sonos',
+    '00:0F:B5': 'Netgear',
+    '00:11:32': 'Synology',
+    '00:14:22': 'Dell',
+    '00:14:6C': 'Netgear',
+    '00:15:5D': 'Microsoft (Hyper-V)',
+    '00:16:3E': 'Xen',
+    '00:17:88': 'Philips Lighting',
+    '00:1A:11': 'Google',
+    '00:1B:17': 'Palo Alto Networks',
+    '00:1C:42': 'Parallels',
+    '00:1D:7E': 'Cisco-Linksys',
+    '00:1E:58': 'D-Link',
+    '00:25:90': 'Supermicro',
+    '00:27:22': 'Ubiquiti',
+    '00:50:56': 'VMware',
+    '00:50:F2': 'Microsoft',
+    '00:90:A9': 'Western Digital',
+    '00:E0:4C': 'Realtek',
+    '08:00:27': 'VirtualBox',
+    '18:B4:30': 'Nest Labs',
+    '24:A4:3C': 'Ubiquiti',
+    '44:65:0D': 'Amazon',
+    '50:C7:BF': 'TP-Link',
+    '52:54:00': 'QEMU/KVM',
+    'B8:27:EB': 'Raspberry Pi',
+    'DC:A6:32': 'Raspberry Pi',
+    'E4:5F:01': 'Raspberry Pi',
+}
+
+# System OUI databases, used when present (nmap and ieee-data formats)
+OUI_DATABASES = [
+    '/usr/share/nmap/nmap-mac-prefixes',
+    '/usr/share/ieee-data/oui.txt',
+]
+
+_vendors = None
+
+
+def normalize_mac(mac: str) -> str:
+    """Return a MAC address as upper-case colon-separated octets."""
+    digits = ''.join(c for c in mac if c.isalnum()).upper()
+    return ':'.join(digits[i:i + 2] for i in range(0, len(digits), 2))
+
+
+def _load_vendors() -> Dict[str, str]:
+    vendors = {}
+    for path in OUI_DATABASES:
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                for line in f:
+                    if line.startswith('#'):
+                        continue
+                    if '(hex)' in line:
+                        prefix, name = line.split('(hex)', 1)
+                    else:
+                        prefix, _, name = line.partition(' ')
+                    prefix = normalize_mac(prefix.strip())
+                    if len(prefix) == 8 and name.strip():
+                        vendors.setdefault(prefix, name.strip())
+        except OSError:
+            continue
+    for prefix, name in BUNDLED_VENDORS.items():
+        vendors.setdefault(prefix, name)
+    return vendors
+
+
+def lookup_vendor(mac: Optional[str]) -> Optional[str]:
+    """Return the vendor of a MAC address from its OUI, or None if unknown."""
+    global _vendors
+    if not mac:
+        return None
+    if _vendors is None:
+        _vendors = _load_vendors()
+    mac = normalize_mac(mac)
+    vendor = _vendors.get(mac[:8])
+    if vendor is None and len(mac) >= 2 and int(mac[:2], 16) & 0x02:
+        return "Locally administered"
+    return vendor
+
+
+def local_networks() -> List[Tuple[str, str, str, ipaddress.IPv4Network]]:
+    """Return (interface, ip, mac, network) for each IPv4 interface with a MAC."""
+    networks = []
+    for interface, addrs in psutil.net_if_addrs().items():
+        mac = next((addr.address for addr in addrs if addr.family == psutil.AF_LINK), None)
+        if not mac or normalize_mac(mac) == '00:00:00:00:00:00':
+            continue
+        for addr in addrs:
+            if addr.family != socket.AF_INET or not addr.netmask:
+                continue
+            network = ipaddress.ip_network(f"{addr.address}/{addr.netmask}", strict=False)
+            if network.is_loopback or network.prefixlen == 32:
+                continue
+            networks.append((interface, addr.address, normalize_mac(mac), network))
+    return networks
+
+
+def find_interface(network) -> Optional[Tuple[str, str, str, ipaddress.IPv4Network]]:
+    """Return the local interface the network is directly attached to, if any."""
+    network = ipaddress.ip_network(network, strict=False)
+    if network.version != 4:
+        return None
+    for entry in local_networks():
+        if network.subnet_of(entry[3]):
+            return entry
+    return None
+
+
+def build_arp_request(src_mac: bytes, src_ip: bytes, target_ip: bytes) -> bytes:
+    """Build a broadcast Ethernet frame carrying an ARP who-has request."""
+    ethernet = BROADCAST_MAC + src_mac + struct.pack('!H', ETH_P_ARP)
+    arp = struct.pack('!HHBBH', 1, ETH_P_IP, 6, 4, ARP_REQUEST)
+    return ethernet + arp + src_mac + src_ip + b'\x00' * 6 + target_ip
+
+
+def parse_arp_reply(frame: bytes) -> Optional[Tuple[str, str]]:
+    """Return (sender ip, sender mac) of an ARP reply frame, or None."""
+    if len(frame) < 42 or frame[12:14] != b'\x08\x06':
+        return None
+    if struct.unpack('!H', frame[20:22])[0] != ARP_REPLY:
+        return None
+    mac = ':'.join(f'{b:02X}' for b in frame[22:28])
+    return socket.inet_ntoa(frame[28:32]), mac
+
+
+class ArpSweeper:
+    """ARP request sweep over a Linux ``AF_PACKET`` socket.
+
+    Broadcasts one who-has request per address on the interface the network is
+    attached to and collects the replies, which finds every on-link host
+    regardless of host firewalls. Use :meth:`open`, it returns None when the
+    network is not on-link or the process may not open packet sockets.
+    """
+
+    def __init__(self, sock: socket.socket, interface: str, ip: str, mac: str):
+        self.sock = sock
+        self.interface = interface
+        self.ip = ip
+        self.mac = mac
+        self._src_mac = bytes.fromhex(mac.replace(':', ''))
+        self._src_ip = socket.inet_aton(ip)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_SIZE)
+        except OSError:
+            pass
+
+    @classmethod
+    def open(cls, network) -> Optional['ArpSweeper']:
+        """Open a sweeper for an on-link network, or return None if not possible."""
+        if not hasattr(socket, 'AF_PACKET'):
+            return None
+        entry = find_interface(network)
+        if entry is None:
+            return None
+        interface, ip, mac, _ = entry
+        try:
+            sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+            sock.bind((interface, ETH_P_ARP))
+        except (PermissionError, OSError) as e:
+            logging.debug(f"ArpSweeper.open - packet socket unavailable: {e}")
+            return None
+        return cls(sock, interface, ip, mac)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def _drain(self, replies: Dict[str, str], wanted: set, timeout: float):
+        """Read replies for up to ``timeout`` seconds."""
+        deadline = time.perf_counter() + timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            ready, _, _ = select.select([self.sock], [], [], max(0.0, remaining))
+            if not ready:
+                return
+            while True:
+                try:
+                    frame = self.sock.recv(2048, socket.MSG_DONTWAIT)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError as e:
+                    logging.debug(f"ArpSweeper - receive failed: {e}")
+                    return
+                reply = parse_arp_reply(frame)
+                if reply and reply[0] in wanted:
+                    replies.setdefault(reply[0], reply[1])
+            if remaining <= 0:
+                return
+
+    def sweep(self, addresses: Iterable[str], window: float = ARP_REPLY_WINDOW,
+              rate: Optional[float] = ARP_SWEEP_RATE) -> Dict[str, str]:
+        """Send a request to every address and return {ip: mac} for the hosts that replied.
+
+        Requests go out in small paced chunks, replies are read in between and
+        for ``window`` seconds after the last request. The local address is
+        reported with this interface's MAC.
+        """
+        addresses = list(addresses)
+        wanted = set(addresses)
+        replies = {}
+        if self.ip in wanted:
+            replies[self.ip] = self.mac
+
+        chunk_time = ARP_SEND_CHUNK / rate if rate else 0.0
+        for start in range(0, len(addresses), ARP_SEND_CHUNK):
+            chunk_start = time.perf_counter()
+            for address in addresses[start:start + ARP_SEND_CHUNK]:
+                if address == self.ip:
+                    continue
+                frame = build_arp_request(self._src_mac, self._src_ip, socket.inet_aton(address))
+                try:
+                    self.sock.send(frame)
+                except OSError as e:
+                    logging.debug(f"ArpSweeper - send to {address} failed: {e}")
+            self._drain(replies, wanted, max(0.0, chunk_time - (time.perf_counter() - chunk_start)))
+
+        self._drain(replies, wanted, window)
+        return replies
@@ -0,0 +1,200 @@
+import random
+import socket
+import threading
+import time
+import logging
+from typing import Optional, Dict
+from .icmp import IcmpSocket, ICMP_ECHO_REPLY
+from .metrics import RunningStats
+
+PHASE_IDLE = "idle"
+PHASE_DOWNLOAD = "download"
+PHASE_UPLOAD = "upload"
+
+PROBE_INTERVAL = 0.1   # Seconds between latency probes
+PROBE_TIMEOUT = 1.0    # A probe without reply after this long counts as lost
+IDLE_DURATION = 1.0    # Seconds of idle probing before the transfers start
+
+# Latency increase under load (ms) -> grade, as used by common bufferbloat tests
+BUFFERBLOAT_GRADES = (
+    (5, "A+"),
+    (30, "A"),
+    (60, "B"),
+    (200, "C"),
+    (400, "D"),
+)
+
+
+def grade_bufferbloat(increase: Optional[float]) -> Optional[str]:
+    """Grade a latency increase under load (ms) from A+ to F."""
+    if increase is None:
+        return None
+    for limit, grade in BUFFERBLOAT_GRADES:
+        if increase < limit:
+            return grade
+    return "F"
+
+
+class LatencyProbe:
+    """Background latency prober for measuring latency under load.
+
+    Sends one probe every ``interval`` seconds from its own thread while a
+    transfer runs, using ICMP echo when a native ICMP socket is available and
+    TCP connect time to ``port`` otherwise. Echo replies are collected
+    asynchronously, so a slow reply never delays the next probe. Every probe
+    is accounted to the phase that was active when it was sent. Hosts that
+    ignore echo requests can be switched to TCP with :meth:`fall_back_to_tcp`.
+    """
+
+    def __init__(self, host: str, port: Optional[int] = None,
+                 interval: float = PROBE_INTERVAL, timeout: float = PROBE_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.timeout = timeout
+        self.phase = PHASE_IDLE
+        self.stats = {}
+        self.method = None
+        self._address = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def start(self, phase: str = PHASE_IDLE) -> bool:
+        """Start probing in the background.
+
+        Returns False if the host cannot be resolved, or if ICMP is not
+        permitted and no TCP port was given.
+        """
+        try:
+            address = socket.gethostbyname(self.host)
+        except (socket.gaierror, UnicodeError) as e:
+            logging.debug(f"LatencyProbe.start - cannot resolve {self.host}: {e}")
+            return False
+
+        icmp = IcmpSocket.open()
+        if icmp is None and not self.port:
+            return False
+        self.method = "icmp" if icmp else "tcp"
+        self._address = address
+        self.set_phase(phase)
+        self._running = True
+        target = self._run_icmp if icmp else self._run_tcp
+        self._thread = threading.Thread(target=target, args=(icmp, address) if icmp else (address,), daemon=True)
+        self._thread.start()
+        return True
+
+    def set_phase(self, phase: str):
+        """Account the following probes to ``phase``."""
+        with self._lock:
+            self.phase = phase
+            self.stats.setdefault(phase, RunningStats())
+
+    def fall_back_to_tcp(self) -> bool:
+        """Switch from ICMP echo to TCP connect probes if no echo was answered.
+
+        Many servers ignore ICMP echo, which would leave every probe lost.
+        Returns True if the probe switched; statistics collected so far are
+        discarded, so the caller should measure the idle baseline again.
+        """
+        if self.method != "icmp" or not self.port:
+            return False
+        with self._lock:
+            if any(stats.received for stats in self.stats.values()):
+                return False
+        self.stop()
+        logging.info(f"LatencyProbe - no echo replies from {self.host}, probing TCP port {self.port}")
+        with self._lock:
+            self.stats = {self.phase: RunningStats()}
+        self.method = "tcp"
+        self._running = True
+        self._thread = threading.Thread(target=self._run_tcp, args=(self._address,), daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=self.timeout + self.interval)
+            self._thread = None
+
+    def results(self) -> Dict:
+        """Return {phase: statistics} in the ping statistics format."""
+        with self._lock:
+            return {phase: stats.snapshot() for phase, stats in self.stats.items()}
+
+    def summary(self) -> Dict:
+        """Return idle vs loaded latency and the bufferbloat grade.
+
+        {'idle', 'download', 'upload'} hold the statistics of each phase,
+        '<phase>_increase' the increase of the median RTT over idle, and
+        'grade' the grade of the larger increase.
+        """
+        results = self.results()
+        summary = dict(results, method=self.method)
+        idle = results.get(PHASE_IDLE, {}).get('percentiles', {}).get('p50')
+        increases = []
+        for phase in (PHASE_DOWNLOAD, PHASE_UPLOAD):
+            loaded = results.get(phase, {}).get('percentiles', {}).get('p50')
+            if idle is not None and loaded is not None:
+                summary[f'{phase}_increase'] = max(0.0, loaded - idle)
+                increases.append(summary[f'{phase}_increase'])
+        summary['grade'] = grade_bufferbloat(max(increases)) if increases else None
+        return summary
+
+    def _record(self, phase, rtt):
+        with self._lock:
+            self.stats[phase].add(rtt)
+
+    def _run_icmp(self, icmp, address):
+        # Raw sockets see every reply on the host; give this socket an
+        # identifier of its own so a PingTester in this process cannot collide
+        if icmp.kind == 'raw':
+            icmp.identifier = random.randint(1, 0xFFFF)
+        pending = {}  # sequence -> (sent_at, phase)
+        sequence = 0
+        next_send = time.perf_counter()
+        try:
+            while self._running:
+                now = time.perf_counter()
+                if now >= next_send:
+                    sequence = (sequence + 1) & 0xFFFF
+                    try:
+                        pending[sequence] = (icmp.send_echo(address, sequence), self.phase)
+                    except OSError as e:
+                        logging.debug(f"LatencyProbe - send failed: {e}")
+                        self._record(self.phase, None)
+                    # Keep the schedule fixed; skip slots that were missed
+                    next_send += self.interval * max(1, int((now - next_send) / self.interval) + 1)
+
+                for seq, (sent_at, phase) in list(pending.items()):
+                    if now - sent_at > self.timeout:
+                        del pending[seq]
+                        self._record(phase, None)
+
+                reply = icmp.receive(max(0.0, next_send - time.perf_counter()))
+                if (reply and reply['type'] == ICMP_ECHO_REPLY and reply['address'] == address
+                        and reply['identifier'] == icmp.identifier and reply['sequence'] in pending):
+                    sent_at, phase = pending.pop(reply['sequence'])
+                    self._record(phase, (reply['recv_time'] - sent_at) * 1000)
+        finally:
+            # Probes still in flight when stopped are neither answered nor lost
+            icmp.close()
+
+    def _run_tcp(self, address):
+        next_send = time.perf_counter()
+        while self._running:
+            phase = self.phase
+            start = time.perf_counter()
+            try:
+                with socket.create_connection((address, self.port), timeout=self.timeout):
+                    rtt = (time.perf_counter() - start) * 1000
+            except OSError:
+                rtt = None
+            self._record(phase, rtt)
+            next_send += self.interval
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_send = time.perf_counter()
@@ -0,0 +1,289 @@
+import socket
+import struct
+import select
+import random
+import threading
+import time
+import ipaddress
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Dict, List, Tuple
+
+DNS_PORT = 53
+TYPE_PTR = 12
+CLASS_IN = 1
+RCODE_NXDOMAIN = 3
+
+NEGATIVE_CACHE_TTL = 60
+MAX_CACHE_TTL = 3600
+MAX_IN_FLIGHT = 128  # Outstanding queries before further lookups wait for a free slot
+
+
+def reverse_name(ip: str) -> str:
+    """Return the in-addr.arpa / ip6.arpa name of an address."""
+    return ipaddress.ip_address(ip).reverse_pointer
+
+
+def build_query(name: str, query_id: int, qtype: int = TYPE_PTR) -> bytes:
+    """Build a recursive DNS query for one name."""
+    header = struct.pack('!HHHHHH', query_id, 0x0100, 1, 0, 0, 0)
+    question = b''.join(bytes([len(label)]) + label.encode('ascii')
+                        for label in name.rstrip('.').split('.')) + b'\x00'
+    return header + question + struct.pack('!HH', qtype, CLASS_IN)
+
+
+def _read_name(data: bytes, offset: int) -> Tuple[str, int]:
+    """Read a possibly compressed domain name, returning it and the offset after it."""
+    labels = []
+    end = None
+    for _ in range(128):  # Guard against compression loops
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode('ascii', errors='replace'))
+        offset += length
+    return '.'.join(labels), end if end is not None else offset
+
+
+def parse_response(data: bytes) -> Tuple[int, int, List[Tuple[int, int, str]]]:
+    """Parse a DNS response into (query id, rcode, [(type, ttl, value)]).
+
+    Only PTR records are decoded, other record values are left empty.
+    """
+    query_id, flags, qdcount, ancount, _, _ = struct.unpack('!HHHHHH', data[:12])
+    offset = 12
+    for _ in range(qdcount):
+        _, offset = _read_name(data, offset)
+        offset += 4
+
+    answers = []
+    for _ in range(ancount):
+        _, offset = _read_name(data, offset)
+        rtype, _, ttl, rdlength = struct.unpack('!HHIH', data[offset:offset + 10])
+        offset += 10
+        value = _read_name(data, offset)[0] if rtype == TYPE_PTR else ''
+        answers.append((rtype, ttl, value))
+        offset += rdlength
+    return query_id, flags & 0x000F, answers
+
+
+class ReverseResolver:
+    """Background PTR resolver with its own UDP DNS client and a TTL cache.
+
+    Lookups are queued with :meth:`submit` and sent over one UDP socket to
+    the configured DNS servers (by default the ones reported by
+    NetworkDetector.get_dns_servers), at most ``max_in_flight`` at a time.
+    Answers, including negative ones, are cached for their TTL and delivered
+    to per-lookup callbacks from the resolver thread. Without usable DNS
+    servers, lookups fall back to socket.gethostbyaddr in a thread pool.
+
+    :meth:`close` releases the socket and worker thread but keeps the cache;
+    the next :meth:`submit` starts them again.
+    """
+
+    def __init__(self, servers: Optional[List[str]] = None, timeout: float = 2.0, retries: int = 1,
+                 max_in_flight: int = MAX_IN_FLIGHT):
+        if servers is None:
+            from .detector import NetworkDetector
+            servers = NetworkDetector().get_dns_servers()
+        self.servers = [server for server in servers if self._is_ipv4(server)]
+        self.timeout = timeout
+        self.retries = retries
+        self.max_in_flight = max(1, max_in_flight)
+
+        self._cache: Dict[str, Tuple[Optional[str], float]] = {}
+        self._lock = threading.Lock()
+        self._queue: List[str] = []
+        self._waiters: Dict[str, List[Optional[Callable]]] = {}
+        self._idle = threading.Event()
+        self._idle.set()
+        self._wakeup = threading.Event()
+        self._running = False
+        self._sock = None
+        self._thread = None
+        self._executor = None
+        self._start_lock = threading.Lock()
+        if not self.servers:
+            logging.info("ReverseResolver - no DNS servers found, using system resolver")
+        self._start()
+
+    def _start(self):
+        """Open the socket and worker thread (or the system resolver pool) if closed."""
+        with self._start_lock:
+            if self._running:
+                return
+            if self.servers:
+                self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                self._sock.setblocking(False)
+                self._running = True
+                self._thread = threading.Thread(target=self._run, args=(self._sock,), daemon=True)
+                self._thread.start()
+            else:
+                self._running = True
+                self._executor = ThreadPoolExecutor(max_workers=32)
+
+    @staticmethod
+    def _is_ipv4(value: str) -> bool:
+        try:
+            return ipaddress.ip_address(value).version == 4
+        except ValueError:
+            return False
+
+    def cached(self, ip: str) -> Tuple[bool, Optional[str]]:
+        """Return (hit, hostname) from the cache, hostname is None for negative answers."""
+        with self._lock:
+            entry = self._cache.get(ip)
+            if entry and entry[1] > time.monotonic():
+                return True, entry[0]
+        return False, None
+
+    def submit(self, ip: str, callback: Optional[Callable] = None):
+        """Queue a reverse lookup, calling callback(ip, hostname or None) when done."""
+        hit, hostname = self.cached(ip)
+        if hit:
+            if callback:
+                callback(ip, hostname)
+            return
+
+        with self._lock:
+            if ip in self._waiters:
+                self._waiters[ip].append(callback)
+                return
+            self._waiters[ip] = [callback]
+            self._idle.clear()
+
+        self._start()
+        if self._executor:
+            self._executor.submit(self._system_lookup, ip)
+        else:
+            with self._lock:
+                self._queue.append(ip)
+            self._wakeup.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until all submitted lookups are done. Returns False on timeout."""
+        return self._idle.wait(timeout)
+
+    def resolve_many(self, ips: List[str], timeout: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """Resolve several addresses concurrently and return {ip: hostname or None}."""
+        results = {}
+        for ip in ips:
+            self.submit(ip, lambda ip, hostname: results.__setitem__(ip, hostname))
+        self.wait(timeout)
+        return {ip: results.get(ip) for ip in ips}
+
+    def close(self):
+        """Stop the worker and release the socket, keeping the cache.
+
+        Lookups still pending are dropped without calling their callbacks.
+        """
+        with self._start_lock:
+            self._running = False
+            self._wakeup.set()
+            if self._thread:
+                self._thread.join(timeout=1)
+                self._thread = None
+            if self._sock:
+                self._sock.close()
+                self._sock = None
+            if self._executor:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            with self._lock:
+                self._queue = []
+                self._waiters.clear()
+                self._idle.set()
+
+    def _finish(self, ip: str, hostname: Optional[str], ttl: int):
+        with self._lock:
+            self._cache[ip] = (hostname, time.monotonic() + min(ttl, MAX_CACHE_TTL))
+            callbacks = self._waiters.pop(ip, [])
+            if not self._waiters:
+                self._idle.set()
+        for callback in callbacks:
+            if callback:
+                try:
+                    callback(ip, hostname)
+                except Exception as e:
+                    logging.error(f"ReverseResolver callback failed: {e}")
+
+    def _system_lookup(self, ip: str):
+        try:
+            hostname = socket.gethostbyaddr(ip)[0]
+        except (socket.herror, socket.gaierror, OSError):
+            hostname = None
+        self._finish(ip, hostname, NEGATIVE_CACHE_TTL if hostname is None else MAX_CACHE_TTL)
+
+    def _send(self, sock, ip: str, attempt: int, in_flight: Dict) -> None:
+        query_id = random.randrange(1 << 16)
+        while query_id in in_flight:
+            query_id = random.randrange(1 << 16)
+        server = self.servers[attempt % len(self.servers)]
+        try:
+            sock.sendto(build_query(reverse_name(ip), query_id), (server, DNS_PORT))
+        except OSError as e:
+            logging.debug(f"ReverseResolver - query for {ip} to {server} failed: {e}")
+        in_flight[query_id] = (ip, attempt, server, time.monotonic() + self.timeout)
+
+    def _run(self, sock):
+        in_flight = {}  # query id -> (ip, attempt, server, deadline)
+        while self._running:
+            # Only fill the free slots of the window; the rest stays queued
+            with self._lock:
+                free = self.max_in_flight - len(in_flight)
+                queued, self._queue = self._queue[:free], self._queue[free:]
+            for ip in queued:
+                self._send(sock, ip, 0, in_flight)
+
+            if not in_flight:
+                self._wakeup.wait(0.5)
+                self._wakeup.clear()
+                continue
+
+            now = time.monotonic()
+            for query_id, (ip, attempt, _, deadline) in list(in_flight.items()):
+                if deadline <= now:
+                    del in_flight[query_id]
+                    if attempt < self.retries:
+                        self._send(sock, ip, attempt + 1, in_flight)
+                    else:
+                        self._finish(ip, None, NEGATIVE_CACHE_TTL)
+
+            wait = min(deadline for _, _, _, deadline in in_flight.values()) - now if in_flight else 0.05
+            try:
+                ready, _, _ = select.select([sock], [], [], max(0.0, min(wait, 0.05)))
+            except (OSError, ValueError):
+                break
+            if not ready:
+                continue
+
+            while True:
+                try:
+                    data, addr = sock.recvfrom(4096)
+                except (BlockingIOError, InterruptedError):
+                    break
+                except OSError:
+                    break
+                try:
+                    query_id, rcode, answers = parse_response(data)
+                except (struct.error, IndexError):
+                    continue
+                pending = in_flight.get(query_id)
+                if not pending or pending[2] != addr[0]:
+                    continue
+                del in_flight[query_id]
+                ptr = [(ttl, value) for rtype, ttl, value in answers if rtype == TYPE_PTR]
+                if ptr:
+                    self._finish(pending[0], ptr[0][1], ptr[0][0])
+                elif rcode == RCODE_NXDOMAIN or rcode == 0:
+                    self._finish(pending[0], None, NEGATIVE_CACHE_TTL)
+                elif pending[1] < self.retries:
+                    self._send(sock, pending[0], pending[1] + 1, in_flight)
+                else:
+                    self._finish(pending[0], None, NEGATIVE_CACHE_TTL)
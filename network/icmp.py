@@ -0,0 +1,211 @@
+import os
+import select
+import socket
+import struct
+import time
+import platform
+import logging
+from typing import Optional, Dict
+
+ICMP_ECHO_REPLY = 0
+ICMP_DEST_UNREACHABLE = 3
+ICMP_ECHO_REQUEST = 8
+ICMP_TIME_EXCEEDED = 11
+
+# Linux socket options used to read the TTL of unprivileged datagram replies
+IP_RECVTTL = 12
+IP_TTL_CMSG = 2
+
+PAYLOAD_SIZE = 56
+RECEIVE_BUFFER_SIZE = 1 << 20
+
+
+def checksum(data: bytes) -> int:
+    """Compute the RFC 1071 internet checksum of a byte string."""
+    if len(data) % 2:
+        data += b'\x00'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo_request(identifier: int, sequence: int, payload_size: int = PAYLOAD_SIZE,
+                       checksum_value: Optional[int] = None) -> bytes:
+    """Build an ICMP echo request packet with a valid checksum.
+
+    When ``checksum_value`` is given, the last two payload bytes are chosen so
+    the packet checksum equals it whatever the sequence number, which keeps
+    the flow identifier seen by per-flow load balancers constant.
+    """
+    payload = struct.pack('!d', time.time()).ljust(payload_size, b'Q')
+    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, identifier & 0xFFFF, sequence & 0xFFFF)
+    if checksum_value is not None:
+        payload = payload[:-2] + b'\x00\x00'
+        partial = ~checksum(header + payload) & 0xFFFF
+        compensation = ((~checksum_value & 0xFFFF) - partial) % 0xFFFF
+        payload = payload[:-2] + struct.pack('!H', compensation)
+    packet_checksum = checksum(header + payload)
+    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, packet_checksum,
+                         identifier & 0xFFFF, sequence & 0xFFFF)
+    return header + payload
+
+
+class IcmpSocket:
+    """In-process ICMP echo socket.
+
+    Uses a raw socket when the process is permitted to open one and falls back
+    to the unprivileged ``SOCK_DGRAM`` ICMP socket on Linux/macOS. Use
+    :meth:`open` to get an instance, it returns None when neither is available.
+    """
+
+    def __init__(self, sock: socket.socket, kind: str):
+        self.sock = sock
+        self.kind = kind
+        self.identifier = os.getpid() & 0xFFFF
+        self._has_recvmsg = hasattr(sock, 'recvmsg')
+
+        # A larger receive buffer keeps replies from being dropped during sweeps
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_SIZE)
+        except OSError:
+            pass
+
+        if kind == 'dgram':
+            # The kernel rewrites the echo identifier to the bound local port
+            try:
+                self.sock.bind(('', 0))
+                self.identifier = self.sock.getsockname()[1]
+            except OSError:
+                pass
+            try:
+                self.sock.setsockopt(socket.IPPROTO_IP, IP_RECVTTL, 1)
+            except OSError:
+                self._has_recvmsg = False
+
+    @classmethod
+    def open(cls) -> Optional['IcmpSocket']:
+        """Open the best available ICMP socket, or return None if not permitted."""
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            return cls(sock, 'raw')
+        except (PermissionError, OSError) as e:
+            logging.debug(f"IcmpSocket.open - raw socket unavailable: {e}")
+
+        if platform.system().lower() != 'windows':
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+                return cls(sock, 'dgram')
+            except (PermissionError, OSError) as e:
+                logging.debug(f"IcmpSocket.open - datagram ICMP socket unavailable: {e}")
+        return None
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    def send_echo(self, address: str, sequence: int, identifier: Optional[int] = None,
+                  ttl: Optional[int] = None, checksum_value: Optional[int] = None) -> float:
+        """Send an echo request and return the perf_counter timestamp of the send."""
+        packet = build_echo_request(self.identifier if identifier is None else identifier, sequence,
+                                    checksum_value=checksum_value)
+        if ttl is not None:
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, ttl)
+        sent_at = time.perf_counter()
+        self.sock.sendto(packet, (address, 0))
+        return sent_at
+
+    def receive(self, timeout: float) -> Optional[Dict]:
+        """Wait up to ``timeout`` seconds for one ICMP message and parse it.
+
+        Returns a dict with keys: address, type, code, identifier, sequence,
+        ttl, recv_time. Errors (time exceeded, unreachable) also carry the
+        quoted_protocol, quoted_destination and quoted_length (IP total
+        length) of the probe they answer, and source_port/destination_port
+        for UDP and TCP probes. Messages that
+        cannot be parsed are skipped.
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            ready, _, _ = select.select([self.sock], [], [], remaining)
+            if not ready:
+                return None
+
+            recv_time = time.perf_counter()
+            ttl = None
+            try:
+                if self.kind == 'dgram' and self._has_recvmsg:
+                    data, ancdata, _, addr = self.sock.recvmsg(2048, socket.CMSG_SPACE(4))
+                    for level, cmsg_type, cmsg_data in ancdata:
+                        if level == socket.IPPROTO_IP and cmsg_type == IP_TTL_CMSG and len(cmsg_data) >= 4:
+                            ttl = struct.unpack('i', cmsg_data[:4])[0]
+                else:
+                    data, addr = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                continue
+            except OSError as e:
+                logging.debug(f"IcmpSocket.receive - {e}")
+                return None
+
+            message = self._parse(data, ttl)
+            if message is None:
+                continue
+            message['address'] = addr[0]
+            message['recv_time'] = recv_time
+            return message
+
+    def _parse(self, data: bytes, ttl: Optional[int]) -> Optional[Dict]:
+        """Parse an ICMP message, stripping the IP header when present."""
+        offset = 0
+        if data and data[0] >> 4 == 4:
+            # Raw sockets (and macOS datagram sockets) include the IP header
+            offset = (data[0] & 0x0F) * 4
+            ttl = data[8]
+        if len(data) < offset + 8:
+            return None
+
+        icmp_type, code, _, identifier, sequence = struct.unpack('!BBHHH', data[offset:offset + 8])
+        message = {
+            'type': icmp_type,
+            'code': code,
+            'identifier': identifier,
+            'sequence': sequence,
+            'ttl': ttl,
+        }
+
+        if icmp_type in (ICMP_DEST_UNREACHABLE, ICMP_TIME_EXCEEDED):
+            # Errors quote the original IP header and the first 8 bytes of our probe
+            quoted = data[offset + 8:]
+            if len(quoted) < 20:
+                return None
+            quoted_offset = (quoted[0] & 0x0F) * 4
+            if len(quoted) < quoted_offset + 8:
+                return None
+            message['quoted_protocol'] = quoted[9]
+            message['quoted_destination'] = socket.inet_ntoa(quoted[16:20])
+            message['quoted_length'] = struct.unpack('!H', quoted[2:4])[0]
+            if quoted[9] == socket.IPPROTO_ICMP:
+                _, _, _, identifier, sequence = struct.unpack(
+                    '!BBHHH', quoted[quoted_offset:quoted_offset + 8])
+                message['identifier'] = identifier
+                message['sequence'] = sequence
+            else:
+                message['identifier'] = None
+                message['sequence'] = None
+                message['source_port'], message['destination_port'] = struct.unpack(
+                    '!HH', quoted[quoted_offset:quoted_offset + 4])
+        elif icmp_type != ICMP_ECHO_REPLY:
+            return None
+
+        # Raw sockets see every ICMP packet on the host, filter by our identifier
+        if self.kind == 'raw' and message['identifier'] not in (None, self.identifier):
+            return None
+        return message
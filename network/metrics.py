@@ -0,0 +1,180 @@
+import math
+from typing import Dict, Optional, Iterable
+
+DEFAULT_PERCENTILES = (50, 95, 99, 99.9)
+
+
+class LatencyHistogram:
+    """Bounded-memory latency histogram with log-linear buckets.
+
+    Every bucket spans ``precision`` relative width (1% by default), so
+    percentiles are accurate to that relative error no matter how many
+    samples are added. Buckets are sparse and histograms can be merged
+    across hosts and time windows.
+    """
+
+    def __init__(self, precision: float = 0.01, lowest: float = 0.001):
+        self.precision = precision
+        self.lowest = lowest
+        self.counts: Dict[int, int] = {}
+        self.count = 0
+        self.min = None
+        self.max = None
+        self._log_base = math.log1p(precision)
+
+    def _index(self, value: float) -> int:
+        if value <= self.lowest:
+            return 0
+        return int(math.log(value / self.lowest) / self._log_base) + 1
+
+    def _value(self, index: int) -> float:
+        """Representative (geometric midpoint) value of a bucket."""
+        if index == 0:
+            return self.lowest
+        return self.lowest * math.exp((index - 0.5) * self._log_base)
+
+    def add(self, value: float, count: int = 1):
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'LatencyHistogram'):
+        """Add the samples of another histogram with the same bucket layout."""
+        if (other.precision, other.lowest) != (self.precision, self.lowest):
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Return the value below which ``percentile`` percent of samples fall."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(percentile / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def percentiles(self, percentiles: Iterable[float] = DEFAULT_PERCENTILES) -> Dict[str, float]:
+        """Return several percentiles keyed as 'p50', 'p99.9', ..."""
+        if not self.count:
+            return {}
+        return {f"p{p:g}": self.percentile(p) for p in percentiles}
+
+    def to_dict(self) -> Dict:
+        """Serializable form, suitable for JSON reports and later merging."""
+        return {
+            'precision': self.precision,
+            'lowest': self.lowest,
+            'min': self.min,
+            'max': self.max,
+            'counts': {str(index): count for index, count in sorted(self.counts.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'LatencyHistogram':
+        histogram = cls(data['precision'], data['lowest'])
+        histogram.counts = {int(index): count for index, count in data['counts'].items()}
+        histogram.count = sum(histogram.counts.values())
+        histogram.min = data.get('min')
+        histogram.max = data.get('max')
+        return histogram
+
+
+class RunningStats:
+    """Constant-memory latency statistics updated one probe at a time.
+
+    Tracks sent/received counters, Welford mean and variance, min/max, RFC 3550
+    interarrival jitter and packet loss streaks without storing samples, plus a
+    LatencyHistogram for percentiles.
+    """
+
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.jitter = 0.0
+        self.last = None
+        self.loss_streak = 0
+        self.max_loss_streak = 0
+        self.histogram = LatencyHistogram()
+
+    def add(self, rtt: Optional[float]):
+        """Record one probe, passing None for a lost probe."""
+        self.sent += 1
+        if rtt is None:
+            self.loss_streak += 1
+            self.max_loss_streak = max(self.max_loss_streak, self.loss_streak)
+            return
+
+        self.loss_streak = 0
+        self.received += 1
+        delta = rtt - self.mean
+        self.mean += delta / self.received
+        self._m2 += delta * (rtt - self.mean)
+
+        self.min = rtt if self.min is None else min(self.min, rtt)
+        self.max = rtt if self.max is None else max(self.max, rtt)
+        self.histogram.add(rtt)
+
+        # RFC 3550 section 6.4.1 smoothing of consecutive delay differences
+        if self.last is not None:
+            self.jitter += (abs(rtt - self.last) - self.jitter) / 16
+        self.last = rtt
+
+    @property
+    def lost(self) -> int:
+        return self.sent - self.received
+
+    @property
+    def std_dev(self) -> float:
+        """Sample standard deviation, matching statistics.stdev."""
+        if self.received < 2:
+            return 0.0
+        return math.sqrt(self._m2 / (self.received - 1))
+
+    def merge(self, other: 'RunningStats'):
+        """Fold another accumulator into this one (Chan et al. parallel update)."""
+        if other.received:
+            total = self.received + other.received
+            delta = other.mean - self.mean
+            self._m2 += other._m2 + delta * delta * self.received * other.received / total
+            self.mean += delta * other.received / total
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+            self.jitter = max(self.jitter, other.jitter)
+        self.sent += other.sent
+        self.received += other.received
+        self.histogram.merge(other.histogram)
+        self.max_loss_streak = max(self.max_loss_streak, other.max_loss_streak)
+
+    def snapshot(self) -> Dict:
+        """Return the current statistics in the ping results format."""
+        stats = {
+            'sent': self.sent,
+            'received': self.received,
+            'lost': self.lost,
+            'success_rate': (self.received / self.sent) * 100 if self.sent > 0 else 0,
+            'max_loss_streak': self.max_loss_streak,
+        }
+        if self.received:
+            stats.update({
+                'min_time': self.min,
+                'max_time': self.max,
+                'avg_time': self.mean,
+                'std_dev': self.std_dev,
+                'jitter': self.jitter,
+                'percentiles': self.histogram.percentiles(),
+            })
+        return stats
@@ -2,15 +2,82 @@ import subprocess
 import platform
 import time
 import socket
-import statistics
+import logging
+import ipaddress
+from collections import deque
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from .icmp import IcmpSocket, ICMP_ECHO_REPLY
+from .metrics import RunningStats
+from utils.helpers import RateLimiter
+
+MODE_INTERVAL = "interval"
+MODE_ADAPTIVE = "adaptive"
+MODE_BURST = "burst"
+PING_MODES = (MODE_INTERVAL, MODE_ADAPTIVE, MODE_BURST)
 
 class PingTester:
-    def __init__(self):
+    def __init__(self, use_native=True):
         self.platform = platform.system().lower()
+        self.use_native = use_native
+        self._icmp = None
+        self._icmp_checked = False
+        self._sequence = 0
+
+    def close(self):
+        """Release the native ICMP socket, if one was opened."""
+        if self._icmp:
+            self._icmp.close()
+            self._icmp = None
+        self._icmp_checked = False
+
+    def _get_icmp_socket(self):
+        """Open the native ICMP socket once, returning None when not permitted."""
+        if not self.use_native:
+            return None
+        if not self._icmp_checked:
+            self._icmp_checked = True
+            self._icmp = IcmpSocket.open()
+            if self._icmp is None:
+                logging.info("PingTester - native ICMP unavailable, using ping command")
+        return self._icmp
+
+    def _resolve(self, host):
+        """Resolve a host to an IPv4 address, returning None on failure."""
+        try:
+            return socket.gethostbyname(host)
+        except (socket.gaierror, UnicodeError):
+            return None
         
-    def ping_host(self, host, count=4, timeout=3, progress_callback=None):
-        """Ping a host and return detailed results"""
+    def ping_host(self, host, count=4, timeout=3, progress_callback=None,
+                  interval=1.0, mode=MODE_INTERVAL, stats_callback=None, keep_responses=True):
+        """Ping a host and return detailed results
+
+        mode selects how probes are paced:
+          - "interval": one probe every ``interval`` seconds (sub-millisecond allowed)
+          - "adaptive": the next probe is sent as soon as the previous reply arrives
+          - "burst": all probes are fired back-to-back, then replies are collected
+
+        With native ICMP, interval and burst probes go through ping_many, so
+        replies are collected while later probes are sent and a slow or lost
+        reply does not delay the schedule. The system ping command waits for
+        each reply, so without native ICMP the interval is only a minimum
+        spacing between probes.
+
+        Statistics are accumulated per probe in constant memory and, when given,
+        stats_callback receives the running statistics after every probe. Set
+        keep_responses to False for long runs to skip the per-probe response
+        list and the 'times' sample list.
+        """
+        if mode not in PING_MODES:
+            return {'error': f"Unknown ping mode: {mode}", 'host': host}
+        if mode == MODE_BURST or (mode == MODE_INTERVAL and self._get_icmp_socket() is not None):
+            result = self.ping_many([host], count, timeout, interval=0 if mode == MODE_BURST else interval,
+                                    progress_callback=progress_callback,
+                                    stats_callback=(lambda _host, stats: stats_callback(stats)) if stats_callback else None,
+                                    keep_responses=keep_responses)
+            return result.get(host, {'error': f"Could not ping host {host}", 'host': host})
+
         try:
             results = {
                 'host': host,
@@ -21,68 +88,235 @@ class PingTester:
             }
             
             times = []
-            sent = 0
-            received = 0
+            running = RunningStats()
+            address = self._resolve(host)
+            limiter = RateLimiter(interval if mode == MODE_INTERVAL else 0)
             
             for i in range(count):
-                sent += 1
-                ping_data = self._single_ping(host, timeout)
-                
-                if ping_data and ping_data.get('time') is not None:
-                    received += 1
-                    response_time = ping_data['time']
-                    ttl = ping_data.get('ttl')
-                    times.append(response_time)
-                    status = "Reply"
-                    message = f"Reply from {host}: time={response_time:.1f}ms"
-                    if ttl:
-                        message += f" TTL={ttl}"
-                else:
-                    response_time = None
-                    status = "Timeout"
-                    message = f"Request timeout for {host}"
+                limiter.wait()
+                ping_data = self._single_ping(host, timeout, address)
+                response, message = self._build_response(host, i + 1, ping_data)
+                running.add(response['time'])
                 
-                results['responses'].append({
-                    'sequence': i + 1,
-                    'time': response_time,
-                    'status': status,
-                    'ttl': ttl if 'ttl' in locals() else None
-                })
+                if keep_responses:
+                    results['responses'].append(response)
+                    if response['time'] is not None:
+                        times.append(response['time'])
                 
                 if progress_callback:
                     progress_callback(message)
-                
-                if i < count - 1:  # Don't sleep after last ping
-                    time.sleep(1)
+                if stats_callback:
+                    stats_callback(running.snapshot())
             
-            # Calculate statistics
-            lost = sent - received
-            success_rate = (received / sent) * 100 if sent > 0 else 0
-            
-            stats = {
-                'sent': sent,
-                'received': received,
-                'lost': lost,
-                'success_rate': success_rate,
-                'times': times
-            }
-            
-            if times:
-                stats.update({
-                    'min_time': min(times),
-                    'max_time': max(times),
-                    'avg_time': statistics.mean(times),
-                    'std_dev': statistics.stdev(times) if len(times) > 1 else 0
-                })
-            
-            results['statistics'] = stats
+            results['statistics'] = self._build_statistics(running, times if keep_responses else None)
             return results
             
         except Exception as e:
             return {'error': str(e), 'host': host}
+
+    def ping_many(self, hosts, count=4, timeout=3, interval=1.0, progress_callback=None,
+                  stats_callback=None, keep_responses=True, rate_limit=None):
+        """Ping several hosts concurrently and return a dict of results keyed by host.
+
+        All probes are multiplexed over the single native ICMP socket, each
+        host getting its own sequence numbers. Every value has the same shape
+        as the result of ping_host. Without native ICMP the hosts are pinged
+        in parallel threads instead.
+
+        stats_callback, when given, is called as stats_callback(host, stats)
+        with the running statistics of a host after each of its probes.
+        rate_limit caps the echo requests sent per second across all hosts,
+        which keeps large sweeps from overrunning socket buffers.
+        """
+        hosts = list(dict.fromkeys(hosts))
+        if not hosts:
+            return {}
+
+        icmp = self._get_icmp_socket()
+        if icmp is None:
+            return self._ping_many_threaded(hosts, count, timeout, interval, progress_callback,
+                                            stats_callback, keep_responses)
+
+        addresses = {}
+        names = []
+        for host in hosts:
+            try:
+                addresses[host] = str(ipaddress.IPv4Address(host))
+            except ValueError:
+                names.append(host)
+        if names:
+            with ThreadPoolExecutor(max_workers=min(32, len(names))) as executor:
+                addresses.update(zip(names, executor.map(self._resolve, names)))
+
+        results = {}
+        running = {host: RunningStats() for host in hosts}
+        for host in hosts:
+            results[host] = {
+                'host': host,
+                'count': count,
+                'responses': [],
+                'statistics': {},
+                'timestamp': datetime.now().isoformat()
+            }
+            if addresses[host] is None:
+                results[host] = {'error': f"Could not resolve host {host}", 'host': host}
+
+        # Probes in flight, keyed by (address, ICMP sequence)
+        pending = {}
+        # Probes due to be sent, as (host, probe number)
+        send_queue = deque()
+        active_hosts = [host for host in hosts if addresses[host]]
+        start = time.perf_counter()
+        next_round = 0
+        send_interval = 1.0 / rate_limit if rate_limit else 0.0
+        next_send = start
+
+        def record(host, sequence, ping_data):
+            response, message = self._build_response(host, sequence, ping_data)
+            running[host].add(response['time'])
+            if keep_responses:
+                results[host]['responses'].append(response)
+            if progress_callback:
+                progress_callback(message)
+            if stats_callback:
+                stats_callback(host, running[host].snapshot())
+
+        while next_round < count or send_queue or pending:
+            now = time.perf_counter()
+
+            if next_round < count and now >= start + next_round * interval:
+                next_round += 1
+                send_queue.extend((host, next_round) for host in active_hosts)
+
+            while send_queue and now >= next_send:
+                host, probe_number = send_queue.popleft()
+                self._sequence = (self._sequence + 1) & 0xFFFF
+                key = (addresses[host], self._sequence)
+                try:
+                    sent_at = icmp.send_echo(addresses[host], self._sequence)
+                except OSError as e:
+                    logging.debug(f"PingTester.ping_many - send to {host} failed: {e}")
+                    record(host, probe_number, None)
+                    continue
+                pending.setdefault(key, []).append((host, probe_number, sent_at))
+                if send_interval:
+                    next_send = max(next_send, now) + send_interval
+                    now = time.perf_counter()
+
+            # Expire probes whose timeout has passed. pending keeps send order,
+            # so only the oldest entries need checking.
+            while pending:
+                key, probes_for_key = next(iter(pending.items()))
+                if probes_for_key[0][2] + timeout > now:
+                    break
+                for host, sequence, _ in pending.pop(key):
+                    record(host, sequence, None)
+
+            wake_times = []
+            if pending:
+                wake_times.append(next(iter(pending.values()))[0][2] + timeout)
+            if next_round < count:
+                wake_times.append(start + next_round * interval)
+            if send_queue:
+                wake_times.append(next_send)
+            if not wake_times:
+                continue
+
+            reply = icmp.receive(max(0.0, min(wake_times) - time.perf_counter()))
+            if reply is None or reply['type'] != ICMP_ECHO_REPLY:
+                continue
+            for host, sequence, sent_at in pending.pop((reply['address'], reply['sequence']), []):
+                record(host, sequence, {"time": (reply['recv_time'] - sent_at) * 1000, "ttl": reply['ttl']})
+
+        for host in active_hosts:
+            times = None
+            if keep_responses:
+                responses = sorted(results[host]['responses'], key=lambda r: r['sequence'])
+                times = [r['time'] for r in responses if r['time'] is not None]
+                results[host]['responses'] = responses
+            results[host]['statistics'] = self._build_statistics(running[host], times)
+        return results
+
+    def _ping_many_threaded(self, hosts, count, timeout, interval, progress_callback,
+                            stats_callback, keep_responses):
+        """Fallback for ping_many that runs ping_host for each host in a thread pool."""
+        def ping_one(host):
+            host_stats_callback = None
+            if stats_callback:
+                host_stats_callback = lambda stats: stats_callback(host, stats)
+            return PingTester(use_native=False).ping_host(
+                host, count, timeout, progress_callback, interval,
+                stats_callback=host_stats_callback, keep_responses=keep_responses)
+
+        with ThreadPoolExecutor(max_workers=min(32, len(hosts))) as executor:
+            futures = {host: executor.submit(ping_one, host) for host in hosts}
+            return {host: future.result() for host, future in futures.items()}
+
+    def _build_response(self, host, sequence, ping_data):
+        """Build a response entry and its progress message from a single ping result."""
+        if ping_data and ping_data.get('time') is not None:
+            response_time = ping_data['time']
+            ttl = ping_data.get('ttl')
+            status = "Reply"
+            message = f"Reply from {host}: time={response_time:.1f}ms"
+            if ttl:
+                message += f" TTL={ttl}"
+        else:
+            response_time = None
+            ttl = None
+            status = "Timeout"
+            message = f"Request timeout for {host}"
+
+        response = {
+            'sequence': sequence,
+            'time': response_time,
+            'status': status,
+            'ttl': ttl
+        }
+        return response, message
+
+    def _build_statistics(self, running, times=None):
+        """Build the final statistics dict, including the raw samples when they were kept."""
+        stats = running.snapshot()
+        stats['histogram'] = running.histogram.to_dict()
+        if times is not None:
+            stats['times'] = times
+        return stats
     
-    def _single_ping(self, host, timeout):
-        """Perform a single ping and return response time and TTL."""
+    def _single_ping(self, host, timeout, address=None):
+        """Perform a single ping and return response time and TTL.
+
+        Uses the in-process ICMP engine when available and falls back to the
+        system ping command otherwise.
+        """
+        icmp = self._get_icmp_socket()
+        if icmp and address:
+            try:
+                return self._native_ping(icmp, address, timeout)
+            except OSError as e:
+                logging.debug(f"PingTester._native_ping - {e}, falling back to ping command")
+        return self._subprocess_ping(host, timeout)
+
+    def _native_ping(self, icmp, address, timeout):
+        """Send one echo request over the ICMP socket and wait for its reply."""
+        self._sequence = (self._sequence + 1) & 0xFFFF
+        sequence = self._sequence
+        sent_at = icmp.send_echo(address, sequence)
+        deadline = sent_at + timeout
+
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return None
+            reply = icmp.receive(remaining)
+            if reply is None:
+                return None
+            if (reply['type'] == ICMP_ECHO_REPLY and reply['sequence'] == sequence
+                    and reply['address'] == address):
+                return {"time": (reply['recv_time'] - sent_at) * 1000, "ttl": reply['ttl']}
+
+    def _subprocess_ping(self, host, timeout):
+        """Ping once using the system ping command and parse its output."""
         try:
             if self.platform == "windows":
                 cmd = ["ping", "-n", "1", "-w", str(timeout * 1000), host]
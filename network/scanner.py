@@ -1,8 +1,122 @@
 import socket
 import threading
 import ipaddress
-from typing import List, Dict, Optional, Callable
+import asyncio
+import selectors
+import errno
+import heapq
+from itertools import islice
+from typing import List, Dict, Optional, Callable, Union, Iterator, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import time
+from .services import lookup_service
+from .targets import expand_targets, HostRange
+from .ping import PingTester
+from .advanced import AdvancedDiagnostics
+from .dns_resolver import ReverseResolver
+from .arp import ArpSweeper, lookup_vendor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_CONCURRENCY = 500
+DISCOVERY_CONCURRENCY = 1024
+DISCOVERY_ICMP_RATE = 5000
+DISCOVERY_BATCH_SIZE = 4096
+DISCOVERY_PORTS = [80, 443, 22, 445, 139, 3389]
+ENGINE_ASYNCIO = "asyncio"
+ENGINE_SELECTORS = "selectors"
+SCAN_ENGINES = (ENGINE_ASYNCIO, ENGINE_SELECTORS)
+
+# connect_ex results meaning the connect is still in progress
+CONNECT_PENDING = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY, 10035}
+# Errors caused by a RST from the target, i.e. the host answered but the port is closed
+CONNECT_REFUSED = {errno.ECONNREFUSED, errno.ECONNRESET, 10061, 10054}
+
+# Floor of the adaptive connect timeout; lower values report slow open ports as filtered
+MIN_ADAPTIVE_TIMEOUT = 0.1
+ADAPTIVE_MIN_SAMPLES = 3
+
+
+def classify_connect_error(err: int) -> str:
+    """Map a connect errno to 'Open', 'Closed' (RST) or 'Filtered' (silence/ICMP error)."""
+    if err == 0:
+        return 'Open'
+    if err in CONNECT_REFUSED:
+        return 'Closed'
+    return 'Filtered'
+
+
+class AdaptiveTimeout:
+    """Per-host connect timeout derived from observed response times.
+
+    Answered connects (open or closed ports) feed an RFC 6298 style smoothed
+    RTT and variance. Once a few samples are in, the timeout becomes
+    ``max(2 * srtt, srtt + 4 * rttvar)`` bounded by ``minimum`` and the
+    configured ``maximum``, so filtered ports on fast hosts are given up on
+    long before the blind timeout.
+    """
+
+    def __init__(self, maximum: float, minimum: float = MIN_ADAPTIVE_TIMEOUT, enabled: bool = True):
+        self.maximum = maximum
+        self.minimum = min(minimum, maximum)
+        self.enabled = enabled
+        self.samples = 0
+        self.srtt = None
+        self.rttvar = None
+
+    def observe(self, rtt: float):
+        """Record the response time (seconds) of a connect that got an answer."""
+        self.samples += 1
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    def current(self) -> float:
+        """Timeout to use for the next connect."""
+        if not self.enabled or self.samples < ADAPTIVE_MIN_SAMPLES:
+            return self.maximum
+        timeout = max(2 * self.srtt, self.srtt + 4 * self.rttvar)
+        return min(self.maximum, max(self.minimum, timeout))
+
+
+def socket_budget(requested: int, reserve: int = 64) -> int:
+    """Clamp a number of simultaneous sockets to what the process fd limit allows."""
+    if resource is None:
+        # Windows has no per-process fd limit of this kind, select() caps at 512
+        return max(1, min(requested, 512))
+    try:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if hard != resource.RLIM_INFINITY and soft < min(hard, requested + reserve):
+            soft = min(hard, requested + reserve)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    except (ValueError, OSError):
+        pass
+    soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+    return max(1, min(requested, soft - reserve))
+
+
+class AsyncRateLimiter:
+    """Space out coroutine events to at most ``rate`` per second."""
+
+    def __init__(self, rate: Optional[float]):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
 
 
 class PortScanner:
@@ -13,69 +127,276 @@ class PortScanner:
         self.progress_callback = None
         self.result_callback = None
         self.results = []
+        self._last_progress = -1
+        self._total_probes = 0
         
     def scan_port(self, host: str, port: int, timeout: float = 1.0) -> Dict:
         """Scan a single port on a host."""
         try:
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             sock.settimeout(timeout)
+            started = time.perf_counter()
             result = sock.connect_ex((host, port))
+            elapsed = time.perf_counter() - started
             sock.close()
             
-            if result == 0:
-                # Try to get service name
-                try:
-                    service = socket.getservbyport(port)
-                except:
-                    service = "Unknown"
-                
-                return {
-                    'port': port,
-                    'status': 'Open',
-                    'service': service
-                }
-            else:
-                return {
-                    'port': port,
-                    'status': 'Closed',
-                    'service': None
-                }
+            status = classify_connect_error(result)
+            return self._port_result(port, status, elapsed if status != 'Filtered' else None)
         except Exception as e:
-            return {
-                'port': port,
-                'status': 'Error',
-                'service': None,
-                'error': str(e)
-            }
+            return self._port_result(port, 'Error', error=str(e))
     
+    @staticmethod
+    def _service_name(port: int) -> str:
+        """Look up the service name of a TCP port."""
+        return lookup_service(port, 'tcp')
+
     def scan_ports(self, host: str, ports: List[int], timeout: float = 1.0, 
                    progress_callback: Optional[Callable] = None,
-                   result_callback: Optional[Callable] = None):
-        """Scan multiple ports on a host with progress tracking."""
+                   result_callback: Optional[Callable] = None,
+                   concurrency: int = DEFAULT_CONCURRENCY,
+                   rate_limit: Optional[float] = None,
+                   engine: str = ENGINE_ASYNCIO,
+                   adaptive_timeout: bool = True) -> List[Dict]:
+        """Scan multiple ports on a host with progress tracking.
+
+        Up to ``concurrency`` connects are kept in flight at once (clamped to
+        the process file descriptor limit), and ``rate_limit`` caps new
+        connects per second against the host. ``engine`` selects the asyncio
+        engine or the single-threaded selectors (epoll/kqueue/select)
+        backend. progress_callback receives the completed percentage and
+        result_callback each port result as it completes.
+
+        Each port is reported as 'Open', 'Closed' (the host answered with a
+        reset) or 'Filtered' (no answer or an ICMP error), with the measured
+        connect latency in milliseconds. With ``adaptive_timeout`` the
+        timeout shrinks towards the host's observed response time, with
+        ``timeout`` as the ceiling.
+        """
+        return self.scan_job([host], ports, timeout, progress_callback, result_callback,
+                             concurrency, rate_limit, engine, adaptive_timeout)
+
+    def scan_job(self, targets: Union[str, List[str]], ports: List[int], timeout: float = 1.0,
+                 progress_callback: Optional[Callable] = None,
+                 result_callback: Optional[Callable] = None,
+                 concurrency: int = DEFAULT_CONCURRENCY,
+                 rate_limit: Optional[float] = None,
+                 engine: str = ENGINE_ASYNCIO,
+                 adaptive_timeout: bool = True) -> List[Dict]:
+        """Scan a set of ports on many hosts as a single job.
+
+        ``targets`` is anything expand_targets accepts: CIDR blocks, address
+        ranges, hostnames, or a list of them. Probes are interleaved across
+        hosts (every host's first port, then every host's second port, ...)
+        so no single target is hammered, and ``rate_limit`` and the adaptive
+        timeout apply per host. Results stream through result_callback as
+        they complete and carry a 'host' key; the other options behave as in
+        scan_ports.
+        """
+        if engine not in SCAN_ENGINES:
+            raise ValueError(f"Unknown scan engine: {engine}")
+
         self.is_scanning = True
         self.progress_callback = progress_callback
         self.result_callback = result_callback
         self.results = []
+        self._last_progress = -1
+        hosts = expand_targets(targets)
+        self._total_probes = len(hosts) * len(ports)
         
-        total_ports = len(ports)
+        try:
+            if not self._total_probes:
+                return self.results
+
+            with ThreadPoolExecutor(max_workers=min(32, len(hosts))) as executor:
+                resolved = dict(zip(hosts, executor.map(self._resolve, hosts)))
+
+            live_hosts = []
+            for host in hosts:
+                address = resolved[host]
+                if isinstance(address, Exception):
+                    for port in ports:
+                        self._report_result(self._port_result(port, 'Error', error=str(address), host=host))
+                else:
+                    live_hosts.append(host)
+
+            timeouts = {host: AdaptiveTimeout(timeout, enabled=adaptive_timeout) for host in live_hosts}
+            probes = ((host, resolved[host], port) for port in ports for host in live_hosts)
+            if engine == ENGINE_SELECTORS:
+                self._scan_ports_selectors(probes, timeouts, concurrency, rate_limit)
+            else:
+                asyncio.run(self._scan_ports_async(probes, timeouts, concurrency, rate_limit))
+        finally:
+            order = {host: index for index, host in enumerate(hosts)}
+            self.results.sort(key=lambda r: (order.get(r.get('host'), 0), r['port']))
+            self.is_scanning = False
+        return self.results
+
+    @staticmethod
+    def _resolve(host: str):
+        """Resolve a host to an IPv4 address, returning the exception on failure."""
+        try:
+            return socket.gethostbyname(host)
+        except (socket.gaierror, UnicodeError) as e:
+            return e
+
+    def _port_result(self, port: int, status: str, elapsed: Optional[float] = None,
+                     error: Optional[str] = None, host: Optional[str] = None) -> Dict:
+        """Build the result dict for one port, with latency in milliseconds."""
+        result = {
+            'port': port,
+            'status': status,
+            'service': self._service_name(port) if status == 'Open' else None,
+            'latency': round(elapsed * 1000, 3) if elapsed is not None else None
+        }
+        if host is not None:
+            result['host'] = host
+        if error:
+            result['error'] = error
+        return result
+
+    async def _scan_ports_async(self, probes: Iterator[Tuple[str, str, int]],
+                                timeouts: Dict[str, AdaptiveTimeout],
+                                concurrency: int, rate_limit: Optional[float]):
+        """Run (host, address, port) probes through a fixed pool of worker coroutines."""
+        limiters = {host: AsyncRateLimiter(rate_limit) for host in timeouts}
+
+        async def worker():
+            for host, address, port in probes:
+                if not self.is_scanning:
+                    break
+                await limiters[host].wait()
+                result = await self._probe_port_async(host, address, port, timeouts[host])
+                self._report_result(result)
+
+        workers = socket_budget(min(concurrency, self._total_probes))
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+    async def _probe_port_async(self, host: str, address: str, port: int,
+                                timeouts: AdaptiveTimeout) -> Dict:
+        """Attempt a non-blocking TCP connect to one port."""
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, (address, port)), timeouts.current())
+            status = 'Open'
+        except asyncio.TimeoutError:
+            return self._port_result(port, 'Filtered', host=host)
+        except OSError as e:
+            status = classify_connect_error(e.errno) if e.errno else 'Filtered'
+            if status == 'Filtered':
+                return self._port_result(port, status, host=host)
+        except Exception as e:
+            return self._port_result(port, 'Error', error=str(e), host=host)
+        finally:
+            sock.close()
+
+        elapsed = time.perf_counter() - started
+        timeouts.observe(elapsed)
+        return self._port_result(port, status, elapsed, host=host)
+
+    def _scan_ports_selectors(self, probes: Iterator[Tuple[str, str, int]],
+                              timeouts: Dict[str, AdaptiveTimeout],
+                              concurrency: int, rate_limit: Optional[float]):
+        """Scan from a single thread with non-blocking sockets and a selector.
+
+        A fixed budget of sockets (bounded by the fd limit) is kept in flight;
+        each connect is classified from SO_ERROR once the socket turns
+        writable, and its descriptor is recycled for the next probe.
+        """
+        budget = socket_budget(min(concurrency, self._total_probes))
+        interval = 1.0 / rate_limit if rate_limit else 0.0
+        next_slot = {host: 0.0 for host in timeouts}
+        max_timeout = max((t.maximum for t in timeouts.values()), default=1.0)
+        held = None  # next probe, waiting for its host's rate limit slot
+        exhausted = False
+
+        selector = selectors.DefaultSelector()
+        in_flight = {}  # socket -> (host, port, start time)
+        deadlines = []  # heap of (deadline, sequence, socket)
+        sequence = 0
+
+        def finish(sock, status):
+            host, port, started = in_flight.pop(sock)
+            selector.unregister(sock)
+            sock.close()
+            elapsed = None
+            if status != 'Filtered':
+                elapsed = time.perf_counter() - started
+                timeouts[host].observe(elapsed)
+            self._report_result(self._port_result(port, status, elapsed, host=host))
+
+        try:
+            while self.is_scanning:
+                now = time.perf_counter()
+
+                # Fill the socket budget with new connects
+                while not exhausted and len(in_flight) < budget:
+                    probe = held or next(probes, None)
+                    if probe is None:
+                        exhausted = True
+                        break
+                    host, address, port = probe
+                    if now < next_slot[host]:
+                        held = probe
+                        break
+                    held = None
+                    next_slot[host] = max(next_slot[host], now) + interval
+
+                    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                    sock.setblocking(False)
+                    started = time.perf_counter()
+                    err = sock.connect_ex((address, port))
+                    if err in CONNECT_PENDING:
+                        in_flight[sock] = (host, port, started)
+                        selector.register(sock, selectors.EVENT_WRITE)
+                        sequence += 1
+                        heapq.heappush(deadlines, (started + timeouts[host].current(), sequence, sock))
+                    else:
+                        sock.close()
+                        status = classify_connect_error(err)
+                        elapsed = time.perf_counter() - started if status != 'Filtered' else None
+                        self._report_result(self._port_result(port, status, elapsed, host=host))
+
+                if exhausted and not in_flight:
+                    break
+
+                wait = max_timeout
+                if deadlines:
+                    wait = min(wait, deadlines[0][0] - now)
+                if held and len(in_flight) < budget:
+                    wait = min(wait, next_slot[held[0]] - now)
+
+                for key, _ in selector.select(max(0.0, wait)):
+                    sock = key.fileobj
+                    err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    finish(sock, classify_connect_error(err))
+
+                # Expire connects that outlived the timeout
+                now = time.perf_counter()
+                while deadlines and deadlines[0][0] <= now:
+                    _, _, sock = heapq.heappop(deadlines)
+                    if sock in in_flight:
+                        finish(sock, 'Filtered')
+        finally:
+            for sock in list(in_flight):
+                selector.unregister(sock)
+                sock.close()
+            selector.close()
+
+    def _report_result(self, result: Dict):
+        """Store a result and notify callbacks, reporting progress only when it changes."""
+        self.results.append(result)
         
-        for i, port in enumerate(ports):
-            if not self.is_scanning:
-                break
-                
-            result = self.scan_port(host, port, timeout)
-            self.results.append(result)
-            
-            # Update progress
-            if self.progress_callback:
-                progress = int((i + 1) / total_ports * 100)
+        if self.progress_callback:
+            progress = int(len(self.results) / self._total_probes * 100)
+            if progress != self._last_progress:
+                self._last_progress = progress
                 self.progress_callback(progress)
-            
-            # Report result if callback provided
-            if self.result_callback:
-                self.result_callback(result)
-                
-        self.is_scanning = False
+        
+        if self.result_callback:
+            self.result_callback(result)
     
     def scan_ports_threaded(self, host: str, ports: List[int], timeout: float = 1.0,
                            progress_callback: Optional[Callable] = None,
@@ -114,6 +435,9 @@ class NetworkScanner:
     
     def __init__(self):
         self.is_scanning = False
+        self.pinger = PingTester()
+        self.port_scanner = PortScanner()
+        self.resolver = None
         
     def ping_host(self, host: str, timeout: float = 1.0) -> bool:
         """Ping a single host to check if it's alive."""
@@ -139,42 +463,147 @@ class NetworkScanner:
         except Exception:
             return False
     
-    def scan_network(self, network: str, progress_callback: Optional[Callable] = None) -> List[Dict]:
-        """Scan a network range for active devices."""
+    def scan_network(self, network: str, progress_callback: Optional[Callable] = None,
+                     timeout: float = 1.0, probe_ports: Optional[List[int]] = None,
+                     concurrency: int = DISCOVERY_CONCURRENCY,
+                     icmp_rate: Optional[float] = DISCOVERY_ICMP_RATE,
+                     exclude: Optional[Union[str, List[str]]] = None,
+                     randomize: bool = False,
+                     hostname_callback: Optional[Callable] = None,
+                     arp_sweep: bool = True) -> List[Dict]:
+        """Scan a network range for active devices.
+
+        Hosts are processed in batches through three discovery stages: the
+        local ARP cache, a concurrent ICMP echo sweep, and TCP connect probes
+        to ``probe_ports`` (a reset counts as alive too) for hosts that stayed
+        silent. Each device dict carries the discovery 'method' and the
+        'mac' and 'vendor' when known.
+
+        When the network is directly attached and the process may open
+        packet sockets, ``arp_sweep`` replaces those stages with an ARP
+        request sweep (see ArpSweeper), which finds every on-link host even
+        behind a host firewall.
+
+        Hostnames are resolved in the background by a ReverseResolver while
+        discovery continues: devices start as "Unknown" and are updated in
+        place as PTR answers arrive, with ``hostname_callback(ip, hostname)``
+        called for each one. The scan waits briefly for outstanding lookups
+        before returning.
+
+        Addresses are generated lazily, so memory stays flat for any range
+        size. ``exclude`` skips CIDR blocks, ranges or addresses and
+        ``randomize`` probes in a pseudo-random order.
+        """
         self.is_scanning = True
         devices = []
+        probe_ports = probe_ports or DISCOVERY_PORTS
+        sweeper = None
         
         try:
-            net = ipaddress.ip_network(network, strict=False)
-            hosts = list(net.hosts())
-            total_hosts = len(hosts)
+            targets = HostRange(network, exclude=exclude, randomize=randomize)
+            total_hosts = targets.size
+            arp_cache = self._arp_cache(targets.network)
+            addresses = targets.addresses()
+            if self.resolver is None:
+                self.resolver = ReverseResolver()
+            sweeper = ArpSweeper.open(targets.network) if arp_sweep else None
+            done = 0
             
-            for i, host in enumerate(hosts):
-                if not self.is_scanning:
+            while self.is_scanning:
+                batch = list(islice(addresses, DISCOVERY_BATCH_SIZE))
+                if not batch:
                     break
-                
-                host_str = str(host)
-                if self.ping_host(host_str):
-                    try:
-                        hostname = socket.gethostbyaddr(host_str)[0]
-                    except:
-                        hostname = "Unknown"
-                    
-                    devices.append({
-                        'ip': host_str,
-                        'hostname': hostname,
-                        'status': 'Active'
-                    })
-                
+                for device in self._discover_batch(batch, arp_cache, timeout, probe_ports,
+                                                   concurrency, icmp_rate, sweeper):
+                    devices.append(device)
+                    self.resolver.submit(device['ip'], self._hostname_setter(device, hostname_callback))
+                done += len(batch)
                 if progress_callback:
-                    progress = int((i + 1) / total_hosts * 100)
+                    progress = int(done / total_hosts * 100)
                     progress_callback(progress)
+
+            if self.is_scanning:
+                self.resolver.wait(self.resolver.timeout * (self.resolver.retries + 1) + 1)
                     
         except Exception as e:
             print(f"Network scan error: {e}")
+
+        finally:
+            if sweeper:
+                sweeper.close()
+            if self.resolver:
+                # Releases the socket and thread; the cache serves the next scan
+                self.resolver.close()
+            self.pinger.close()
         
         self.is_scanning = False
         return devices
+
+    def _arp_cache(self, net) -> Dict[str, str]:
+        """Return {ip: mac} for ARP cache entries inside the scanned network."""
+        cache = {}
+        for entry in AdvancedDiagnostics().get_arp_table():
+            try:
+                if ipaddress.ip_address(entry['ip']) in net:
+                    cache[entry['ip']] = entry['mac']
+            except ValueError:
+                continue
+        return cache
+
+    def _discover_batch(self, batch: List[str], arp_cache: Dict[str, str], timeout: float,
+                        probe_ports: List[int], concurrency: int,
+                        icmp_rate: Optional[float],
+                        sweeper: Optional[ArpSweeper] = None) -> List[Dict]:
+        """Run the discovery stages on one batch of addresses."""
+        if sweeper and self.is_scanning:
+            # Every on-link host answers ARP, so the sweep alone is authoritative
+            replies = sweeper.sweep(batch)
+            arp_cache.update(replies)
+            return [self._device(ip, arp_cache, 'arp-sweep') for ip in batch if ip in replies]
+
+        found = {ip: 'arp' for ip in batch if ip in arp_cache}
+
+        # ICMP echo sweep over a single socket
+        remaining = [ip for ip in batch if ip not in found]
+        if remaining and self.is_scanning:
+            ping_results = self.pinger.ping_many(remaining, count=1, timeout=timeout, interval=0,
+                                                 keep_responses=False, rate_limit=icmp_rate)
+            for ip, result in ping_results.items():
+                if result.get('statistics', {}).get('received'):
+                    found[ip] = 'icmp'
+
+        # TCP connect probes for hosts that ignore ICMP
+        remaining = [ip for ip in batch if ip not in found]
+        if remaining and self.is_scanning:
+            for result in self.port_scanner.scan_job(remaining, probe_ports, timeout,
+                                                     concurrency=concurrency,
+                                                     engine=ENGINE_SELECTORS):
+                if result['status'] in ('Open', 'Closed'):
+                    found.setdefault(result['host'], 'tcp')
+
+        return [self._device(ip, arp_cache, found[ip]) for ip in batch if ip in found]
+
+    @staticmethod
+    def _device(ip: str, arp_cache: Dict[str, str], method: str) -> Dict:
+        mac = arp_cache.get(ip)
+        return {
+            'ip': ip,
+            'hostname': "Unknown",
+            'status': 'Active',
+            'mac': mac,
+            'vendor': lookup_vendor(mac),
+            'method': method
+        }
+
+    @staticmethod
+    def _hostname_setter(device: Dict, hostname_callback: Optional[Callable]) -> Callable:
+        """Build the resolver callback that back-fills a device's hostname."""
+        def set_hostname(ip: str, hostname: Optional[str]):
+            if hostname:
+                device['hostname'] = hostname
+                if hostname_callback:
+                    hostname_callback(ip, hostname)
+        return set_hostname
     
     def scan_network_threaded(self, network: str, 
                              progress_callback: Optional[Callable] = None,
@@ -191,4 +620,5 @@ class NetworkScanner:
     
     def stop_scan(self):
         """Stop the current scan."""
-        self.is_scanning = False
\ No newline at end of file
+        self.is_scanning = False
+        self.port_scanner.stop_scan()
\ No newline at end of file
@@ -0,0 +1,166 @@
+import threading
+import logging
+from datetime import datetime, timedelta
+from typing import Optional, Callable, Dict
+from .speed_test import SpeedTester
+from .speed_history import SpeedHistory, KIND_INTERNET, KIND_LOCAL
+
+# Cron fields: name, minimum, maximum
+CRON_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),
+)
+CRON_ALIASES = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+}
+MAX_LOOKAHEAD_DAYS = 4 * 366
+
+
+class CronSchedule:
+    """Standard five-field cron expression ("minute hour day month weekday").
+
+    Fields accept ``*``, numbers, ranges ``a-b``, steps ``*/n`` or ``a-b/n``
+    and comma-separated lists; weekday 0 (or 7) is Sunday. As in cron, when
+    both day and weekday are restricted a time matches either of them.
+    """
+
+    def __init__(self, expression: str):
+        self.expression = expression.strip()
+        fields = CRON_ALIASES.get(self.expression, self.expression).split()
+        if len(fields) != len(CRON_FIELDS):
+            raise ValueError(f"Cron expression needs {len(CRON_FIELDS)} fields: {expression!r}")
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(text, name, low, high) for text, (name, low, high) in zip(fields, CRON_FIELDS))
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(text: str, name: str, low: int, high: int) -> frozenset:
+        values = set()
+        for part in text.split(","):
+            span, _, step = part.partition("/")
+            try:
+                step = int(step) if step else 1
+                if span == "*":
+                    start, end = low, high
+                elif "-" in span:
+                    start, end = (int(value) for value in span.split("-", 1))
+                else:
+                    start = end = int(span)
+                    if step > 1:
+                        end = high
+            except ValueError:
+                raise ValueError(f"Invalid cron {name} field: {text!r}") from None
+            if step < 1 or not low <= start <= end <= high:
+                raise ValueError(f"Invalid cron {name} field: {text!r}")
+            values.update(range(start, end + 1, step))
+        if name == "weekday" and 7 in values:
+            # 7 is an alias for Sunday
+            values.discard(7)
+            values.add(0)
+        return frozenset(values)
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Return the first matching minute strictly after ``moment``."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=MAX_LOOKAHEAD_DAYS)
+        while candidate < limit:
+            if candidate.month not in self.months or not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never matches: {self.expression!r}")
+
+
+class SpeedTestScheduler:
+    """Run speed tests on a cron schedule and record them in a SpeedHistory.
+
+    Tests run in a background thread. With ``local_host`` set, the local
+    throughput server is tested instead of Speedtest.net. result_callback,
+    when given, receives every result dict.
+    """
+
+    def __init__(self, schedule: str, history: Optional[SpeedHistory] = None,
+                 result_callback: Optional[Callable[[Dict], None]] = None,
+                 local_host: Optional[str] = None, **test_options):
+        self.schedule = CronSchedule(schedule)
+        # Reject expressions that can never fire before starting a thread
+        self.schedule.next_after(datetime.now())
+        self.history = history or SpeedHistory()
+        self.result_callback = result_callback
+        self.local_host = local_host
+        self.test_options = test_options
+        self.next_run = None
+        self._tester = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._tester:
+            self._tester.stop_test()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.next_run = None
+
+    def is_running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def run_once(self) -> Dict:
+        """Run one test now and record it."""
+        self._tester = SpeedTester()
+        try:
+            if self.local_host:
+                result = self._tester.perform_local_test(self.local_host, **self.test_options)
+            else:
+                result = self._tester.perform_speed_test(**self.test_options)
+        finally:
+            self._tester = None
+        if self._stop_event.is_set():
+            # Interrupted by stop(), the partial result is not evidence
+            return result
+        result['timestamp'] = datetime.now().isoformat()
+        self.history.append(result, KIND_LOCAL if self.local_host else KIND_INTERNET)
+        if self.result_callback:
+            self.result_callback(result)
+        return result
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self.next_run = self.schedule.next_after(datetime.now())
+            # Wake up at least every minute so clock changes are noticed
+            while not self._stop_event.is_set():
+                remaining = (self.next_run - datetime.now()).total_seconds()
+                if remaining <= 0:
+                    break
+                self._stop_event.wait(min(remaining, 60))
+            if self._stop_event.is_set():
+                return
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"SpeedTestScheduler - scheduled test failed: {e}")
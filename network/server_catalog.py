@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Tuple
+from http.client import HTTPException
+from .throughput import SpeedtestClient
+from .detector import NetworkDetector
+from .advanced import AdvancedDiagnostics
+from .arp import normalize_mac
+from utils.helpers import user_dir
+
+SERVER_LIST_TTL = 7 * 24 * 3600    # Seconds a fetched server list stays valid
+BEST_SERVER_TTL = 24 * 3600        # Seconds a best-server choice stays valid per network
+CATALOG_SIZE = 100                 # Closest servers kept from a fetched list
+CANDIDATE_COUNT = 10               # Closest servers probed when choosing the best
+PROBE_COUNT = 3                    # Latency requests per candidate
+CATALOG_FILENAME = "speedtest_servers.json"
+
+
+def gateway_mac() -> Optional[str]:
+    """Return the MAC address of the default gateway, if it is in the ARP table."""
+    gateways = [gw for gw in NetworkDetector().get_default_gateway() if gw != "N/A"]
+    if not gateways:
+        return None
+    for entry in AdvancedDiagnostics().get_arp_table():
+        if entry.get('ip') in gateways and entry.get('mac'):
+            mac = normalize_mac(entry['mac'])
+            if mac not in ("00:00:00:00:00:00", "FF:FF:FF:FF:FF:FF"):
+                return mac
+    return None
+
+
+def network_key(public_ip: Optional[str] = None) -> Optional[str]:
+    """Identify the current network by its gateway MAC, or else by public IP."""
+    try:
+        mac = gateway_mac()
+    except Exception as e:
+        logging.debug(f"network_key - gateway lookup failed: {e}")
+        mac = None
+    if mac:
+        return f"gateway:{mac}"
+    return f"public:{public_ip}" if public_ip else None
+
+
+def client_location(config: Dict) -> Optional[str]:
+    """Return the client position from a speedtest config, rounded to about 10 km."""
+    client = config.get('client', {})
+    try:
+        return f"{float(client['lat']):.1f},{float(client['lon']):.1f}"
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def probe_servers(servers: List[Dict], count: int = PROBE_COUNT) -> List[Tuple[float, Dict]]:
+    """Measure the latency of all servers concurrently.
+
+    Returns (best latency in ms, server) for every server that answered,
+    fastest first.
+    """
+    def probe(server):
+        try:
+            times = SpeedtestClient(server['url']).latency(count)
+        except (OSError, ValueError, KeyError, HTTPException) as e:
+            logging.debug(f"probe_servers - {server.get('host')}: {e}")
+            return None
+        return (min(times), server) if times else None
+
+    if not servers:
+        return []
+    with ThreadPoolExecutor(max_workers=len(servers)) as executor:
+        results = [result for result in executor.map(probe, servers) if result]
+    return sorted(results, key=lambda item: item[0])
+
+
+class ServerCatalog:
+    """Persisted Speedtest.net server list and best-server choices.
+
+    The closest servers of the last fetched list are kept for
+    ``list_ttl`` seconds, and the best server found for each network for
+    ``best_ttl`` seconds, in one JSON file in the user cache directory.
+    """
+
+    def __init__(self, path: Optional[str] = None, list_ttl: float = SERVER_LIST_TTL,
+                 best_ttl: float = BEST_SERVER_TTL):
+        self.path = path or os.path.join(user_dir("cache"), CATALOG_FILENAME)
+        self.list_ttl = list_ttl
+        self.best_ttl = best_ttl
+        self.data = self._load()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                return data
+        except (OSError, ValueError) as e:
+            logging.debug(f"ServerCatalog - no usable catalog at {self.path}: {e}")
+        return {}
+
+    def save(self):
+        """Write the catalog atomically, ignoring unwritable locations."""
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            logging.warning(f"ServerCatalog - cannot save {self.path}: {e}")
+
+    def servers(self, location: Optional[str] = None) -> Optional[List[Dict]]:
+        """Return the cached servers, closest first.
+
+        Returns None if there is no list, it expired, or it was fetched from
+        another ``location`` (distances are relative to the client).
+        """
+        entry = self.data.get('servers')
+        if not entry or time.time() - entry.get('fetched', 0) > self.list_ttl:
+            return None
+        if location and entry.get('location') not in (None, location):
+            return None
+        return entry.get('items') or None
+
+    def store_servers(self, servers: List[Dict], location: Optional[str] = None):
+        """Keep the closest CATALOG_SIZE servers of a fetched list."""
+        items = sorted(servers, key=lambda server: server.get('d', float('inf')))[:CATALOG_SIZE]
+        self.data['servers'] = {'fetched': time.time(), 'location': location, 'items': items}
+        self.save()
+
+    def best(self, key: Optional[str]) -> Optional[Dict]:
+        """Return the best server chosen on network ``key`` if still valid."""
+        entry = self.data.get('best', {}).get(key) if key else None
+        if not entry or time.time() - entry.get('chosen', 0) > self.best_ttl:
+            return None
+        return entry.get('server')
+
+    def store_best(self, key: Optional[str], server: Dict, latency: float):
+        if not key:
+            return
+        self.data.setdefault('best', {})[key] = {'server': server, 'latency': latency, 'chosen': time.time()}
+        self.save()
+
+    def forget_best(self, key: Optional[str]):
+        if key and self.data.get('best', {}).pop(key, None) is not None:
+            self.save()
@@ -0,0 +1,99 @@
+import os
+import platform
+import logging
+from types import MappingProxyType
+from typing import Dict, Tuple, Mapping
+
+# Bundled names for the ports in PortScanner.get_common_ports() and other
+# well-known services, so lookups work even without a system services file.
+BUNDLED_SERVICES = {
+    (20, 'tcp'): 'ftp-data',
+    (21, 'tcp'): 'ftp',
+    (22, 'tcp'): 'ssh',
+    (23, 'tcp'): 'telnet',
+    (25, 'tcp'): 'smtp',
+    (53, 'tcp'): 'domain',
+    (53, 'udp'): 'domain',
+    (67, 'udp'): 'bootps',
+    (68, 'udp'): 'bootpc',
+    (69, 'udp'): 'tftp',
+    (80, 'tcp'): 'http',
+    (110, 'tcp'): 'pop3',
+    (123, 'udp'): 'ntp',
+    (137, 'udp'): 'netbios-ns',
+    (138, 'udp'): 'netbios-dgm',
+    (139, 'tcp'): 'netbios-ssn',
+    (143, 'tcp'): 'imap',
+    (161, 'udp'): 'snmp',
+    (162, 'udp'): 'snmptrap',
+    (389, 'tcp'): 'ldap',
+    (443, 'tcp'): 'https',
+    (445, 'tcp'): 'microsoft-ds',
+    (465, 'tcp'): 'submissions',
+    (514, 'udp'): 'syslog',
+    (587, 'tcp'): 'submission',
+    (636, 'tcp'): 'ldaps',
+    (989, 'tcp'): 'ftps-data',
+    (990, 'tcp'): 'ftps',
+    (993, 'tcp'): 'imaps',
+    (995, 'tcp'): 'pop3s',
+    (1433, 'tcp'): 'ms-sql-s',
+    (1521, 'tcp'): 'oracle',
+    (1900, 'udp'): 'ssdp',
+    (3000, 'tcp'): 'hbci',
+    (3306, 'tcp'): 'mysql',
+    (3389, 'tcp'): 'ms-wbt-server',
+    (5000, 'tcp'): 'commplex-main',
+    (5353, 'udp'): 'mdns',
+    (5432, 'tcp'): 'postgresql',
+    (5900, 'tcp'): 'vnc',
+    (5901, 'tcp'): 'vnc-1',
+    (6379, 'tcp'): 'redis',
+    (8000, 'tcp'): 'http-alt',
+    (8080, 'tcp'): 'http-proxy',
+    (8443, 'tcp'): 'https-alt',
+    (27017, 'tcp'): 'mongodb',
+}
+
+
+def _services_file_path() -> str:
+    if platform.system().lower() == 'windows':
+        system_root = os.environ.get('SystemRoot', r'C:\Windows')
+        return os.path.join(system_root, 'System32', 'drivers', 'etc', 'services')
+    return '/etc/services'
+
+
+def parse_services_file(path: str) -> Dict[Tuple[int, str], str]:
+    """Parse a services(5) file into a {(port, protocol): name} dict."""
+    services = {}
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                parts = line.split()
+                if len(parts) < 2 or '/' not in parts[1]:
+                    continue
+                port, protocol = parts[1].split('/', 1)
+                if not port.isdigit():
+                    continue
+                # Keep the first (canonical) name when a port is listed twice
+                services.setdefault((int(port), protocol.lower()), parts[0])
+    except OSError as e:
+        logging.debug(f"parse_services_file - {e}")
+    return services
+
+
+def _build_index() -> Mapping[Tuple[int, str], str]:
+    index = parse_services_file(_services_file_path())
+    for key, name in BUNDLED_SERVICES.items():
+        index.setdefault(key, name)
+    return MappingProxyType(index)
+
+
+# Immutable (port, protocol) -> service name index, built once at import
+SERVICES = _build_index()
+
+
+def lookup_service(port: int, protocol: str = 'tcp', default: str = "Unknown") -> str:
+    """Return the service name for a port and protocol ('tcp' or 'udp')."""
+    return SERVICES.get((port, protocol), default)
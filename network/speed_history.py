@@ -0,0 +1,162 @@
+import os
+import math
+import struct
+import threading
+import logging
+from datetime import datetime
+from typing import Optional, Dict, List, Iterator
+from utils.helpers import user_dir
+
+HISTORY_FILENAME = "speed_history.bin"
+
+# File header: magic, format version, record size
+HEADER = struct.Struct('<4sHH')
+MAGIC = b'NTSH'
+VERSION = 1
+
+# Record: unix time, download/upload Mbps, ping ms, loaded latency increase ms, test kind, flags
+RECORD = struct.Struct('<Iffffbb')
+
+KIND_INTERNET = 0
+KIND_LOCAL = 1
+KIND_NAMES = {KIND_INTERNET: "internet", KIND_LOCAL: "local"}
+
+FLAG_ERROR = 0x01
+
+PERIOD_HOUR = "hour"
+PERIOD_DAY = "day"
+
+
+def record_from_result(result: Dict, kind: int = KIND_INTERNET, timestamp: Optional[float] = None) -> tuple:
+    """Build a record tuple from a SpeedTester result."""
+    latency = result.get('loaded_latency') or {}
+    increases = [latency[key] for key in ('download_increase', 'upload_increase') if key in latency]
+    return (
+        int(timestamp if timestamp is not None else datetime.now().timestamp()),
+        float(result.get('download_speed') or 0.0),
+        float(result.get('upload_speed') or 0.0),
+        float(result.get('ping') or 0.0),
+        max(increases) if increases else math.nan,
+        kind,
+        FLAG_ERROR if result.get('error') else 0,
+    )
+
+
+class SpeedHistory:
+    """Append-only store of speed test results.
+
+    Every result is one fixed-size binary record (22 bytes) appended to a
+    single file, so weeks of hourly tests stay in the kilobytes. Records are
+    in time order, which lets range queries binary search the file instead
+    of reading all of it.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(user_dir("data"), HISTORY_FILENAME)
+        self._lock = threading.Lock()
+
+    def append(self, result: Dict, kind: int = KIND_INTERNET, timestamp: Optional[float] = None):
+        """Append one SpeedTester result."""
+        record = RECORD.pack(*record_from_result(result, kind, timestamp))
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, 'ab') as f:
+                size = f.seek(0, os.SEEK_END)
+                if size < HEADER.size:
+                    f.truncate(0)
+                    f.write(HEADER.pack(MAGIC, VERSION, RECORD.size))
+                elif (size - HEADER.size) % RECORD.size:
+                    # Drop a record torn by an interrupted write
+                    f.truncate(size - (size - HEADER.size) % RECORD.size)
+                f.write(record)
+
+    def records(self, start: Optional[float] = None, end: Optional[float] = None) -> Iterator[Dict]:
+        """Yield the records with start <= timestamp < end, oldest first."""
+        with self._lock:
+            try:
+                f = open(self.path, 'rb')
+            except FileNotFoundError:
+                return
+        with f:
+            if not self._check_header(f):
+                return
+            count = (os.fstat(f.fileno()).st_size - HEADER.size) // RECORD.size
+            first = self._search(f, count, start) if start is not None else 0
+            last = self._search(f, count, end) if end is not None else count
+            f.seek(HEADER.size + first * RECORD.size)
+            data = f.read((last - first) * RECORD.size)
+        for timestamp, download, upload, ping, bufferbloat, kind, flags in RECORD.iter_unpack(data):
+            yield {
+                'timestamp': timestamp,
+                'download_speed': download,
+                'upload_speed': upload,
+                'ping': ping,
+                'latency_increase': None if math.isnan(bufferbloat) else bufferbloat,
+                'kind': KIND_NAMES.get(kind, str(kind)),
+                'error': bool(flags & FLAG_ERROR),
+            }
+
+    def aggregate(self, period: str = PERIOD_HOUR, start: Optional[float] = None,
+                  end: Optional[float] = None, kind: Optional[str] = None) -> List[Dict]:
+        """Summarize the records per local hour or day.
+
+        Returns one dict per period with results, oldest first: 'period'
+        (start as datetime), 'tests', 'failures', and avg/min/max of
+        download_speed, upload_speed and ping over the successful tests,
+        plus the largest 'latency_increase'.
+        """
+        if period not in (PERIOD_HOUR, PERIOD_DAY):
+            raise ValueError(f"Unknown period: {period}")
+        buckets = {}
+        for record in self.records(start, end):
+            if kind and record['kind'] != kind:
+                continue
+            moment = datetime.fromtimestamp(record['timestamp'])
+            moment = moment.replace(minute=0, second=0) if period == PERIOD_HOUR else \
+                moment.replace(hour=0, minute=0, second=0)
+            bucket = buckets.setdefault(moment, {'period': moment, 'tests': 0, 'failures': 0, 'latency_increase': None})
+            bucket['tests'] += 1
+            if record['error']:
+                bucket['failures'] += 1
+                continue
+            for field in ('download_speed', 'upload_speed', 'ping'):
+                value = record[field]
+                bucket[f'{field}_sum'] = bucket.get(f'{field}_sum', 0.0) + value
+                bucket[f'{field}_min'] = min(bucket.get(f'{field}_min', value), value)
+                bucket[f'{field}_max'] = max(bucket.get(f'{field}_max', value), value)
+            if record['latency_increase'] is not None:
+                bucket['latency_increase'] = max(bucket['latency_increase'] or 0.0, record['latency_increase'])
+
+        summaries = []
+        for moment in sorted(buckets):
+            bucket = buckets[moment]
+            successes = bucket['tests'] - bucket['failures']
+            for field in ('download_speed', 'upload_speed', 'ping'):
+                total = bucket.pop(f'{field}_sum', None)
+                bucket[f'{field}_avg'] = total / successes if successes else None
+                bucket.setdefault(f'{field}_min', None)
+                bucket.setdefault(f'{field}_max', None)
+            summaries.append(bucket)
+        return summaries
+
+    def _check_header(self, f) -> bool:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return False
+        magic, version, record_size = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            logging.warning(f"SpeedHistory - {self.path} is not a version {VERSION} history file")
+            return False
+        return True
+
+    def _search(self, f, count: int, timestamp: float) -> int:
+        """Return the index of the first record at or after ``timestamp``."""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            f.seek(HEADER.size + middle * RECORD.size)
+            if struct.unpack('<I', f.read(4))[0] < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
@@ -1,7 +1,14 @@
 import threading
 import time
+import logging
 from typing import Optional, Callable, Dict
+from http.client import HTTPException
 import speedtest
+from .bufferbloat import LatencyProbe, IDLE_DURATION, PHASE_DOWNLOAD, PHASE_UPLOAD
+from .ping import PingTester
+from .server_catalog import (ServerCatalog, network_key, client_location, probe_servers,
+                             CANDIDATE_COUNT, PROBE_COUNT)
+from .throughput import ThroughputClient, SpeedtestClient, PROTOCOL_TCP, DEFAULT_STREAMS, DEFAULT_DURATION
 
 
 class SpeedTester:
@@ -13,9 +20,26 @@ class SpeedTester:
         self.ping_latency = 0.0
         self.server_info = {}
         self.is_testing = False
+        self._client = None
+        self.catalog = None
         
-    def perform_speed_test(self, progress_callback: Optional[Callable] = None) -> Dict:
-        """Perform a complete speed test with progress tracking."""
+    def perform_speed_test(self, progress_callback: Optional[Callable] = None,
+                           streams: int = DEFAULT_STREAMS, duration: float = DEFAULT_DURATION,
+                           refresh_servers: bool = False) -> Dict:
+        """Perform a complete speed test with progress tracking.
+
+        Download and upload run over ``streams`` parallel connections to the
+        selected server for ``duration`` seconds each and report the
+        steady-state rate after TCP ramp-up; see _record_transfer for the
+        extra result keys. The speedtest library's own transfer is used if
+        the server does not accept the parallel streams.
+
+        Latency is probed in the background before and during the transfers;
+        see _finish_latency_probe for the loaded latency result keys.
+
+        The server list and the best server per network are cached (see
+        _select_server); refresh_servers forces a new selection.
+        """
         self.is_testing = True
         results = {
             'download_speed': 0.0,
@@ -45,14 +69,14 @@ class SpeedTester:
             self.is_testing = False
             return results
         
+        probe = None
         try:
             
             if progress_callback:
                 progress_callback(20, "Finding best server...")
             
-            # Get best server
-            st.get_best_server()
-            server_info = st.results.server
+            # Get best server, from the catalog when possible
+            server_info = self._select_server(st, refresh_servers)
             
             results['server'] = {
                 'name': server_info.get('name', 'Unknown'),
@@ -75,14 +99,17 @@ class SpeedTester:
             if not self.is_testing:
                 return results
             
+            # Probe latency while idle, then keep probing under load
+            self._client = client = SpeedtestClient(server_info['url'], streams, duration)
+            probe = self._start_latency_probe(client.host, client.port, progress_callback, 35)
+            
             if progress_callback:
                 progress_callback(40, "Testing download speed...")
             
-            # Test download with progress tracking
-            download_result = st.download(callback=self._create_progress_callback(
-                progress_callback, 40, 70, "Testing download speed..."
-            ))
-            results['download_speed'] = round(download_result / 1_000_000, 2)  # Convert to Mbps
+            # Test download over parallel streams with progress tracking
+            if probe:
+                probe.set_phase(PHASE_DOWNLOAD)
+            self._transfer(results, "download", client.download, st.download, progress_callback, 40, 70)
             self.download_speed = results['download_speed']
             
             if not self.is_testing:
@@ -91,11 +118,10 @@ class SpeedTester:
             if progress_callback:
                 progress_callback(70, "Testing upload speed...")
             
-            # Test upload with progress tracking
-            upload_result = st.upload(callback=self._create_progress_callback(
-                progress_callback, 70, 95, "Testing upload speed..."
-            ))
-            results['upload_speed'] = round(upload_result / 1_000_000, 2)  # Convert to Mbps
+            # Test upload over parallel streams with progress tracking
+            if probe:
+                probe.set_phase(PHASE_UPLOAD)
+            self._transfer(results, "upload", client.upload, st.upload, progress_callback, 70, 95)
             self.upload_speed = results['upload_speed']
             
             if progress_callback:
@@ -109,10 +135,195 @@ class SpeedTester:
             results['error'] = f"An unexpected error occurred: {str(e)}"
             if progress_callback:
                 progress_callback(100, f"Error: {str(e)}")
+        finally:
+            if probe:
+                self._finish_latency_probe(probe, results)
         
+        self._client = None
         self.is_testing = False
         return results
+
+    def _select_server(self, st, refresh: bool = False) -> Dict:
+        """Choose the test server and set it as the library's best server.
+
+        The best server found on this network (gateway MAC, else public IP)
+        is reused while its catalog entry is valid and it still answers.
+        Otherwise the closest servers of the cached (or freshly fetched)
+        server list are probed concurrently and the fastest is remembered.
+        """
+        if self.catalog is None:
+            self.catalog = ServerCatalog()
+        key = network_key(st.config.get('client', {}).get('ip'))
+
+        server, latency = (None if refresh else self.catalog.best(key)), None
+        if server:
+            ranked = probe_servers([server], PROBE_COUNT)
+            if ranked:
+                latency = ranked[0][0]
+                logging.info(f"SpeedTester - using cached server {server.get('host')}")
+            else:
+                self.catalog.forget_best(key)
+                server = None
+
+        if server is None:
+            location = client_location(st.config)
+            servers = None if refresh else self.catalog.servers(location)
+            if servers is None:
+                st.get_servers()
+                servers = [item for group in st.servers.values() for item in group]
+                self.catalog.store_servers(servers, location)
+                servers = self.catalog.servers(location) or servers
+            ranked = probe_servers(servers[:CANDIDATE_COUNT], PROBE_COUNT)
+            if not ranked:
+                # Let the library ping its own candidates as a last resort
+                st.get_best_server()
+                return st.results.server
+            latency, server = ranked[0]
+            self.catalog.store_best(key, server, latency)
+
+        # The library's own download/upload fallback reads _best
+        st._best = server
+        st.results.server = server
+        st.results.ping = latency
+        return server
+
+    def _transfer(self, results: Dict, direction: str, run: Callable, fallback: Callable,
+                  progress_callback: Optional[Callable], start_progress: int, end_progress: int):
+        """Measure one direction with the stream engine, falling back to the speedtest library."""
+        message = f"Testing {direction} speed..."
+        result = run(self._create_local_progress_callback(progress_callback, start_progress, end_progress, message))
+        if (result.get('error') or not result['bytes']) and self.is_testing:
+            logging.warning(f"SpeedTester - parallel {direction} failed ({result.get('error')}), "
+                            f"using single-request test")
+            speed = fallback(callback=self._create_progress_callback(
+                progress_callback, start_progress, end_progress, message))
+            results[f'{direction}_speed'] = round(speed / 1_000_000, 2)  # Convert to Mbps
+            return
+        self._record_transfer(results, direction, result)
+
+    @staticmethod
+    def _record_transfer(results: Dict, direction: str, result: Dict):
+        """Store a ThroughputClient result.
+
+        Adds '<direction>_speed' (steady-state Mbps), '<direction>_average'
+        (Mbps including ramp-up) and '<direction>_series' (Mbps per
+        '<direction>_interval' seconds) plus 'streams'.
+        """
+        results[f'{direction}_speed'] = round(result['mbps'], 2)
+        results[f'{direction}_average'] = round(result['average_mbps'], 2)
+        results[f'{direction}_series'] = [round(mbps, 2) for mbps in result['series']]
+        results[f'{direction}_interval'] = result['interval']
+        results['streams'] = result['streams']
     
+    def perform_local_test(self, host: str, port: Optional[int] = None, protocol: str = PROTOCOL_TCP,
+                           streams: int = DEFAULT_STREAMS, duration: float = DEFAULT_DURATION,
+                           progress_callback: Optional[Callable] = None) -> Dict:
+        """Measure download/upload against a self-hosted ThroughputServer.
+
+        Uses ``streams`` parallel connections per direction and returns the
+        same result format as perform_speed_test.
+        """
+        self.is_testing = True
+        results = {
+            'download_speed': 0.0,
+            'upload_speed': 0.0,
+            'ping': 0.0,
+            'server': {'name': host, 'sponsor': 'Local server', 'country': '', 'distance': 0},
+            'error': None
+        }
+        probe = None
+
+        try:
+            self._client = client = ThroughputClient(host, port, protocol, streams, duration)
+            results['server']['name'] = f"{host}:{client.port} ({protocol.upper()})"
+            if progress_callback:
+                progress_callback(10, f"Connecting to {host}:{client.port}...")
+
+            times = client.latency()
+            if times:
+                results['ping'] = round(min(times), 2)
+                self.ping_latency = results['ping']
+            probe = self._start_latency_probe(host, client.port, progress_callback, 15)
+
+            for name, run, start, end in (("download", client.download, 20, 60),
+                                          ("upload", client.upload, 60, 95)):
+                if not self.is_testing:
+                    break
+                if probe:
+                    probe.set_phase(name)
+                message = f"Testing {name} speed ({streams} streams)..."
+                if progress_callback:
+                    progress_callback(start, message)
+                result = run(self._create_local_progress_callback(progress_callback, start, end, message))
+                if result.get('error'):
+                    raise ConnectionError(result['error'])
+                self._record_transfer(results, name, result)
+
+            self.download_speed = results['download_speed']
+            self.upload_speed = results['upload_speed']
+            self.server_info = results['server']
+            if progress_callback:
+                progress_callback(100, "Speed test completed!")
+
+        except (ConnectionError, OSError, HTTPException, ValueError) as e:
+            results['error'] = f"Local server error: {str(e)}"
+            if progress_callback:
+                progress_callback(100, f"Error: {str(e)}")
+        finally:
+            if probe:
+                self._finish_latency_probe(probe, results)
+
+        self._client = None
+        self.is_testing = False
+        return results
+
+    def _start_latency_probe(self, host: str, port: int, progress_callback: Optional[Callable],
+                             progress: int) -> Optional[LatencyProbe]:
+        """Start background latency probes and collect the idle baseline."""
+        probe = LatencyProbe(host, port)
+        if not probe.start():
+            logging.info(f"SpeedTester - cannot probe latency to {host}, skipping loaded latency")
+            return None
+        if progress_callback:
+            progress_callback(progress, "Measuring idle latency...")
+        self._wait_idle()
+        # The server may ignore ICMP echo; measure the baseline again over TCP
+        if self.is_testing and probe.fall_back_to_tcp():
+            if progress_callback:
+                progress_callback(progress, "No ping replies, measuring idle latency over TCP...")
+            self._wait_idle()
+        return probe
+
+    def _wait_idle(self):
+        deadline = time.perf_counter() + IDLE_DURATION
+        while self.is_testing and time.perf_counter() < deadline:
+            time.sleep(0.05)
+
+    @staticmethod
+    def _finish_latency_probe(probe: LatencyProbe, results: Dict):
+        """Stop the probes and store their results.
+
+        Adds 'loaded_latency' (idle/download/upload statistics with
+        percentiles, the median increase per direction and the probe method)
+        and 'bufferbloat' (grade A+ to F, None without a baseline).
+        """
+        probe.stop()
+        summary = probe.summary()
+        results['loaded_latency'] = summary
+        results['bufferbloat'] = summary['grade']
+
+    def _create_local_progress_callback(self, main_callback: Optional[Callable],
+                                        start_progress: int, end_progress: int, message: str):
+        """Create a progress callback for ThroughputClient transfers."""
+        if not main_callback:
+            return None
+
+        def callback(fraction, mbps):
+            progress = start_progress + int(fraction * (end_progress - start_progress))
+            main_callback(min(progress, end_progress), f"{message} {mbps:.1f} Mbps")
+
+        return callback
+
     def _create_progress_callback(self, main_callback: Optional[Callable], 
                                 start_progress: int, end_progress: int, message: str):
         """Create a progress callback for download/upload operations."""
@@ -147,6 +358,8 @@ class SpeedTester:
     def stop_test(self):
         """Stop the current speed test."""
         self.is_testing = False
+        if self._client:
+            self._client.stop()
     
     def get_results(self) -> Dict:
         """Get the last test results."""
@@ -158,54 +371,35 @@ class SpeedTester:
         }
     
     def test_latency(self, host: str = "8.8.8.8", count: int = 4) -> Dict:
-        """Test network latency to a specific host."""
-        import subprocess
-        import platform
-        import re
-        
+        """Test network latency to a specific host.
+
+        Uses PingTester (in-process ICMP when permitted, the ping command
+        otherwise) and reports packet loss, jitter and latency percentiles
+        next to the min/avg/max values.
+        """
+        tester = PingTester()
         try:
-            # Determine ping command based on OS
-            if platform.system().lower() == 'windows':
-                cmd = ['ping', '-n', str(count), host]
-            else:
-                cmd = ['ping', '-c', str(count), host]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                output = result.stdout
-                
-                # Extract latency values (this is OS-specific)
-                if platform.system().lower() == 'windows':
-                    times = re.findall(r'time[<=](\d+)ms', output)
-                else:
-                    times = re.findall(r'time=(\d+\.?\d*)', output)
-                
-                if times:
-                    latencies = [float(t) for t in times]
-                    return {
-                        'avg_latency': round(sum(latencies) / len(latencies), 2),
-                        'min_latency': round(min(latencies), 2),
-                        'max_latency': round(max(latencies), 2),
-                        'packet_loss': 0,  # Could be extracted from ping output
-                        'host': host
-                    }
-            
+            result = tester.ping_host(host, count=count, timeout=2, interval=0.2, keep_responses=False)
+        finally:
+            tester.close()
+
+        stats = result.get('statistics', {})
+        if 'error' in result or not stats.get('received'):
             return {
                 'avg_latency': 0,
                 'min_latency': 0,
                 'max_latency': 0,
                 'packet_loss': 100,
                 'host': host,
-                'error': 'Failed to ping host'
+                'error': result.get('error', 'Failed to ping host')
             }
-            
-        except Exception as e:
-            return {
-                'avg_latency': 0,
-                'min_latency': 0,
-                'max_latency': 0,
-                'packet_loss': 100,
-                'host': host,
-                'error': str(e)
-            }
\ No newline at end of file
+
+        return {
+            'avg_latency': round(stats['avg_time'], 2),
+            'min_latency': round(stats['min_time'], 2),
+            'max_latency': round(stats['max_time'], 2),
+            'jitter': round(stats['jitter'], 2),
+            'percentiles': {name: round(value, 2) for name, value in stats['percentiles'].items()},
+            'packet_loss': round(100 - stats['success_rate'], 1),
+            'host': host
+        }
@@ -0,0 +1,193 @@
+import ipaddress
+import bisect
+import random
+from typing import List, Union, Iterable, Iterator, Optional, Tuple
+
+
+def _split_spec(spec: Union[str, Iterable[str]]) -> List[str]:
+    if isinstance(spec, str):
+        spec = spec.replace(',', ' ').replace(';', ' ').split()
+    return [part.strip() for part in spec if part and part.strip()]
+
+
+def _range_bounds(part: str) -> Tuple[int, int]:
+    """Return the first and last address of '10.0.0.5-10.0.0.20' or '10.0.0.5-20' as integers."""
+    start_str, end_str = part.split('-', 1)
+    start = ipaddress.IPv4Address(start_str.strip())
+    end_str = end_str.strip()
+    if end_str.isdigit():
+        end = ipaddress.IPv4Address(start_str.rsplit('.', 1)[0] + '.' + end_str)
+    else:
+        end = ipaddress.IPv4Address(end_str)
+    if end < start:
+        raise ValueError(f"Invalid address range: {part}")
+    return int(start), int(end)
+
+
+def _expand_range(part: str) -> List[str]:
+    """Expand '10.0.0.5-10.0.0.20' or the short form '10.0.0.5-20'."""
+    start, end = _range_bounds(part)
+    return [str(ipaddress.IPv4Address(value)) for value in range(start, end + 1)]
+
+
+def _is_range(part: str) -> bool:
+    return '-' in part and part.replace('-', '').replace('.', '').isdigit()
+
+
+def expand_targets(spec: Union[str, Iterable[str]]) -> List[str]:
+    """Expand a target specification into a list of hosts.
+
+    Accepts a string or a list of entries, each one of:
+      - a CIDR block, e.g. "192.168.1.0/24" (network/broadcast excluded)
+      - an address range, e.g. "10.0.0.5-10.0.0.20" or "10.0.0.5-20"
+      - a single IP address or hostname
+    String entries may be separated by commas, semicolons or whitespace.
+    Duplicates are dropped while keeping the original order.
+    """
+    hosts = []
+    for part in _split_spec(spec):
+        if '/' in part:
+            network = ipaddress.ip_network(part, strict=False)
+            if network.num_addresses == 1:
+                hosts.append(str(network.network_address))
+            else:
+                hosts.extend(str(host) for host in network.hosts())
+        elif _is_range(part):
+            hosts.extend(_expand_range(part))
+        else:
+            hosts.append(part)
+    return list(dict.fromkeys(hosts))
+
+
+def count_targets(spec: Union[str, Iterable[str]]) -> int:
+    """Count the hosts of a target specification without expanding it.
+
+    Raises ValueError for invalid entries, like expand_targets. Entries that
+    overlap are each counted in full, so the count can exceed
+    len(expand_targets(spec)).
+    """
+    total = 0
+    for part in _split_spec(spec):
+        if '/' in part:
+            total += HostRange(part).size
+        elif _is_range(part):
+            start, end = _range_bounds(part)
+            total += end - start + 1
+        else:
+            total += 1
+    return total
+
+
+def host_bounds(network) -> Tuple[int, int]:
+    """Return the first and last usable host of a network as integers.
+
+    Matches ipaddress' hosts(): network and broadcast addresses are skipped
+    except for /31, /32 (and the IPv6 equivalents).
+    """
+    first = int(network.network_address)
+    last = int(network.broadcast_address)
+    if network.num_addresses > 2:
+        if network.version == 4:
+            return first + 1, last - 1
+        return first + 1, last  # IPv6 has no broadcast, skip only the subnet-router anycast
+    return first, last
+
+
+def _merge_intervals(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class HostRange:
+    """Lazy, integer-encoded view of the hosts of a network.
+
+    Hosts are never materialized: iteration yields integers one at a time, in
+    order or in a pseudo-random permutation (a full-period linear
+    congruential generator over the range), skipping ``exclude`` entries
+    (CIDR blocks, ranges or single addresses). Memory use is independent of
+    the size of the network. In order, excluded intervals are skipped
+    without being visited; in random order every excluded address still
+    costs one step of the permutation.
+    """
+
+    def __init__(self, network: Union[str, ipaddress.IPv4Network, ipaddress.IPv6Network],
+                 exclude: Optional[Union[str, Iterable[str]]] = None,
+                 randomize: bool = False, seed: Optional[int] = None):
+        self.network = ipaddress.ip_network(network, strict=False)
+        self.first, self.last = host_bounds(self.network)
+        self.randomize = randomize
+        self.seed = seed
+        self._address_class = type(self.network.network_address)
+
+        intervals = []
+        for part in _split_spec(exclude or []):
+            if '/' in part:
+                excluded = ipaddress.ip_network(part, strict=False)
+                start, end = int(excluded.network_address), int(excluded.broadcast_address)
+            elif '-' in part:
+                start, end = _range_bounds(part)
+            else:
+                start = end = int(ipaddress.ip_address(part))
+            start, end = max(start, self.first), min(end, self.last)
+            if start <= end:
+                intervals.append((start, end))
+        self._excluded = _merge_intervals(intervals)
+        self._excluded_starts = [start for start, _ in self._excluded]
+
+    @property
+    def size(self) -> int:
+        """Number of hosts in the range; unlike len() not limited to sys.maxsize (large IPv6 networks)."""
+        size = self.last - self.first + 1
+        return size - sum(end - start + 1 for start, end in self._excluded)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def is_excluded(self, value: int) -> bool:
+        index = bisect.bisect_right(self._excluded_starts, value) - 1
+        return index >= 0 and value <= self._excluded[index][1]
+
+    def _offsets(self) -> Iterator[int]:
+        size = self.last - self.first + 1
+        if not self.randomize or size < 2:
+            yield from range(size)
+            return
+
+        # Full-period LCG modulo a power of two (Hull-Dobell: c odd, a = 1 mod 4),
+        # cycle-walking past values outside the range
+        rng = random.Random(self.seed)
+        modulus = 1 << (size - 1).bit_length()
+        multiplier = 4 * rng.randrange(1, max(2, modulus // 4)) + 1
+        increment = 2 * rng.randrange(modulus // 2) + 1
+        value = rng.randrange(modulus)
+        for _ in range(modulus):
+            value = (multiplier * value + increment) % modulus
+            if value < size:
+                yield value
+
+    def __iter__(self) -> Iterator[int]:
+        if not self.randomize:
+            # Jump over the (sorted, merged) excluded intervals
+            value = self.first
+            for start, end in self._excluded:
+                yield from range(value, start)
+                value = end + 1
+            yield from range(value, self.last + 1)
+            return
+
+        # The permutation cannot skip intervals, so in random order excluded
+        # values are still generated and then dropped
+        for offset in self._offsets():
+            value = self.first + offset
+            if not self._excluded or not self.is_excluded(value):
+                yield value
+
+    def addresses(self) -> Iterator[str]:
+        """Iterate the hosts as address strings."""
+        for value in self:
+            yield str(self._address_class(value))
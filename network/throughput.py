@@ -0,0 +1,593 @@
+import os
+import ssl
+import json
+import mmap
+import select
+import socket
+import tempfile
+import socketserver
+import threading
+import time
+import logging
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from urllib.parse import urlparse, parse_qs, urljoin
+from typing import Optional, Callable, Dict, List
+
+PROTOCOL_TCP = "tcp"
+PROTOCOL_HTTP = "http"
+PROTOCOLS = (PROTOCOL_TCP, PROTOCOL_HTTP)
+
+DEFAULT_PORT = 5201
+DEFAULT_HTTP_PORT = 8081
+DEFAULT_STREAMS = 4
+DEFAULT_DURATION = 10.0
+CONNECT_TIMEOUT = 5.0
+
+CHUNK_SIZE = 128 * 1024
+PAYLOAD_SIZE = 4 * 1024 * 1024   # Preallocated payload shared by every sender
+HTTP_DOWNLOAD_SIZE = 1 << 40  # Effectively endless, the client closes when done
+SAMPLE_INTERVAL = 0.25      # Seconds per throughput sample
+DEFAULT_WARMUP = 2.0        # Seconds of TCP ramp-up excluded from the steady-state rate
+MAX_WARMUP_FRACTION = 0.5   # Never trim more than this share of a test
+
+
+
+class PayloadBuffer:
+    """Preallocated random payload shared by every sender.
+
+    The data lives in a memory-mapped temporary file, so no byte strings are
+    built while sending: :meth:`send` hands file ranges to ``os.sendfile``
+    where available (no copy through user space) and other senders write
+    memoryview slices of the mapping. Random content keeps links that
+    compress traffic from inflating the results.
+    """
+
+    def __init__(self, size: int = PAYLOAD_SIZE):
+        self.size = size
+        self._file = tempfile.TemporaryFile()
+        self._file.write(os.urandom(size))
+        self._file.flush()
+        self._map = mmap.mmap(self._file.fileno(), size, access=mmap.ACCESS_READ)
+        self.view = memoryview(self._map)
+
+    def ranges(self, count: Optional[int] = None, chunk: int = CHUNK_SIZE):
+        """Yield (offset, length) chunks covering ``count`` bytes, endlessly if None.
+
+        Chunks wrap around the end of the payload.
+        """
+        offset = 0
+        while count is None or count > 0:
+            length = min(chunk, self.size - offset)
+            if count is not None:
+                length = min(length, count)
+                count -= length
+            yield offset, length
+            offset = (offset + length) % self.size
+
+    def send(self, sock: socket.socket, offset: int, length: int):
+        """Send ``length`` bytes of the payload starting at ``offset``."""
+        if not hasattr(os, 'sendfile') or isinstance(sock, ssl.SSLSocket):
+            sock.sendall(self.view[offset:offset + length])
+            return
+        end = offset + length
+        while offset < end:
+            try:
+                sent = os.sendfile(sock.fileno(), self._file.fileno(), offset, end - offset)
+            except BlockingIOError:
+                # Sockets with a timeout are non-blocking underneath
+                if not select.select([], [sock], [], sock.gettimeout())[1]:
+                    raise socket.timeout("send timed out")
+                continue
+            if not sent:
+                raise ConnectionError("connection closed during send")
+            offset += sent
+
+
+_payload = None
+_payload_lock = threading.Lock()
+
+
+def shared_payload() -> PayloadBuffer:
+    """Return the process-wide PayloadBuffer, creating it on first use."""
+    global _payload
+    with _payload_lock:
+        if _payload is None:
+            _payload = PayloadBuffer()
+        return _payload
+
+
+class _TcpHandler(socketserver.BaseRequestHandler):
+    """Line protocol: "DOWNLOAD" streams data until the client closes,
+    "UPLOAD" discards data until EOF and answers with the byte count,
+    "PING" answers "PONG" (repeatable)."""
+
+    def handle(self):
+        sock = self.request
+        reader = sock.makefile('rb')
+        try:
+            while True:
+                command = reader.readline().strip().upper()
+                if command == b"PING":
+                    sock.sendall(b"PONG\n")
+                elif command == b"DOWNLOAD":
+                    payload = shared_payload()
+                    for offset, length in payload.ranges():
+                        payload.send(sock, offset, length)
+                elif command == b"UPLOAD":
+                    # The reader may already hold the first bytes after the command
+                    buffer = bytearray(CHUNK_SIZE)
+                    received = 0
+                    while True:
+                        count = reader.readinto1(buffer)
+                        if not count:
+                            break
+                        received += count
+                    sock.sendall(f"{received}\n".encode())
+                    return
+                else:
+                    return
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            reader.close()
+
+
+class _HttpHandler(BaseHTTPRequestHandler):
+    """GET /download[?bytes=N], POST /upload and GET /ping."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logging.debug(f"ThroughputServer HTTP - {format % args}")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/ping":
+            self._reply(200, b"pong")
+        elif url.path == "/download":
+            size = self._size(parse_qs(url.query).get('bytes', [HTTP_DOWNLOAD_SIZE])[0])
+            if size is None:
+                self.send_error(400, "Invalid bytes value")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(size))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            payload = shared_payload()
+            try:
+                for offset, length in payload.ranges(size):
+                    payload.send(self.connection, offset, length)
+            except (ConnectionError, OSError):
+                self.close_connection = True
+        else:
+            self._reply(404, b"not found")
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/upload":
+            self._reply(404, b"not found")
+            return
+        remaining = self._size(self.headers.get("Content-Length", 0))
+        if remaining is None:
+            self.send_error(400, "Invalid Content-Length")
+            return
+        received = 0
+        buffer = memoryview(bytearray(CHUNK_SIZE))
+        try:
+            while remaining > 0:
+                count = self.rfile.readinto1(buffer[:min(CHUNK_SIZE, remaining)])
+                if not count:
+                    break
+                received += count
+                remaining -= count
+            self._reply(200, json.dumps({"bytes": received}).encode(), "application/json")
+        except (ConnectionError, OSError):
+            self.close_connection = True
+
+    @staticmethod
+    def _size(value) -> Optional[int]:
+        """Parse a byte count, returning None unless it is a non-negative integer."""
+        try:
+            size = int(value)
+        except (TypeError, ValueError):
+            return None
+        return size if size >= 0 else None
+
+    def _reply(self, code, body, content_type="text/plain"):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _ThreadingTcpServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _ThreadingHttpServer(ThreadingHTTPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class ThroughputServer:
+    """Lightweight throughput test server speaking a raw TCP protocol and HTTP.
+
+    Run it on any host (``python -m network.throughput --serve``) and point
+    SpeedTester.perform_local_test at it. Pass port 0 to pick free ports.
+    """
+
+    def __init__(self, host: str = "", port: int = DEFAULT_PORT, http_port: Optional[int] = DEFAULT_HTTP_PORT):
+        self.host = host
+        self.tcp_server = _ThreadingTcpServer((host, port), _TcpHandler)
+        self.http_server = _ThreadingHttpServer((host, http_port), _HttpHandler) if http_port is not None else None
+        self._threads = []
+
+    @property
+    def port(self) -> int:
+        return self.tcp_server.server_address[1]
+
+    @property
+    def http_port(self) -> Optional[int]:
+        return self.http_server.server_address[1] if self.http_server else None
+
+    def start(self):
+        """Serve in background threads."""
+        for server in (self.tcp_server, self.http_server):
+            if server:
+                thread = threading.Thread(target=server.serve_forever, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        logging.info(f"ThroughputServer listening on TCP {self.port}"
+                     + (f" and HTTP {self.http_port}" if self.http_server else ""))
+
+    def serve_forever(self):
+        """Serve until interrupted."""
+        self.start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        for server in (self.tcp_server, self.http_server):
+            if server:
+                server.shutdown()
+                server.server_close()
+        self._threads = []
+
+
+def summarize_samples(samples: List[float], interval: float, warmup: float) -> Dict:
+    """Reduce per-interval byte counts to rates.
+
+    Intervals that start inside the warm-up window are excluded from the
+    steady-state rate, unless that would leave no interval at all.
+    Returns {'mbps', 'average_mbps', 'series', 'trimmed'} where ``series`` is
+    the rate (Mbps) of every interval.
+    """
+    series = [count * 8 / interval / 1_000_000 for count in samples]
+    trimmed = min(int(warmup / interval + 0.5), len(samples) - 1) if samples else 0
+    steady = samples[trimmed:]
+    elapsed = len(samples) * interval
+    return {
+        'mbps': sum(steady) * 8 / (len(steady) * interval) / 1_000_000 if steady else 0.0,
+        'average_mbps': sum(samples) * 8 / elapsed / 1_000_000 if elapsed else 0.0,
+        'series': series,
+        'trimmed': trimmed,
+    }
+
+
+class ThroughputClient:
+    """Multi-stream throughput client for a ThroughputServer.
+
+    Each direction opens ``streams`` parallel connections for ``duration``
+    seconds. Transferred bytes are sampled every ``interval`` seconds and the
+    first ``warmup`` seconds (TCP slow start) are left out of the reported
+    steady-state rate.
+    """
+
+    def __init__(self, host: str, port: Optional[int] = None, protocol: str = PROTOCOL_TCP,
+                 streams: int = DEFAULT_STREAMS, duration: float = DEFAULT_DURATION,
+                 warmup: float = DEFAULT_WARMUP, interval: float = SAMPLE_INTERVAL):
+        if protocol not in PROTOCOLS:
+            raise ValueError(f"Unknown protocol: {protocol}")
+        self.host = host
+        self.protocol = protocol
+        self.port = port or (DEFAULT_PORT if protocol == PROTOCOL_TCP else DEFAULT_HTTP_PORT)
+        self.streams = max(1, streams)
+        self.duration = duration
+        self.interval = interval
+        self.warmup = min(warmup, duration * MAX_WARMUP_FRACTION)
+        self.is_running = False
+
+    def stop(self):
+        self.is_running = False
+
+    def latency(self, count: int = 4) -> List[float]:
+        """Measure round trips (ms) of PING requests on one connection."""
+        times = []
+        if self.protocol == PROTOCOL_HTTP:
+            conn = HTTPConnection(self.host, self.port, timeout=CONNECT_TIMEOUT)
+            try:
+                for _ in range(count):
+                    start = time.perf_counter()
+                    conn.request("GET", "/ping")
+                    conn.getresponse().read()
+                    times.append((time.perf_counter() - start) * 1000)
+            finally:
+                conn.close()
+            return times
+
+        with socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT) as sock:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            reader = sock.makefile('rb')
+            for _ in range(count):
+                start = time.perf_counter()
+                sock.sendall(b"PING\n")
+                if not reader.readline():
+                    break
+                times.append((time.perf_counter() - start) * 1000)
+            reader.close()
+        return times
+
+    def download(self, progress_callback: Optional[Callable] = None) -> Dict:
+        """Measure download throughput. See _run for the result format."""
+        worker = self._http_download if self.protocol == PROTOCOL_HTTP else self._tcp_download
+        return self._run(worker, progress_callback)
+
+    def upload(self, progress_callback: Optional[Callable] = None) -> Dict:
+        """Measure upload throughput. See _run for the result format."""
+        worker = self._http_upload if self.protocol == PROTOCOL_HTTP else self._tcp_upload
+        return self._run(worker, progress_callback)
+
+    def _run(self, worker: Callable, progress_callback: Optional[Callable]) -> Dict:
+        """Run ``streams`` workers for ``duration`` seconds, sampling their byte counters.
+
+        Returns {'bytes', 'seconds', 'mbps', 'average_mbps', 'series',
+        'interval', 'warmup', 'streams'}: ``mbps`` is the steady-state rate
+        after the warm-up window, ``average_mbps`` the rate over the whole
+        test and ``series`` the rate of every interval. 'error' is added when
+        every stream failed. progress_callback(fraction, mbps) is called with
+        the rate of the last interval.
+        """
+        self.is_running = True
+        counters = [0] * self.streams
+        errors = []
+        samples = []
+        threads = [threading.Thread(target=self._stream, args=(worker, index, counters, errors), daemon=True)
+                   for index in range(self.streams)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        # Sample on a fixed grid so late wake-ups do not skew the intervals
+        intervals = max(1, int(self.duration / self.interval + 0.5))
+        previous = 0
+        for number in range(1, intervals + 1):
+            delay = start + number * self.interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            total = sum(counters)
+            samples.append(total - previous)
+            previous = total
+            if progress_callback:
+                progress_callback(number / intervals, samples[-1] * 8 / self.interval / 1_000_000)
+            if not self.is_running or not any(t.is_alive() for t in threads):
+                break
+        elapsed = time.perf_counter() - start
+        self.is_running = False
+        for thread in threads:
+            thread.join(timeout=CONNECT_TIMEOUT)
+
+        total = sum(counters)
+        result = {
+            'bytes': total,
+            'seconds': elapsed,
+            'interval': self.interval,
+            'warmup': self.warmup,
+            'streams': self.streams,
+        }
+        result.update(summarize_samples(samples, self.interval, self.warmup))
+        if errors and not total:
+            result['error'] = errors[0]
+        return result
+
+    def _stream(self, worker, index, counters, errors):
+        try:
+            worker(index, counters)
+        except (ConnectionError, OSError, ValueError, HTTPException) as e:
+            if self.is_running:
+                logging.debug(f"ThroughputClient stream {index} failed: {e}")
+                errors.append(str(e))
+
+    def _tcp_download(self, index, counters):
+        with socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT) as sock:
+            sock.sendall(b"DOWNLOAD\n")
+            buffer = bytearray(CHUNK_SIZE)
+            while self.is_running:
+                count = sock.recv_into(buffer)
+                if not count:
+                    break
+                counters[index] += count
+
+    def _tcp_upload(self, index, counters):
+        with socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT) as sock:
+            sock.sendall(b"UPLOAD\n")
+            payload = shared_payload()
+            for offset, length in payload.ranges():
+                if not self.is_running:
+                    break
+                payload.send(sock, offset, length)
+                counters[index] += length
+            # The server's count excludes data still sitting in socket buffers
+            sock.shutdown(socket.SHUT_WR)
+            reply = sock.makefile('rb').readline().strip()
+            if reply.isdigit():
+                counters[index] = int(reply)
+
+    def _http_download(self, index, counters):
+        conn = HTTPConnection(self.host, self.port, timeout=CONNECT_TIMEOUT)
+        try:
+            conn.request("GET", "/download")
+            response = conn.getresponse()
+            if response.status != 200:
+                raise ConnectionError(f"HTTP {response.status} from {self.host}")
+            buffer = bytearray(CHUNK_SIZE)
+            while self.is_running:
+                count = response.readinto(buffer)
+                if not count:
+                    break
+                counters[index] += count
+        finally:
+            conn.close()
+
+    def _http_upload(self, index, counters):
+        conn = HTTPConnection(self.host, self.port, timeout=CONNECT_TIMEOUT)
+        try:
+            conn.putrequest("POST", "/upload")
+            conn.putheader("Content-Type", "application/octet-stream")
+            conn.putheader("Content-Length", str(HTTP_DOWNLOAD_SIZE))
+            conn.endheaders()
+            payload = shared_payload()
+            for offset, length in payload.ranges():
+                if not self.is_running:
+                    break
+                payload.send(conn.sock, offset, length)
+                counters[index] += length
+        finally:
+            conn.close()
+
+
+class SpeedtestClient(ThroughputClient):
+    """Multi-stream client for Speedtest.net (Ookla HTTP legacy) servers.
+
+    ``url`` is the server's upload URL (``.../upload.php``) as found in the
+    server list; downloads fetch the ``random<size>x<size>.jpg`` images next
+    to it over keep-alive connections.
+    """
+
+    DOWNLOAD_IMAGE_SIZE = 4000
+    UPLOAD_BODY_SIZE = 4 * 1024 * 1024
+    USER_AGENT = "Mozilla/5.0 (Network Test Tool) speedtest-compatible"
+
+    def __init__(self, url: str, streams: int = DEFAULT_STREAMS, duration: float = DEFAULT_DURATION,
+                 warmup: float = DEFAULT_WARMUP, interval: float = SAMPLE_INTERVAL):
+        parsed = urlparse(url)
+        super().__init__(parsed.hostname, parsed.port or (443 if parsed.scheme == "https" else 80),
+                         PROTOCOL_HTTP, streams, duration, warmup, interval)
+        self.url = url
+        self._connection_class = HTTPSConnection if parsed.scheme == "https" else HTTPConnection
+        self._upload_path = parsed.path or "/"
+        self._download_path = urlparse(urljoin(url, f"random{self.DOWNLOAD_IMAGE_SIZE}x{self.DOWNLOAD_IMAGE_SIZE}.jpg")).path
+
+    def latency(self, count: int = 4) -> List[float]:
+        """Measure round trips (ms) of ``latency.txt`` requests."""
+        path = urlparse(urljoin(self.url, "latency.txt")).path
+        conn = self._connect()
+        times = []
+        try:
+            for number in range(count):
+                start = time.perf_counter()
+                conn.request("GET", f"{path}?x={time.time()}.{number}", headers=self._headers())
+                conn.getresponse().read()
+                times.append((time.perf_counter() - start) * 1000)
+        finally:
+            conn.close()
+        return times
+
+    def download(self, progress_callback: Optional[Callable] = None) -> Dict:
+        return self._run(self._image_download, progress_callback)
+
+    def upload(self, progress_callback: Optional[Callable] = None) -> Dict:
+        return self._run(self._form_upload, progress_callback)
+
+    def _connect(self):
+        return self._connection_class(self.host, self.port, timeout=CONNECT_TIMEOUT)
+
+    def _headers(self, **extra):
+        headers = {"User-Agent": self.USER_AGENT, "Cache-Control": "no-cache"}
+        headers.update(extra)
+        return headers
+
+    def _image_download(self, index, counters):
+        conn = self._connect()
+        buffer = bytearray(CHUNK_SIZE)
+        try:
+            number = 0
+            while self.is_running:
+                conn.request("GET", f"{self._download_path}?x={time.time()}.{index}.{number}", headers=self._headers())
+                response = conn.getresponse()
+                if response.status != 200:
+                    raise ConnectionError(f"HTTP {response.status} from {self.host}")
+                while self.is_running:
+                    count = response.readinto(buffer)
+                    if not count:
+                        break
+                    counters[index] += count
+                response.close()
+                number += 1
+        finally:
+            conn.close()
+
+    def _form_upload(self, index, counters):
+        prefix = b"content1="
+        payload = shared_payload()
+        conn = self._connect()
+        try:
+            while self.is_running:
+                conn.putrequest("POST", self._upload_path)
+                for name, value in self._headers(**{"Content-Type": "application/x-www-form-urlencoded",
+                                                   "Content-Length": str(self.UPLOAD_BODY_SIZE)}).items():
+                    conn.putheader(name, value)
+                conn.endheaders()
+                conn.send(prefix)
+                counters[index] += len(prefix)
+                for offset, length in payload.ranges(self.UPLOAD_BODY_SIZE - len(prefix)):
+                    if not self.is_running:
+                        return
+                    payload.send(conn.sock, offset, length)
+                    counters[index] += length
+                conn.getresponse().read()
+        finally:
+            conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Network Test Tool throughput server and client")
+    parser.add_argument("host", nargs="?", help="Server to test against (client mode)")
+    parser.add_argument("--serve", action="store_true", help="Run the throughput server")
+    parser.add_argument("--bind", default="", help="Address to listen on (server mode)")
+    parser.add_argument("--port", type=int, default=None, help=f"TCP port (default {DEFAULT_PORT})")
+    parser.add_argument("--http-port", type=int, default=DEFAULT_HTTP_PORT, help="HTTP port for the server")
+    parser.add_argument("--protocol", choices=PROTOCOLS, default=PROTOCOL_TCP)
+    parser.add_argument("--streams", type=int, default=DEFAULT_STREAMS)
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION)
+    parser.add_argument("--warmup", type=float, default=DEFAULT_WARMUP,
+                        help="Seconds excluded from the steady-state rate")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
+    if args.serve:
+        ThroughputServer(args.bind, args.port or DEFAULT_PORT, args.http_port).serve_forever()
+        return
+    if not args.host:
+        parser.error("a host is required in client mode")
+
+    client = ThroughputClient(args.host, args.port, args.protocol, args.streams, args.duration, args.warmup)
+    for name, run in (("Download", client.download), ("Upload", client.upload)):
+        result = run()
+        if 'error' in result:
+            print(f"{name}: error: {result['error']}")
+        else:
+            print(f"{name}: {result['mbps']:.2f} Mbps steady state "
+                  f"({result['average_mbps']:.2f} Mbps average) over {result['streams']} streams")
+
+
+if __name__ == "__main__":
+    main()
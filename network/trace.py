@@ -1,13 +1,278 @@
 import subprocess
 import platform
 import re
+import math
+import socket
+import errno
+import random
+import selectors
 import logging
 import threading
 import time
+from .icmp import IcmpSocket, ICMP_ECHO_REPLY, ICMP_DEST_UNREACHABLE, ICMP_TIME_EXCEEDED
+from .metrics import RunningStats
+
+METHOD_ICMP = "icmp"
+METHOD_UDP = "udp"
+METHOD_TCP = "tcp"
+TRACE_METHODS = (METHOD_ICMP, METHOD_UDP, METHOD_TCP)
+
+DEFAULT_MAX_HOPS = 30
+DEFAULT_QUERIES = 3
+UDP_BASE_PORT = 33434
+UDP_PORT_RANGE = 4096
+TCP_DEFAULT_PORT = 80
+ROUND_SPACING = 0.05  # Seconds between probe rounds, keeps router ICMP rate limits happy
+UDP_PAYLOAD = b'\x00' * 32
+
+ICMP_PORT_UNREACHABLE = 3
+UDP_HEADERS_SIZE = 28  # IPv4 + UDP header bytes in front of the payload
+
+# Paris mode keeps the fields load balancers hash on (ports, ICMP checksum)
+# fixed per flow and tags probes another way: UDP probes by payload length,
+# ICMP probes by sequence number with a compensated checksum.
+PARIS_PAYLOAD_BASE = 32
+PARIS_LENGTH_RANGE = 1024
+PARIS_CHECKSUM_BASE = 0x1000
+
+DEFAULT_PROBE_BUDGET = 1000
+DEFAULT_MAX_BRANCHES = 16
+
+
+def mda_probes(interfaces: int, confidence: float = 0.95) -> int:
+    """Probes needed at a hop to rule out one more interface than seen so far.
+
+    Multipath Detection Algorithm stopping rule: after n probes over distinct
+    flows all landed on ``interfaces`` next hops, a hidden extra interface
+    would have been missed with probability below 1 - confidence.
+    """
+    k = max(1, interfaces)
+    return math.ceil(math.log((1 - confidence) / (k + 1)) / math.log(k / (k + 1)))
+
+
+# traceroute (Linux/macOS) and tracert (Windows) hop lines, e.g.
+#   " 5  10.0.0.1  5.1 ms 10.0.0.2  5.3 ms !H  *"
+#   "  3    12 ms     *    <1 ms  10.0.0.1"
+#   "  3    12 ms    11 ms    12 ms  router.example [10.0.0.1]"
+_HOP_LINE_RE = re.compile(r'^\s*(\d+)\s+(.*)$')
+_HOP_TOKEN_RE = re.compile(
+    r'(?P<lost>\*)'
+    r'|(?P<rtt><?\d+(?:\.\d+)?)\s*ms\b'
+    r'|(?P<flag>![A-Za-z0-9]*)'
+    r'|\((?P<paren>[0-9a-fA-F.:]+)\)'
+    r'|\[(?P<bracket>[0-9a-fA-F.:]+)\]'
+    r'|(?P<ip>\d{1,3}(?:\.\d{1,3}){3}\b|[0-9a-fA-F]*:[0-9a-fA-F:]+)'
+    r'|(?P<word>\S+)'
+)
+_UNREACHABLE_RE = re.compile(r'unreachable', re.IGNORECASE)
+
+
+def build_hop(hop, times, ips, unreachable=False):
+    """Build a hop result dict from per-probe RTTs (ms, None when lost).
+
+    Keys: hop, ip (first responder, or "Request timed out"), ips (all
+    responders), times, loss (% of probes lost), status ("ok", "timeout"
+    when no probe answered, or "unreachable") and time, the average RTT as a
+    display string.
+    """
+    answered = [t for t in times if t is not None]
+    if unreachable:
+        status = "unreachable"
+    elif answered:
+        status = "ok"
+    else:
+        status = "timeout"
+    return {
+        "hop": hop,
+        "ip": ips[0] if ips else "Request timed out",
+        "ips": list(ips),
+        "times": list(times),
+        "loss": (len(times) - len(answered)) / len(times) * 100 if times else 100.0,
+        "status": status,
+        "time": f"{sum(answered) / len(answered):.1f} ms" if answered else "*",
+    }
+
+
+def parse_trace_line(line):
+    """Parse one hop line of traceroute or tracert output into a hop dict.
+
+    Handles several probes per line, several responding routers (load
+    balanced paths), "<1 ms" (counted as 0.5 ms), lost probes ("*") and
+    unreachable annotations (!H, !N, ... or tracert's "Destination ...
+    unreachable"). Returns None for header and other non-hop lines.
+    """
+    match = _HOP_LINE_RE.match(line)
+    if not match:
+        return None
+
+    times = []
+    ips = []
+    unreachable = bool(_UNREACHABLE_RE.search(match.group(2)))
+    for token in _HOP_TOKEN_RE.finditer(match.group(2)):
+        kind = token.lastgroup
+        if kind == 'lost':
+            times.append(None)
+        elif kind == 'rtt':
+            value = token.group('rtt')
+            times.append(0.5 if value.startswith('<') else float(value))
+        elif kind == 'flag':
+            unreachable = unreachable or token.group('flag') not in ('!', '!T')
+        elif kind in ('ip', 'paren', 'bracket'):
+            ip = token.group(kind)
+            if ip not in ips:
+                ips.append(ip)
+    if not times and not ips:
+        return None
+    return build_hop(int(match.group(1)), times, ips, unreachable)
+
+
+class _Prober:
+    """Sends TTL-limited probes and matches the ICMP replies back to them.
+
+    Probes are identified by an integer probe id: the echo sequence for ICMP,
+    the destination port for UDP and the local port of a connecting socket for
+    TCP. All replies are read from one raw ICMP socket, TCP handshakes that
+    complete (or are reset) mark the destination as reached.
+
+    In ``paris`` mode every probe of a flow carries the same flow identifier,
+    so per-flow load balancers send them all down the same path; ``flow``
+    selects which one (ICMP and UDP only).
+    """
+
+    def __init__(self, icmp: IcmpSocket, method: str, address: str, port: int = None,
+                 paris: bool = False):
+        if paris and method == METHOD_TCP:
+            raise ValueError("Paris mode supports the ICMP and UDP methods only")
+        self.icmp = icmp
+        self.method = method
+        self.address = address
+        self.port = port
+        self.paris = paris
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(icmp.sock, selectors.EVENT_READ, None)
+        self._udp = None
+        self._udp_probes = {}  # (destination port, IP length or None) -> probe id
+        self._tcp = {}         # local port -> (probe id, socket)
+
+        if method == METHOD_UDP:
+            self._udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._udp.bind(('', 0))
+            self._udp_source = self._udp.getsockname()[1]
+
+    def close(self):
+        for _, sock in self._tcp.values():
+            sock.close()
+        self._tcp.clear()
+        if self._udp:
+            self._udp.close()
+        self.selector.close()
+
+    def send(self, probe_id: int, ttl: int, flow: int = 0) -> float:
+        """Send one probe with the given TTL and return its send time."""
+        if self.method == METHOD_ICMP:
+            checksum_value = PARIS_CHECKSUM_BASE + flow if self.paris else None
+            return self.icmp.send_echo(self.address, probe_id & 0xFFFF, ttl=ttl,
+                                       checksum_value=checksum_value)
+
+        if self.method == METHOD_UDP:
+            if self.paris:
+                dest_port = UDP_BASE_PORT + flow
+                payload = b'\x00' * (PARIS_PAYLOAD_BASE + probe_id % PARIS_LENGTH_RANGE)
+                self._udp_probes[(dest_port, UDP_HEADERS_SIZE + len(payload))] = probe_id
+            else:
+                dest_port = UDP_BASE_PORT + probe_id % UDP_PORT_RANGE
+                payload = UDP_PAYLOAD
+                self._udp_probes[(dest_port, None)] = probe_id
+            self._udp.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, ttl)
+            sent_at = time.perf_counter()
+            self._udp.sendto(payload, (self.address, dest_port))
+            return sent_at
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, ttl)
+        sock.bind(('', 0))
+        local_port = sock.getsockname()[1]
+        self._tcp[local_port] = (probe_id, sock)
+        self.selector.register(sock, selectors.EVENT_WRITE, local_port)
+        sent_at = time.perf_counter()
+        sock.connect_ex((self.address, self.port))
+        return sent_at
+
+    def release(self, probe_id: int):
+        """Forget a finished probe (closes its TCP socket)."""
+        if self.method == METHOD_TCP:
+            for local_port, (pid, sock) in list(self._tcp.items()):
+                if pid == probe_id:
+                    self.selector.unregister(sock)
+                    sock.close()
+                    del self._tcp[local_port]
+
+    def receive(self, timeout: float):
+        """Wait for one reply and return (probe id, responder, recv time, kind) or None.
+
+        kind is "hop" for a router on the path, "reached" for the destination
+        and "unreachable" when a router reports the destination unreachable.
+        """
+        for key, _ in self.selector.select(max(0.0, timeout)):
+            if key.data is not None:
+                return self._tcp_result(key.data)
+            message = self.icmp.receive(0.01)
+            if message:
+                return self._match(message)
+        return None
+
+    def _tcp_result(self, local_port):
+        probe_id, sock = self._tcp[local_port]
+        recv_time = time.perf_counter()
+        error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        self.release(probe_id)
+        if error in (0, errno.ECONNREFUSED):
+            return probe_id, self.address, recv_time, "reached"
+        return None  # Soft errors are reported through the ICMP socket
+
+    def _match(self, message):
+        responder = message['address']
+        recv_time = message['recv_time']
+        icmp_type = message['type']
+
+        if icmp_type == ICMP_ECHO_REPLY:
+            if self.method != METHOD_ICMP or responder != self.address:
+                return None
+            return message['sequence'], responder, recv_time, "reached"
+
+        if message.get('quoted_destination') != self.address:
+            return None
+        probe_id = self._probe_id(message)
+        if probe_id is None:
+            return None
+
+        if icmp_type == ICMP_TIME_EXCEEDED:
+            return probe_id, responder, recv_time, "hop"
+        if icmp_type == ICMP_DEST_UNREACHABLE:
+            if responder == self.address or message['code'] == ICMP_PORT_UNREACHABLE:
+                return probe_id, responder, recv_time, "reached"
+            return probe_id, responder, recv_time, "unreachable"
+        return None
+
+    def _probe_id(self, message):
+        protocol = message.get('quoted_protocol')
+        if self.method == METHOD_ICMP and protocol == socket.IPPROTO_ICMP:
+            return message['sequence']
+        if self.method == METHOD_UDP and protocol == socket.IPPROTO_UDP:
+            if message['source_port'] == self._udp_source:
+                length = message['quoted_length'] if self.paris else None
+                return self._udp_probes.get((message['destination_port'], length))
+        if self.method == METHOD_TCP and protocol == socket.IPPROTO_TCP:
+            entry = self._tcp.get(message['source_port'])
+            return entry[0] if entry else None
+        return None
+
 
 class TraceRoute:
-    def __init__(self):
+    def __init__(self, use_native=True):
         self.platform = platform.system().lower()
+        self.use_native = use_native
         self.is_running = False
         self.process = None
 
@@ -19,17 +284,387 @@ class TraceRoute:
             except:
                 pass
 
-    def run_trace(self, target, callback):
+    def run_trace(self, target, callback, method=METHOD_ICMP, max_hops=DEFAULT_MAX_HOPS,
+                  timeout=1.0, queries=DEFAULT_QUERIES, port=TCP_DEFAULT_PORT, paris=False):
         """
         Run traceroute and call callback with structured data for each hop.
         callback(data): data is a dict with keys: hop, ip, time, status
+
+        Probes for every TTL are sent at once over raw sockets (ICMP echo,
+        UDP or TCP SYN to ``port``) and hops are reported in order as soon as
+        they and all hops before them have answered or timed out, so a trace
+        takes roughly one timeout instead of one per hop. Without raw socket
+        access the system traceroute/tracert command is used instead
+        (tracert always sends three probes per hop, whatever ``queries`` is).
+
+        ``paris`` keeps the flow identifier of all probes constant (ICMP and
+        UDP only) so load-balanced paths do not mix routers from different
+        branches into one trace.
+        """
+        self.is_running = True
+        if method not in TRACE_METHODS:
+            callback({"error": f"Unknown trace method: {method}"})
+            self.is_running = False
+            return
+
+        icmp = self._open_raw_socket()
+        if icmp is None:
+            self._run_subprocess(target, callback, max_hops, queries)
+            return
+
+        try:
+            address = socket.gethostbyname(target)
+            self._run_native(icmp, address, callback, method, max_hops, timeout, queries, port, paris)
+        except Exception as e:
+            logging.error(f"Trace route failed: {e}")
+            callback({"error": str(e)})
+        finally:
+            icmp.close()
+            self.is_running = False
+
+    def _open_raw_socket(self):
+        """Open a raw ICMP socket for native probing, or return None."""
+        icmp = IcmpSocket.open() if self.use_native else None
+        if icmp is not None and icmp.kind != 'raw':
+            # Datagram ICMP sockets do not deliver time exceeded errors
+            icmp.close()
+            icmp = None
+        return icmp
+
+    def monitor(self, target, callback, interval=1.0, method=METHOD_ICMP,
+                max_hops=DEFAULT_MAX_HOPS, timeout=2.0, port=TCP_DEFAULT_PORT, cycles=None,
+                paris=False):
+        """
+        Continuously probe every hop to a target, MTR style, until stop() is
+        called or ``cycles`` rounds have been sent.
+
+        One probe per TTL is sent every ``interval`` seconds and per-hop
+        statistics are kept in constant memory. callback(data) is called with
+        the updated hop whenever a probe answers or times out; data has the
+        run_trace keys (time is the last RTT) plus sent, received, loss (%),
+        last, avg, best, worst and stdev in milliseconds. Requires raw
+        socket access. ``paris`` works as in run_trace.
         """
         self.is_running = True
-        
+        if method not in TRACE_METHODS:
+            callback({"error": f"Unknown trace method: {method}"})
+            self.is_running = False
+            return
+
+        icmp = self._open_raw_socket()
+        if icmp is None:
+            callback({"error": "Continuous monitoring requires administrator/root privileges"})
+            self.is_running = False
+            return
+
+        try:
+            address = socket.gethostbyname(target)
+            self._run_monitor(icmp, address, callback, interval, method, max_hops, timeout, port,
+                              cycles, paris)
+        except Exception as e:
+            logging.error(f"Trace route monitor failed: {e}")
+            callback({"error": str(e)})
+        finally:
+            icmp.close()
+            self.is_running = False
+
+    def discover_paths(self, target, method=METHOD_UDP, max_hops=DEFAULT_MAX_HOPS, timeout=1.0,
+                       probe_budget=DEFAULT_PROBE_BUDGET, confidence=0.95,
+                       max_branches=DEFAULT_MAX_BRANCHES):
+        """
+        Enumerate the load-balanced (ECMP) paths to a target and return a hop graph.
+
+        Paris probes are sent over many flows at every TTL, each flow following
+        one fixed path. A hop is probed until the Multipath Detection
+        Algorithm stopping rule says no further interface is likely to be
+        missed (see mda_probes), and consecutive hops of the same flow give
+        the links between interfaces. Hops are probed in parallel, and no more
+        than ``probe_budget`` probes are sent in total.
+
+        Returns a dict with target, address, method, probes_sent, complete
+        (False when the budget ran out) and hops: a list of dicts with hop,
+        interfaces (in discovery order), rtts ({ip: [ms]}), sent, lost and
+        next ({ip: [next hop ips]}). On failure the dict has an 'error' key.
+        Requires raw socket access and the ICMP or UDP method.
+        """
+        self.is_running = True
+        icmp = self._open_raw_socket()
+        if icmp is None:
+            self.is_running = False
+            return {"error": "Multipath discovery requires administrator/root privileges"}
+
+        try:
+            address = socket.gethostbyname(target)
+            prober = _Prober(icmp, method, address, paris=True)
+            try:
+                graph = self._run_multipath(prober, max_hops, timeout, probe_budget,
+                                            confidence, max_branches)
+            finally:
+                prober.close()
+            graph.update({"target": target, "address": address, "method": method})
+            return graph
+        except Exception as e:
+            logging.error(f"Multipath discovery failed: {e}")
+            return {"error": str(e)}
+        finally:
+            icmp.close()
+            self.is_running = False
+
+    def _run_multipath(self, prober, max_hops, timeout, probe_budget, confidence, max_branches):
+        hops = {ttl: {'flows': {}, 'rtts': {}, 'sent': 0, 'lost': 0} for ttl in range(1, max_hops + 1)}
+        destination = None
+        sent_total = 0
+        next_flow = 0
+        next_id = random.randrange(PARIS_LENGTH_RANGE)
+        complete = True
+
+        while self.is_running:
+            last = destination or max_hops
+            needed = {}
+            for ttl in range(1, last + 1):
+                hop = hops[ttl]
+                seen = len(hop['rtts'])
+                if not seen:
+                    target = DEFAULT_QUERIES  # Silent hop, do not spend the budget on it
+                elif seen >= max_branches:
+                    target = hop['sent']
+                else:
+                    target = mda_probes(seen, confidence)
+                if target > hop['sent']:
+                    needed[ttl] = target - hop['sent']
+            if not needed:
+                break
+
+            # New flows over the hops that need them and their neighbours,
+            # so every flow also links each hop to the next one
+            low = max(1, min(needed) - 1)
+            high = min(last, max(needed) + 1)
+            ttls = range(low, high + 1)
+            flows = max(needed.values())
+            flows = min(flows, (probe_budget - sent_total) // len(ttls))
+            # Probe ids wrap at PARIS_LENGTH_RANGE; more probes in flight would
+            # reuse ids and misattribute replies. Remaining flows go in later rounds
+            flows = min(flows, PARIS_LENGTH_RANGE // len(ttls))
+            if flows <= 0:
+                complete = False
+                break
+
+            probes = {}
+            for wave in range(flows):
+                flow = next_flow + wave
+                for ttl in ttls:
+                    probes[next_id] = (ttl, flow, prober.send(next_id, ttl, flow))
+                    next_id = (next_id + 1) % PARIS_LENGTH_RANGE
+                    hops[ttl]['sent'] += 1
+                destination = self._collect(prober, probes, hops, ROUND_SPACING, destination=destination)
+            next_flow += flows
+            sent_total += flows * len(ttls)
+
+            destination = self._collect(prober, probes, hops, timeout, timeout, destination)
+
+        last = destination or max_hops
+        result = []
+        for ttl in range(1, last + 1):
+            hop = hops[ttl]
+            following = hops.get(ttl + 1, {'flows': {}})['flows'] if ttl < last else {}
+            links = {}
+            for flow, ip in hop['flows'].items():
+                if flow in following and following[flow] not in links.setdefault(ip, []):
+                    links[ip].append(following[flow])
+            result.append({
+                'hop': ttl,
+                'interfaces': list(hop['rtts']),
+                'rtts': hop['rtts'],
+                'sent': hop['sent'],
+                'lost': hop['lost'],
+                'next': links,
+            })
+        return {'hops': result, 'probes_sent': sent_total, 'complete': complete and self.is_running}
+
+    def _collect(self, prober, probes, hops, duration, timeout=None, destination=None):
+        """Record replies for ``duration`` seconds, or until ``probes`` is empty
+        when a ``timeout`` is given (unanswered probes then count as lost).
+        Returns the lowest TTL at which the destination answered."""
+        deadline = time.perf_counter() + duration
+        while self.is_running:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or (timeout is not None and not probes):
+                break
+            reply = prober.receive(min(remaining, 0.1))
+            if reply is None or reply[0] not in probes:
+                continue
+            probe_id, responder, recv_time, kind = reply
+            ttl, flow, sent_at = probes.pop(probe_id)
+            hop = hops[ttl]
+            hop['flows'][flow] = responder
+            hop['rtts'].setdefault(responder, []).append((recv_time - sent_at) * 1000)
+            if kind != "hop" and (destination is None or ttl < destination):
+                destination = ttl
+
+        if timeout is not None:
+            for ttl, _, _ in probes.values():
+                hops[ttl]['lost'] += 1
+            probes.clear()
+        return destination
+
+    def _run_monitor(self, icmp, address, callback, interval, method, max_hops, timeout, port,
+                     cycles, paris):
+        prober = _Prober(icmp, method, address, port, paris)
+        probes = {}  # probe id -> (ttl, sent_at)
+        stats = {}   # ttl -> RunningStats
+        responders = {}
+        destination = None
+        next_id = random.randrange(UDP_PORT_RANGE)
+        next_cycle = time.perf_counter()
+        sent_cycles = 0
+
+        try:
+            while self.is_running and (cycles is None or sent_cycles < cycles or probes):
+                now = time.perf_counter()
+                changed = set()
+
+                if (cycles is None or sent_cycles < cycles) and now >= next_cycle:
+                    for ttl in range(1, (destination or max_hops) + 1):
+                        probes[next_id] = (ttl, prober.send(next_id, ttl))
+                        next_id = (next_id + 1) % (1 << 16)
+                    sent_cycles += 1
+                    next_cycle += interval
+
+                for probe_id, (ttl, sent_at) in list(probes.items()):
+                    if now - sent_at >= timeout:
+                        del probes[probe_id]
+                        prober.release(probe_id)
+                        stats.setdefault(ttl, RunningStats()).add(None)
+                        changed.add(ttl)
+
+                wait = next_cycle - now
+                if probes:
+                    wait = min(wait, min(sent_at for _, sent_at in probes.values()) + timeout - now)
+                reply = prober.receive(min(max(wait, 0.0), 0.1))
+                if reply is not None and reply[0] in probes:
+                    probe_id, responder, recv_time, kind = reply
+                    ttl, sent_at = probes.pop(probe_id)
+                    prober.release(probe_id)
+                    stats.setdefault(ttl, RunningStats()).add((recv_time - sent_at) * 1000)
+                    responders[ttl] = responder
+                    changed.add(ttl)
+                    if kind != "hop" and (destination is None or ttl < destination):
+                        destination = ttl
+                        for hop in [hop for hop in stats if hop > destination]:
+                            del stats[hop]
+
+                for ttl in sorted(changed):
+                    if ttl in stats and (destination is None or ttl <= destination):
+                        callback(self._monitor_result(ttl, stats[ttl], responders.get(ttl)))
+        finally:
+            prober.close()
+
+    @staticmethod
+    def _monitor_result(ttl, stats, responder):
+        received = stats.received > 0
+        return {
+            "hop": ttl,
+            "ip": responder or "Request timed out",
+            "time": f"{stats.last:.1f} ms" if received else "*",
+            "status": "ok" if received else "timeout",
+            "sent": stats.sent,
+            "received": stats.received,
+            "loss": stats.lost / stats.sent * 100 if stats.sent else 0.0,
+            "last": stats.last,
+            "avg": stats.mean if received else None,
+            "best": stats.min,
+            "worst": stats.max,
+            "stdev": stats.std_dev,
+        }
+
+    def _run_native(self, icmp, address, callback, method, max_hops, timeout, queries, port, paris):
+        prober = _Prober(icmp, method, address, port, paris)
+        probes = {}  # probe id -> (ttl, sent_at)
+        hops = {ttl: {'times': [None] * queries, 'ips': [], 'pending': queries, 'kind': None}
+                for ttl in range(1, max_hops + 1)}
+        destination = None
+        next_hop = 1
+        next_id = random.randrange(UDP_PORT_RANGE)
+        start = time.perf_counter()
+        rounds_sent = 0
+
+        try:
+            while self.is_running and next_hop <= max_hops:
+                now = time.perf_counter()
+
+                # Fire the next round of probes (one per TTL) when it is due
+                if rounds_sent < queries and now >= start + rounds_sent * ROUND_SPACING:
+                    last_ttl = destination or max_hops
+                    for ttl in range(1, last_ttl + 1):
+                        probes[next_id] = (ttl, prober.send(next_id, ttl), rounds_sent)
+                        next_id = (next_id + 1) % (1 << 16)
+                    for ttl in range(last_ttl + 1, max_hops + 1):
+                        hops[ttl]['pending'] -= 1
+                    rounds_sent += 1
+
+                # Expire probes that ran out of time
+                for probe_id, (ttl, sent_at, _) in list(probes.items()):
+                    if now - sent_at >= timeout:
+                        del probes[probe_id]
+                        hops[ttl]['pending'] -= 1
+                        prober.release(probe_id)
+
+                # Report every hop that is complete, in order
+                while next_hop <= max_hops and self.is_running:
+                    hop = hops[next_hop]
+                    if hop['pending'] > 0 and not (destination and next_hop > destination):
+                        break
+                    if destination and next_hop > destination:
+                        next_hop = max_hops + 1
+                        break
+                    callback(self._hop_result(next_hop, hop))
+                    if hop['kind'] in ("reached", "unreachable"):
+                        next_hop = max_hops + 1
+                        break
+                    next_hop += 1
+                if next_hop > max_hops:
+                    break
+
+                wait = timeout
+                if probes:
+                    wait = min(sent_at for _, sent_at, _ in probes.values()) + timeout - now
+                if rounds_sent < queries:
+                    wait = min(wait, start + rounds_sent * ROUND_SPACING - now)
+                reply = prober.receive(min(wait, 0.1))
+                if reply is None:
+                    continue
+
+                probe_id, responder, recv_time, kind = reply
+                if probe_id not in probes:
+                    continue
+                ttl, sent_at, query = probes.pop(probe_id)
+                prober.release(probe_id)
+                hop = hops[ttl]
+                hop['pending'] -= 1
+                hop['times'][query] = (recv_time - sent_at) * 1000
+                if responder not in hop['ips']:
+                    hop['ips'].append(responder)
+                if kind != "hop":
+                    hop['kind'] = kind
+                    if destination is None or ttl < destination:
+                        destination = ttl
+        finally:
+            prober.close()
+
+    @staticmethod
+    def _hop_result(ttl, hop):
+        return build_hop(ttl, hop['times'], hop['ips'], hop['kind'] == "unreachable")
+
+    def _run_subprocess(self, target, callback, max_hops=DEFAULT_MAX_HOPS, queries=DEFAULT_QUERIES):
+        """Run the system traceroute/tracert command and parse its output.
+
+        tracert has no option for the number of probes per hop, so on
+        Windows ``queries`` is ignored and every hop gets three probes.
+        """
         if self.platform == "windows":
-            command = ["tracert", "-d", "-w", "1000", target]
+            command = ["tracert", "-d", "-h", str(max_hops), "-w", "1000", target]
         else:
-            command = ["traceroute", "-n", "-w", "1", target]
+            command = ["traceroute", "-n", "-m", str(max_hops), "-q", str(queries), "-w", "1", target]
 
         try:
             # On Windows, we need to prevent the console window from appearing
@@ -50,7 +685,7 @@ class TraceRoute:
             for line in iter(self.process.stdout.readline, ''):
                 if not self.is_running:
                     break
-                
+
                 line = line.strip()
                 if not line:
                     continue
@@ -69,82 +704,5 @@ class TraceRoute:
             self.is_running = False
 
     def _parse_line(self, line):
-        """Parse a line of traceroute output."""
-        if self.platform == "windows":
-            # Example: "  1    <1 ms    <1 ms    <1 ms  192.168.1.1"
-            # Example: "  2     *        *        *     Request timed out."
-            
-            # Skip header lines
-            if line.startswith("Tracing") or line.startswith("over"):
-                return None
-
-            try:
-                parts = line.split()
-                if not parts or not parts[0].isdigit():
-                    return None
-
-                hop = int(parts[0])
-                
-                # Check for timeout
-                if "Request timed out" in line:
-                    return {
-                        "hop": hop,
-                        "time": "*",
-                        "ip": "Request timed out",
-                        "status": "timeout"
-                    }
-
-                # Extract times (usually 3 columns)
-                times = []
-                ip_index = -1
-                
-                # Logic to find IP: it's usually the last element
-                ip = parts[-1]
-                
-                # Extract times: look for 'ms' or '<1'
-                # Simple average calculation
-                total_time = 0
-                count = 0
-                
-                for part in parts[1:-1]:
-                    if part == "ms": continue
-                    if part == "<1": 
-                        total_time += 0.5
-                        count += 1
-                    elif part.isdigit():
-                        total_time += int(part)
-                        count += 1
-                
-                avg_time = f"{total_time / count:.1f} ms" if count > 0 else "*"
-
-                return {
-                    "hop": hop,
-                    "time": avg_time,
-                    "ip": ip,
-                    "status": "ok"
-                }
-            except Exception as e:
-                logging.debug(f"Failed to parse line '{line}': {e}")
-                return None
-        else:
-            # Linux/Mac parsing (simplified)
-            # Example: " 1  192.168.1.1  1.123 ms  1.000 ms  0.900 ms"
-            try:
-                parts = line.split()
-                if not parts or not parts[0].isdigit():
-                    return None
-                
-                hop = int(parts[0])
-                ip = parts[1]
-                
-                # Extract time (just take the first one for simplicity)
-                time_val = parts[2] if len(parts) > 2 else "*"
-                
-                return {
-                    "hop": hop,
-                    "time": f"{time_val} ms",
-                    "ip": ip,
-                    "status": "ok"
-                }
-            except:
-                return None
+        """Parse a line of traceroute/tracert output (see parse_trace_line)."""
+        return parse_trace_line(line)
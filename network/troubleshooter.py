@@ -1,10 +1,10 @@
 import platform
-import subprocess
 import socket
 from datetime import datetime
 from .detector import NetworkDetector
 from .ping import PingTester
 from .speed_test import SpeedTester
+from .trace import TraceRoute
 
 class Troubleshooter:
     def __init__(self):
@@ -45,13 +45,22 @@ class Troubleshooter:
         # 2. Connectivity Tests
 
         log_and_callback("2. Performing Connectivity Tests...")
-        # Ping Gateway
         gateway = info.get('gateway', [None])[0]
+        dns_server = info.get('dns', [None])[0]
+
+        # Ping gateway, DNS and external host concurrently
+        targets = [host for host in (gateway, dns_server, "8.8.8.8") if host]
+        ping_results = self.ping_tester.ping_many(targets, count=3, interval=0.5)
+
+        def ping_succeeded(host):
+            ping_result = ping_results.get(host)
+            return ping_result and not ping_result.get('error') and 'avg_time' in ping_result.get('statistics', {})
+
+        # Ping Gateway
         if gateway:
             log_and_callback(f"    Pinging gateway ({gateway})...")
-            ping_result = self.ping_tester.ping_host(gateway, count=3)
-            if ping_result and not ping_result.get('error') and 'avg_time' in ping_result.get('statistics', {}):
-                log_and_callback(f"        Success ({ping_result['statistics']['avg_time']:.2f}ms avg)")
+            if ping_succeeded(gateway):
+                log_and_callback(f"        Success ({ping_results[gateway]['statistics']['avg_time']:.2f}ms avg)")
             else:
                 log_and_callback("        Failed to ping gateway.")
                 log_and_callback("        [SUGGESTION] Check physical connection to router/switch.")
@@ -61,12 +70,10 @@ class Troubleshooter:
             log_and_callback("    [SUGGESTION] Check DHCP settings or configure static IP.")
 
         # Ping DNS
-        dns_server = info.get('dns', [None])[0]
         if dns_server:
             log_and_callback(f"    Pinging primary DNS server ({dns_server})...")
-            ping_result = self.ping_tester.ping_host(dns_server, count=3)
-            if ping_result and not ping_result.get('error') and 'avg_time' in ping_result.get('statistics', {}):
-                log_and_callback(f"        Success ({ping_result['statistics']['avg_time']:.2f}ms avg)")
+            if ping_succeeded(dns_server):
+                log_and_callback(f"        Success ({ping_results[dns_server]['statistics']['avg_time']:.2f}ms avg)")
             else:
                 log_and_callback("        Failed to ping DNS server.")
                 log_and_callback("        [SUGGESTION] Try changing DNS to Google (8.8.8.8) or Cloudflare (1.1.1.1).")
@@ -76,9 +83,8 @@ class Troubleshooter:
 
         # Ping External Host
         log_and_callback("    Pinging external host (8.8.8.8)...")
-        ping_result = self.ping_tester.ping_host("8.8.8.8", count=3)
-        if ping_result and not ping_result.get('error') and 'avg_time' in ping_result.get('statistics', {}):
-            log_and_callback(f"        Success ({ping_result['statistics']['avg_time']:.2f}ms avg)\n")
+        if ping_succeeded("8.8.8.8"):
+            log_and_callback(f"        Success ({ping_results['8.8.8.8']['statistics']['avg_time']:.2f}ms avg)\n")
         else:
             log_and_callback("        Failed to ping external host.\n")
             log_and_callback("        [SUGGESTION] Check internet subscription or ISP status.")
@@ -98,25 +104,13 @@ class Troubleshooter:
             if progress_callback:
                 progress_callback(message)
 
-        try:
-            if platform.system().lower() == "windows":
-                command = ["tracert", "-d", "-h", "15", "-w", "1000", host]
+        def on_hop(hop):
+            if "error" in hop:
+                log_and_callback(f"An error occurred during traceroute: {hop['error']}")
             else:
-                command = ["traceroute", "-n", "-m", "15", "-q", "1", host]
-            
-            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, universal_newlines=True)
-
-            for line in iter(process.stdout.readline, ''):
-                log_and_callback(line.strip())
-            
-            process.stdout.close()
-            return_code = process.wait()
-            if return_code != 0:
-                log_and_callback(f"Traceroute finished with error code {return_code}")
-
-        except FileNotFoundError:
-            log_and_callback("Traceroute command not found. Skipping.")
-        except Exception as e:
-            log_and_callback(f"An error occurred during traceroute: {e}")
+                log_and_callback(f"{hop['hop']:>2}  {hop['ip']:<18} {hop['time']}")
+
+        log_and_callback(f"Traceroute to {host}, 15 hops max")
+        TraceRoute().run_trace(host, on_hop, max_hops=15, queries=1)
         
         return log
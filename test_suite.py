@@ -2,13 +2,23 @@ import sys
 import os
 import logging
 import time
+import struct
+import socket
+import tempfile
+from datetime import datetime
 from network.detector import NetworkDetector
 from network.system_tools import SystemTools
 from network.advanced import AdvancedDiagnostics
-from network.trace import TraceRoute
+from network.trace import TraceRoute, parse_trace_line
 from network.ping import PingTester
 from network.scanner import PortScanner
 from network.troubleshooter import Troubleshooter
+from network.metrics import LatencyHistogram, RunningStats
+from network.targets import HostRange, count_targets
+from network.dns_resolver import build_query, parse_response, reverse_name, TYPE_PTR, RCODE_NXDOMAIN
+from network.throughput import summarize_samples, PayloadBuffer
+from network.scheduler import CronSchedule
+from network.speed_history import SpeedHistory, HEADER, RECORD, KIND_LOCAL, PERIOD_HOUR
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
@@ -56,16 +66,34 @@ def test_all_features():
     # We'll just mock the run or run a very short one if possible
     # Since run_trace is blocking in this script context:
     print("   - Skipping full trace execution in test script to save time.")
+    samples = [
+        (" 5  10.0.0.1  5.1 ms 10.0.0.2  5.3 ms !H  *", ["10.0.0.1", "10.0.0.2"], "unreachable"),
+        (" 2  router.example (10.0.0.1)  1.2 ms  1.1 ms  1.3 ms", ["10.0.0.1"], "ok"),
+        ("  3    12 ms     *    <1 ms  10.0.0.1", ["10.0.0.1"], "ok"),
+        ("  3    12 ms    11 ms    12 ms  router.example [10.0.0.1]", ["10.0.0.1"], "ok"),
+        ("  4     *        *        *     Request timed out.", [], "timeout"),
+    ]
+    for line, ips, status in samples:
+        hop = parse_trace_line(line)
+        assert hop['ips'] == ips and hop['status'] == status, f"Bad parse of {line!r}: {hop}"
+    print(f"   - Parsed {len(samples)} traceroute/tracert sample lines.")
     print("   [PASS] Trace Route Logic\n")
 
     # 5. Ping Tester
     print("5. Testing Ping Tester (8.8.8.8)...")
     pinger = PingTester()
     ping_res = pinger.ping_host("8.8.8.8", count=1)
-    if not ping_res.get('error'):
+    if not ping_res.get('error') and ping_res['statistics'].get('received'):
         print(f"   - Ping Success: {ping_res['statistics']['avg_time']}ms")
+    elif not ping_res.get('error'):
+        print("   - Ping Failed: no reply")
     else:
         print(f"   - Ping Failed: {ping_res.get('error')}")
+    burst_stats = []
+    burst_res = pinger.ping_host("127.0.0.1", count=3, mode="burst", stats_callback=burst_stats.append)
+    assert not burst_res.get('error'), f"Burst ping failed: {burst_res.get('error')}"
+    assert len(burst_stats) == 3 and burst_stats[-1]['sent'] == 3, f"Bad burst statistics: {burst_stats}"
+    print(f"   - Burst Mode: {burst_stats[-1]['received']}/3 replies, live statistics OK")
     print("   [PASS] Ping Tester\n")
 
     # 6. Port Scanner
@@ -84,6 +112,153 @@ def test_all_features():
     print("   - Troubleshooter initialized successfully.")
     print("   [PASS] Troubleshooter\n")
 
+    # 8. Latency Histogram
+    print("8. Testing Latency Histogram...")
+    histogram = LatencyHistogram()
+    for value in range(1, 101):
+        histogram.add(float(value))
+    for percentile, expected in [(50, 50), (95, 95), (99, 99)]:
+        value = histogram.percentile(percentile)
+        assert abs(value - expected) <= expected * histogram.precision, f"P{percentile} = {value}"
+    assert LatencyHistogram().percentile(50) is None, "Empty histogram must have no percentiles"
+    upper = LatencyHistogram()
+    for value in range(101, 201):
+        upper.add(float(value))
+    histogram.merge(upper)
+    assert histogram.count == 200 and abs(histogram.percentile(50) - 100) <= 1, "Merged P50 is wrong"
+    restored = LatencyHistogram.from_dict(histogram.to_dict())
+    assert restored.percentile(99) == histogram.percentile(99), "Serialized histogram differs"
+    print(f"   - P50/P95/P99 within {histogram.precision:.0%}, merge and serialization OK")
+    print("   [PASS] Latency Histogram\n")
+
+    # 9. Host Ranges
+    print("9. Testing Host Ranges...")
+    hosts = HostRange("10.0.0.0/28", exclude="10.0.0.3-5, 10.0.0.14")
+    expected = ["10.0.0.1", "10.0.0.2"] + [f"10.0.0.{i}" for i in range(6, 14)]
+    assert list(hosts.addresses()) == expected and hosts.size == len(expected), "Bad sequential hosts"
+    shuffled = HostRange("10.0.0.0/24", exclude="10.0.0.128/25", randomize=True, seed=7)
+    order = list(shuffled)
+    assert sorted(order) == list(HostRange("10.0.0.0/24", exclude="10.0.0.128/25")), "Random order is not a permutation"
+    assert order != sorted(order), "Random order equals sequential order"
+    assert order == list(HostRange("10.0.0.0/24", exclude="10.0.0.128/25", randomize=True, seed=7)), "Seeded order changed"
+    assert HostRange("2001:db8::/64").size == 2 ** 64 - 1, "Bad IPv6 range size"
+    assert count_targets("10.0.0.0/8, 10.1.0.5-20, example.com") == 2 ** 24 - 2 + 16 + 1, "Bad target count"
+    print(f"   - Exclusions, seeded permutation of {len(order)} hosts, IPv6 size and target counts OK")
+    print("   [PASS] Host Ranges\n")
+
+    # 10. Reverse DNS Parsing
+    print("10. Testing Reverse DNS Parsing...")
+    name = reverse_name("10.0.0.1")
+    assert name == "1.0.0.10.in-addr.arpa", f"Bad reverse name: {name}"
+    query = build_query(name, 0x1234)
+    ptr = b"\x06router\x07example\x00"
+    answer = b"\xc0\x0c" + struct.pack("!HHIH", TYPE_PTR, 1, 300, len(ptr)) + ptr
+    response = struct.pack("!HHHHHH", 0x1234, 0x8180, 1, 1, 0, 0) + query[12:] + answer
+    assert parse_response(response) == (0x1234, 0, [(TYPE_PTR, 300, "router.example")]), "Bad PTR answer"
+    nxdomain = struct.pack("!HHHHHH", 0x4321, 0x8183, 1, 0, 0, 0) + query[12:]
+    assert parse_response(nxdomain) == (0x4321, RCODE_NXDOMAIN, []), "Bad NXDOMAIN answer"
+    print("   - Compressed PTR answer and NXDOMAIN parsed")
+    print("   [PASS] Reverse DNS Parsing\n")
+
+    # 11. Path Monitoring Statistics
+    print("11. Testing Path Monitoring Statistics...")
+    hop_stats = RunningStats()
+    for rtt in [10.0, None, 20.0, 30.0]:
+        hop_stats.add(rtt)
+    row = TraceRoute._monitor_result(3, hop_stats, "10.0.0.1")
+    assert (row['sent'], row['received'], row['loss']) == (4, 3, 25.0), f"Bad loss: {row}"
+    assert (row['last'], row['avg'], row['best'], row['worst'], row['stdev']) == (30.0, 20.0, 10.0, 30.0, 10.0), f"Bad RTTs: {row}"
+    silent = RunningStats()
+    silent.add(None)
+    row = TraceRoute._monitor_result(4, silent, None)
+    assert row['status'] == "timeout" and row['loss'] == 100.0 and row['avg'] is None, f"Bad silent hop: {row}"
+    print("   - Loss %, last/avg/best/worst/stdev and silent hops OK")
+    print("   [PASS] Path Monitoring Statistics\n")
+
+    # 12. Throughput Sampling
+    print("12. Testing Throughput Sampling...")
+    # 125000 bytes per 0.25 s interval is 4 Mbps; the first 0.5 s ramps up
+    samples = [12500, 62500, 125000, 125000, 125000, 125000]
+    summary = summarize_samples(samples, 0.25, 0.5)
+    assert summary['trimmed'] == 2 and abs(summary['mbps'] - 4.0) < 1e-9, f"Bad steady rate: {summary}"
+    assert abs(summary['average_mbps'] - 575000 * 8 / 1.5 / 1_000_000) < 1e-9, f"Bad average: {summary}"
+    assert summary['series'][0] == 0.4 and len(summary['series']) == len(samples), f"Bad series: {summary}"
+    assert summarize_samples(samples, 0.25, 10)['trimmed'] == len(samples) - 1, "Warm-up trimmed every interval"
+    assert summarize_samples([], 0.25, 0.5)['mbps'] == 0.0, "Empty samples must give 0 Mbps"
+    print("   - Warm-up trimming, steady-state and average rates OK")
+    print("   [PASS] Throughput Sampling\n")
+
+    # 13. Throughput Payload
+    print("13. Testing Throughput Payload...")
+    payload = PayloadBuffer(1000)
+    chunks = list(payload.ranges(2500, chunk=400))
+    assert chunks == [(0, 400), (400, 400), (800, 200)] * 2 + [(0, 400), (400, 100)], f"Bad ranges: {chunks}"
+    sender, receiver = socket.socketpair()
+    with sender, receiver:
+        payload.send(sender, 800, 200)
+        received = b""
+        while len(received) < 200:
+            received += receiver.recv(200 - len(received))
+    assert received == bytes(payload.view[800:1000]), "Sent bytes differ from the payload"
+    print("   - Wrapping ranges and payload sends OK")
+    print("   [PASS] Throughput Payload\n")
+
+    # 14. Cron Schedules
+    print("14. Testing Cron Schedules...")
+    start = datetime(2026, 1, 2, 10, 7)  # A Friday
+    cases = [
+        ("*/15 * * * *", datetime(2026, 1, 2, 10, 15)),
+        ("0 9 * * 1-5", datetime(2026, 1, 5, 9, 0)),     # Next weekday morning is Monday
+        ("@daily", datetime(2026, 1, 3, 0, 0)),
+        ("0 0 * * 7", datetime(2026, 1, 4, 0, 0)),       # 7 is Sunday
+        ("30 8 13 * 5", datetime(2026, 1, 9, 8, 30)),    # Day 13 or a Friday
+        ("0,30 12 1 2 *", datetime(2026, 2, 1, 12, 0)),
+    ]
+    for expression, expected in cases:
+        result = CronSchedule(expression).next_after(start)
+        assert result == expected, f"{expression!r} fired at {result}, expected {expected}"
+    for expression in ["61 * * * *", "* * *", "*/0 * * * *", "0 0 0 * *"]:
+        try:
+            CronSchedule(expression)
+        except ValueError:
+            continue
+        raise AssertionError(f"{expression!r} was accepted")
+    try:
+        CronSchedule("0 0 30 2 *").next_after(start)
+        raise AssertionError("February 30th was scheduled")
+    except ValueError:
+        pass
+    print(f"   - {len(cases)} next-run calculations and invalid expressions OK")
+    print("   [PASS] Cron Schedules\n")
+
+    # 15. Speed Test History
+    print("15. Testing Speed Test History...")
+    with tempfile.TemporaryDirectory() as directory:
+        history = SpeedHistory(os.path.join(directory, "history.bin"))
+        base = datetime(2026, 1, 2, 10, 0).timestamp()
+        history.append({'download_speed': 100.0, 'upload_speed': 20.0, 'ping': 10.0}, timestamp=base)
+        history.append({'download_speed': 50.0, 'upload_speed': 10.0, 'ping': 30.0,
+                        'loaded_latency': {'download_increase': 42.0}}, timestamp=base + 600)
+        history.append({'error': "timeout"}, timestamp=base + 3600)
+        history.append({'download_speed': 900.0, 'upload_speed': 800.0, 'ping': 1.0}, KIND_LOCAL, base + 7200)
+        assert os.path.getsize(history.path) == HEADER.size + 4 * RECORD.size, "Unexpected file size"
+
+        records = list(history.records(base + 1, base + 7200))
+        assert [r['timestamp'] for r in records] == [int(base) + 600, int(base) + 3600], f"Bad range: {records}"
+        assert records[0]['latency_increase'] == 42.0 and records[1]['error'], f"Bad record fields: {records}"
+
+        hours = history.aggregate(PERIOD_HOUR, kind="internet")
+        assert [(h['tests'], h['failures']) for h in hours] == [(2, 0), (1, 1)], f"Bad buckets: {hours}"
+        assert hours[0]['download_speed_avg'] == 75.0 and hours[0]['ping_max'] == 30.0, f"Bad averages: {hours[0]}"
+        assert hours[1]['download_speed_avg'] is None, "Failed tests must not count towards averages"
+
+        with open(history.path, 'ab') as f:
+            f.write(b"\x00" * 5)  # Torn record from an interrupted write
+        history.append({'download_speed': 1.0}, timestamp=base + 10800)
+        assert len(list(history.records())) == 5, "Torn record was not dropped"
+    print("   - Record size, range queries, hourly aggregates and torn writes OK")
+    print("   [PASS] Speed Test History\n")
+
     print("=== ALL TESTS COMPLETED SUCCESSFULLY ===")
 
 if __name__ == "__main__":
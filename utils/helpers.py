@@ -1,3 +1,7 @@
+import os
+import time
+import platform
+
 def validate_ip(ip):
     parts = ip.split('.')
     if len(parts) != 4:
@@ -13,6 +17,47 @@ def format_output(data):
 def is_valid_port(port):
     return isinstance(port, int) and 0 <= port <= 65535
 
+def user_dir(kind="data"):
+    """Return the per-user application directory for "data" or "cache" files."""
+    if platform.system().lower() == "windows":
+        if kind == "cache":
+            base = os.environ.get("LOCALAPPDATA") or os.environ.get("APPDATA")
+        else:
+            base = os.environ.get("APPDATA")
+        base = base or os.path.expanduser("~")
+    elif kind == "cache":
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "NetworkTools")
+
 def log_message(message):
     with open("network_tools.log", "a") as log_file:
-        log_file.write(f"{message}\n")
\ No newline at end of file
+        log_file.write(f"{message}\n")
+
+class RateLimiter:
+    """Pace repeated events to a fixed interval (in seconds).
+
+    Sleeps for the bulk of the wait and spins for the last couple of
+    milliseconds, so sub-millisecond intervals stay accurate.
+    """
+
+    SPIN_THRESHOLD = 0.002
+
+    def __init__(self, interval):
+        self.interval = max(0.0, interval)
+        self._next = None
+
+    def wait(self):
+        """Block until the next event is due."""
+        now = time.perf_counter()
+        if self._next is not None and self._next > now:
+            remaining = self._next - now
+            if remaining > self.SPIN_THRESHOLD:
+                time.sleep(remaining - self.SPIN_THRESHOLD)
+            while time.perf_counter() < self._next:
+                pass
+            now = self._next
+        # Schedule from the later of now and the due time, so a stalled
+        # caller does not burst to catch up
+        self._next = now + self.interval